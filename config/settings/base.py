@@ -323,6 +323,60 @@ REPORT_PROJECT_PK = os.getenv('REPORT_PROJECT_PK', None)
 REPORT_API_KEY = os.getenv('REPORT_API_KEY', None)
 
 
+# Scraper Configuration
+# ------------------------------------------------------------------------------
+# Base URL of the TikTok Research API (e.g., a local fake_research_api server).
+TT_API_BASE_URL = os.getenv('TT_API_BASE_URL', 'https://open.tiktokapis.com')
+# Number of date windows fetched concurrently from the TikTok Research API.
+SCRAPER_MAX_WORKERS = int(os.getenv('SCRAPER_MAX_WORKERS', 1))
+# Account history windows with more estimated result pages are bisected.
+SCRAPER_MAX_PAGES_PER_WINDOW = int(os.getenv('SCRAPER_MAX_PAGES_PER_WINDOW', 50))
+# Number of sub-queries the usernames and hashtags of a day are split into.
+SCRAPER_QUERY_SHARDS = int(os.getenv('SCRAPER_QUERY_SHARDS', 1))
+# Request rate shared by all workers. The rate starts at
+# SCRAPER_REQUESTS_PER_MINUTE and adapts to the API responses within the bounds.
+SCRAPER_REQUESTS_PER_MINUTE = float(os.getenv('SCRAPER_REQUESTS_PER_MINUTE', 6))
+SCRAPER_MIN_REQUESTS_PER_MINUTE = float(os.getenv('SCRAPER_MIN_REQUESTS_PER_MINUTE', 1))
+SCRAPER_MAX_REQUESTS_PER_MINUTE = float(os.getenv('SCRAPER_MAX_REQUESTS_PER_MINUTE', 30))
+# Seconds all requests pause after the first error (doubles with further errors).
+SCRAPER_BASE_BACKOFF = float(os.getenv('SCRAPER_BASE_BACKOFF', 10))
+# Seconds for which the responses of scraper post API requests with an
+# Idempotency-Key header are kept for retries
+SCRAPER_IDEMPOTENCY_KEY_TTL = int(os.getenv('SCRAPER_IDEMPOTENCY_KEY_TTL', 3600))
+# Seconds a key is claimed by a request in progress. Should be about the
+# worker timeout of the app server, so keys of killed requests are freed.
+SCRAPER_IDEMPOTENCY_LOCK_TTL = int(os.getenv('SCRAPER_IDEMPOTENCY_LOCK_TTL', 300))
+# Daily Research API request quota per client key (0 disables the budget) and
+# its division between the scrape jobs, by priority. A job can use whatever is
+# left, except for the unused shares of unfinished higher priority jobs.
+SCRAPER_DAILY_REQUEST_QUOTA = int(os.getenv('SCRAPER_DAILY_REQUEST_QUOTA', 1000))
+SCRAPER_QUOTA_SHARES = [('new_day', 0.4), ('backfill', 0.2), ('accounts', 0.4)]
+# Pooled keep-alive connections per host and default request timeout (seconds).
+SCRAPER_HTTP_POOL_SIZE = int(os.getenv('SCRAPER_HTTP_POOL_SIZE', 10))
+SCRAPER_HTTP_TIMEOUT = float(os.getenv('SCRAPER_HTTP_TIMEOUT', 120))
+# JSON codec of the scrapers: 'auto' (orjson if installed), 'json' or 'orjson'.
+SCRAPER_JSON_CODEC = os.getenv('SCRAPER_JSON_CODEC', 'auto')
+# Concurrent connection slots of scraper B (video pages) in total and per host
+# (0: no limit per host; all video pages are on www.tiktok.com).
+SCRAPER_B_CONCURRENCY = int(os.getenv('SCRAPER_B_CONCURRENCY', 1))
+SCRAPER_B_HOST_CONCURRENCY = int(os.getenv('SCRAPER_B_HOST_CONCURRENCY', 0))
+# Seconds a scraper B worker may hold a claimed batch before it can be claimed again.
+SCRAPER_B_LEASE_SECONDS = int(os.getenv('SCRAPER_B_LEASE_SECONDS', 3600))
+# Scraper B saves its results in bulk every SCRAPER_B_FLUSH_SIZE videos or
+# SCRAPER_B_FLUSH_INTERVAL seconds, whichever comes first.
+SCRAPER_B_FLUSH_SIZE = int(os.getenv('SCRAPER_B_FLUSH_SIZE', 50))
+SCRAPER_B_FLUSH_INTERVAL = float(os.getenv('SCRAPER_B_FLUSH_INTERVAL', 30))
+# Incremental account update: refresh interval in days by window age in days
+# (max_age, interval); None matches all older windows. The interval is halved
+# while a window's engagement changes by more than the threshold per refresh.
+SCRAPER_REFRESH_INTERVALS = [(30, 1), (90, 7), (None, 30)]
+SCRAPER_REFRESH_CHANGE_THRESHOLD = 0.05
+# Archive every raw Research API page as compressed JSONL (see replay_raw_pages).
+SCRAPER_ARCHIVE_RAW_PAGES = os.getenv('SCRAPER_ARCHIVE_RAW_PAGES', 'True') == 'True'
+SCRAPER_RAW_ARCHIVE_DIR = (
+    os.getenv('SCRAPER_RAW_ARCHIVE_DIR') or os.path.join(BASE_DIR, 'scraper/data/raw'))
+
+
 # CACHE
 # ------------------------------------------------------------------------------
 CACHES = {
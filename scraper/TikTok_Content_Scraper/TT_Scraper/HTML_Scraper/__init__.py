@@ -2,6 +2,7 @@ import os
 import os.path
 import pytz
 import requests
+from requests.adapters import HTTPAdapter
 import browser_cookie3
 from bs4 import BeautifulSoup
 import json
@@ -12,11 +13,16 @@ import traceback
 from pprint import pprint
 from pathlib import Path
 
+from .._json_codec import get_codec
+
 class HTML_Scraper:
         def __init__(self,
                     wait_time = 0.35,
                     output_files_fp = "data/", 
-                    browser_name = None):
+                    browser_name = None,
+                    session = None,
+                    pool_size = 10,
+                    json_codec = None):
             
             # output folder
             Path(output_files_fp).mkdir(parents=True, exist_ok=True)
@@ -39,6 +45,18 @@ class HTML_Scraper:
             self.queue_eta = None
         
             self.browser_name = browser_name
+
+            # keep-alive connection pool, reused for all requests
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+            self.session = session
+
+            # JSON codec for page data and metadata files (fastest available by default)
+            self.json_codec = json_codec or get_codec()
+
             # request headers
             self._init_request_headers()
 
@@ -60,7 +78,7 @@ class HTML_Scraper:
                 if browser_name is not None:
                         self.cookies = getattr(browser_cookie3, browser_name)(domain_name='.tiktok.com')  # Inspired by pyktok
 
-                r = requests.get(url,
+                r = self.session.get(url,
                         allow_redirects=False, # may have to set to True
                         headers=self.headers,
                         cookies=self.cookies,
@@ -15,4 +15,7 @@ def _init_request_headers(self):
     self.context_dict = {'viewport': {'width': 0, 'height': 0},
                     'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:58.0) Gecko/20100101 Firefox/58.0'}
 
-    self.cookies = dict()
\ No newline at end of file
+    self.cookies = dict()
+    # drop cookies the pooled session collected, so a reset starts a fresh identity
+    if getattr(self, "session", None) is not None:
+        self.session.cookies.clear()
\ No newline at end of file
@@ -11,8 +11,8 @@ from ._exceptions_custom import *
 from .HTML_Scraper import HTML_Scraper
 
 class TT_Scraper(HTML_Scraper):
-    def __init__(self, wait_time = 0.35, output_files_fp = "data/", browser_name = None):
-        super().__init__(wait_time, output_files_fp)
+    def __init__(self, wait_time = 0.35, output_files_fp = "data/", browser_name = None, session = None, pool_size = 10, json_codec = None):
+        super().__init__(wait_time, output_files_fp, session=session, pool_size=pool_size, json_codec=json_codec)
         if browser_name:
             self.cookies = getattr(browser_cookie3, browser_name)(domain_name=".tiktok.com")
     
@@ -21,6 +21,7 @@ class TT_Scraper(HTML_Scraper):
     from ._filter_tiktok_data import _force_to_int, _prep_hashtags_and_mentions, _filter_tiktok_data
     from ._download_data import _download_data, write_video, write_pictures, write_metadata_package, write_slide_audio
     from ._exception_handler import _exception_handler
+    from ._extract_rehydration_data import _extract_rehydration_data
 
 
     def scrape_list(self, ids : list = None, scrape_content : bool = True, batch_size : int = None, clear_console = True, total_videos=0, already_scraped_count=0, total_errors=0):
@@ -97,10 +98,8 @@ class TT_Scraper(HTML_Scraper):
         try:
             # scraping html data
             requested_data = self.request_and_retain_cookies(f"https://www.tiktok.com/@tiktok/video/{id}")
-            soup = BeautifulSoup(requested_data.text, "html.parser")
-            tt_script = soup.find('script', attrs={'id':"__UNIVERSAL_DATA_FOR_REHYDRATION__"})
             try:
-                requested_data_str = json.loads(tt_script.string)
+                requested_data_str = self._extract_rehydration_data(requested_data)
             except AttributeError:
                 raise RetryLaterError
 
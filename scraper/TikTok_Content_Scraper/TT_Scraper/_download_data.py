@@ -1,5 +1,3 @@
-import json
-
 def _download_data(self, metadata_batch, download_metadata = True, download_content = True):
     for metadata_package in metadata_batch:
         content_binary = metadata_package.pop("content_binary")
@@ -26,8 +24,8 @@ def _download_data(self, metadata_batch, download_metadata = True, download_cont
 
 def write_metadata_package(self, filepath, metadata_package):
     filename = filepath.replace("*", "metadata.json")
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(metadata_package, f, ensure_ascii=False, indent=4)
+    with open(filename, "wb") as f:
+        f.write(self.json_codec.dumps(metadata_package, indent=True))
     self.log.info(f"--> JSON saved to {filename}")
 
 def write_video(self, video_content, filepath):
@@ -0,0 +1,51 @@
+from bs4 import BeautifulSoup
+
+from ._json_codec import get_codec
+
+REHYDRATION_SCRIPT_ID = b'__UNIVERSAL_DATA_FOR_REHYDRATION__'
+
+
+def extract_rehydration_data(content, codec=None):
+    """
+    Slices the JSON payload of the __UNIVERSAL_DATA_FOR_REHYDRATION__ script
+    tag straight from the raw page bytes, without parsing the HTML.
+
+    Returns the data decoded with codec (default: the fastest available),
+    or None if the tag could not be found or its content is not valid JSON.
+    """
+    codec = codec or get_codec()
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    id_position = content.find(REHYDRATION_SCRIPT_ID)
+    if id_position == -1:
+        return None
+    # The ID must be an attribute of the script tag.
+    tag_start = content.rfind(b"<script", 0, id_position)
+    if tag_start == -1 or content.find(b">", tag_start, id_position) != -1:
+        return None
+    tag_end = content.find(b">", id_position)
+    if tag_end == -1:
+        return None
+    script_end = content.find(b"</script>", tag_end)
+    if script_end == -1:
+        return None
+
+    try:
+        return codec.loads(content[tag_end + 1:script_end])
+    except ValueError:
+        return None
+
+
+def _extract_rehydration_data(self, requested_data):
+    """
+    Returns the rehydration data of a page response. Falls back to searching
+    the BeautifulSoup tree if the data cannot be sliced from the raw bytes.
+    Raises AttributeError if the page has no rehydration script.
+    """
+    data = extract_rehydration_data(requested_data.content, self.json_codec)
+    if data is not None:
+        return data
+    soup = BeautifulSoup(requested_data.text, "html.parser")
+    tt_script = soup.find('script', attrs={'id':"__UNIVERSAL_DATA_FOR_REHYDRATION__"})
+    return self.json_codec.loads(tt_script.string)
@@ -0,0 +1,55 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdlibJSONCodec:
+    """ JSON codec based on the json module of the standard library. """
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj, indent=False):
+        """ Returns the UTF-8 encoded JSON of obj (indented for files if indent is set). """
+        return json.dumps(obj, ensure_ascii=False, indent=4 if indent else None).encode("utf-8")
+
+
+class OrjsonCodec(StdlibJSONCodec):
+    """
+    JSON codec based on orjson (several times faster than the standard
+    library). Objects orjson cannot serialize (e.g., integers beyond 64 bit)
+    are encoded with the standard library instead.
+    """
+    name = "orjson"
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            return super().dumps(obj, indent=indent)
+
+
+def get_codec(name="auto"):
+    """
+    Returns the JSON codec called name ("json" or "orjson"). "auto" picks
+    orjson if it is installed and the standard library otherwise.
+    """
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name == "orjson":
+        if orjson is None:
+            raise ImportError("The orjson JSON codec requires the orjson package")
+        return OrjsonCodec()
+    if name == "json":
+        return StdlibJSONCodec()
+    raise ValueError(f"Unknown JSON codec: {name}")
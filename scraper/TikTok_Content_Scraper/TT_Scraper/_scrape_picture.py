@@ -18,7 +18,7 @@ def _scrape_picture(self, metadata):
     if audio_url == "":
         print("No audio found!")
     else:
-        audio_binary: bytes = requests.get(audio_url).content    
+        audio_binary: bytes = self.session.get(audio_url, timeout=20).content    
     
     # request pictures
     picture_content_binary = (len(metadata_images)) * [None]
@@ -1,6 +1,10 @@
 from django.contrib import admin
 
-from scraper.models import TikTokVideo, TikTokUser, Hashtag, TikTokVideo_B, TikTokUser_B
+from scraper.models import (
+    TikTokVideo, TikTokVideoSnapshot, TikTokUser, Hashtag, TikTokVideo_B,
+    TikTokUser_B, ScrapeCheckpoint, ScrapeWindowWatermark, ApiRequestLedger,
+    IngestJob
+)
 
 
 @admin.register(TikTokVideo)
@@ -24,3 +28,33 @@ class TikTokVideoBAdmin(admin.ModelAdmin):
 @admin.register(TikTokUser_B)
 class TikTokUserBAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(ScrapeCheckpoint)
+class ScrapeCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('mode', 'start_date', 'end_date', 'n_pages', 'completed', 'last_updated')
+    list_filter = ('mode', 'completed')
+
+
+@admin.register(TikTokVideoSnapshot)
+class TikTokVideoSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('video_id', 'scrape_date', 'view_count', 'like_count', 'share_count', 'comment_count')
+    search_fields = ('video_id',)
+
+
+@admin.register(ScrapeWindowWatermark)
+class ScrapeWindowWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('start_date', 'end_date', 'last_refreshed', 'engagement_change', 'n_refreshes')
+
+
+@admin.register(ApiRequestLedger)
+class ApiRequestLedgerAdmin(admin.ModelAdmin):
+    list_display = ('date', 'credential', 'job', 'n_requests', 'finished', 'last_updated')
+    list_filter = ('job', 'finished')
+
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'created_by', 'created', 'status', 'n_records', 'n_processed', 'n_errors')
+    list_filter = ('status',)
+    exclude = ('payload',)
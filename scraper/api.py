@@ -1,8 +1,14 @@
+import hashlib
+import json
 import logging
 from datetime import datetime
+from types import GeneratorType
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.http import Http404
+from django.urls import reverse
 from django.utils.timezone import make_aware
 from http import HTTPStatus
 
@@ -11,24 +17,50 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import authentication, permissions, status
 from rest_framework.generics import ListAPIView
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from scraper.models import TikTokVideo, TikTokVideo_B, TikTokUser_B, Hashtag
-from scraper.scraper import save_video_to_db
+from scraper.models import IngestJob, TikTokVideo, TikTokVideo_B, TikTokUser_B, Hashtag
+from scraper.parsers import NDJSONParser
+from scraper.scraper import save_videos_to_db
+from scraper.tasks import INGEST_CHUNK_SIZE, ingest_videos, iter_chunks, stage_payload
 from scraper.serializers import TikTokVideoSerializer, TikTokVideoBSerializer
 
 logger = logging.getLogger('api_logger')
 
 
+IDEMPOTENCY_IN_PROGRESS = 'in_progress'
+
+
 class ScraperPostAPI(APIView):
     """
     View to remotely add new entries for TikTok videos to the database.
 
-    Expects raw JSON data in the payload.
+    Expects raw JSON data in the payload: either a JSON array or, for large
+    uploads, NDJSON (Content-Type: application/x-ndjson) with one video per
+    line. NDJSON is parsed incrementally from the request stream, and the
+    videos are saved in chunks of INGEST_CHUNK_SIZE, so the memory use does
+    not depend on the size of the upload. Requests must have a
+    Content-Length header; without it, the body would not be read (e.g.,
+    chunked uploads), so they are rejected with 411.
+
+    With the query parameter mode=bulk, the payload is only validated and
+    staged, and the videos are ingested in the background. Responds with
+    202 and the ID of the IngestJob, whose progress can be followed at the
+    returned status_url.
+
+    Clients can send an Idempotency-Key header to safely retry a post
+    (e.g., after a timeout): the response to a key is cached for
+    SCRAPER_IDEMPOTENCY_KEY_TTL seconds and returned again for retries
+    without processing the payload. A retry while the first request is
+    still being processed (for at most SCRAPER_IDEMPOTENCY_LOCK_TTL
+    seconds, in case the worker is killed) is answered with 409, and a
+    reused key with a different payload with 422.
     """
     authentication_classes = [authentication.TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
 
     def get_scrapets(self):
         """
@@ -37,14 +69,69 @@ class ScraperPostAPI(APIView):
         """
         return self.request.query_params.get('scrapets')
 
+    def get_idempotency_cache_key(self):
+        key = self.request.headers.get('Idempotency-Key')
+        if not key:
+            return None
+        return f'scraper_post_idempotency_{self.request.user.pk}_{key}'
+
     def post(self, request, *args, **kwargs):
+        if not request.META.get('CONTENT_LENGTH'):
+            return Response(
+                {'message': 'A Content-Length header is required (chunked uploads are not supported).'},
+                status=status.HTTP_411_LENGTH_REQUIRED
+            )
+
+        cache_key = self.get_idempotency_cache_key()
+        if cache_key is None:
+            return self.ingest(request)
+
+        # The payload is hashed while it is consumed, so NDJSON uploads are
+        # still streamed.
+        digest = hashlib.sha256(request.get_full_path().encode())
+        if not cache.add(cache_key, IDEMPOTENCY_IN_PROGRESS, settings.SCRAPER_IDEMPOTENCY_LOCK_TTL):
+            stored = cache.get(cache_key)
+            if stored is None or stored == IDEMPOTENCY_IN_PROGRESS:
+                return Response(
+                    {'message': 'A request with this Idempotency-Key is still being processed.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            post_data = hash_payload(request.data, digest)
+            if isinstance(post_data, GeneratorType):
+                for _ in post_data:
+                    pass
+            if stored['payload_hash'] != digest.hexdigest():
+                return Response(
+                    {'message': 'This Idempotency-Key was used for a different payload.'},
+                    status=HTTPStatus.UNPROCESSABLE_ENTITY
+                )
+            return Response(stored['data'], status=stored['status'],
+                            headers={'Idempotent-Replayed': 'true'})
+
+        response = None
+        try:
+            response = self.ingest(request, digest)
+        finally:
+            # Only successful results are replayed; failed requests can be retried.
+            if response is not None and status.is_success(response.status_code):
+                cache.set(cache_key, {
+                    'data': response.data,
+                    'status': response.status_code,
+                    'payload_hash': digest.hexdigest(),
+                }, settings.SCRAPER_IDEMPOTENCY_KEY_TTL)
+            else:
+                cache.delete(cache_key)
+        return response
+
+    def ingest(self, request, digest=None):
         post_data = request.data
+        if digest is not None:
+            post_data = hash_payload(post_data, digest)
         post_errors = 0
         n_posted = 0
         scrape_ts = self.get_scrapets()
         if scrape_ts is not None:
             try:
-                print(scrape_ts)
                 scrape_ts = float(scrape_ts)
             except ValueError:
                 msg = (
@@ -56,15 +143,14 @@ class ScraperPostAPI(APIView):
                     status=HTTPStatus.UNPROCESSABLE_ENTITY
                 )
 
-        for entry in post_data:
-            try:
-                save_video_to_db(entry, scrape_ts)
-                n_posted += 1
-            except Exception as e:
-                logger.info(
-                    f'Video: {entry.get("id")}; Exception: {e}'
-                )
-                post_errors += 1
+        if self.request.query_params.get('mode') == 'bulk':
+            return self.post_bulk(post_data, scrape_ts)
+
+        for chunk in iter_chunks(post_data, INGEST_CHUNK_SIZE):
+            videos = [entry for entry in chunk if isinstance(entry, dict)]
+            n_saved = save_videos_to_db(videos, scrape_ts, logger) if videos else 0
+            n_posted += n_saved
+            post_errors += len(chunk) - n_saved
 
         msg = (
             f'Imported {n_posted} records successfully. '
@@ -72,6 +158,103 @@ class ScraperPostAPI(APIView):
         )
         return Response({'message': msg}, status=status.HTTP_201_CREATED)
 
+    def post_bulk(self, post_data, scrape_ts):
+        if not isinstance(post_data, (list, GeneratorType)):
+            return Response(
+                {'message': 'Payload must be a list of videos.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Entries without a valid video ID are counted as errors right away.
+        n_invalid = 0
+
+        def valid_entries():
+            nonlocal n_invalid
+            for entry in post_data:
+                if is_valid_entry(entry):
+                    yield entry
+                else:
+                    n_invalid += 1
+
+        payload, n_staged = stage_payload(valid_entries())
+        job = IngestJob.objects.create(
+            created_by=self.request.user,
+            scrape_ts=scrape_ts,
+            payload=payload,
+            n_records=n_staged + n_invalid,
+            n_processed=n_invalid,
+            n_errors=n_invalid,
+        )
+        if settings.DEBUG:
+            ingest_videos(job.pk)
+        else:
+            transaction.on_commit(lambda: ingest_videos.delay(job.pk))
+
+        return Response({
+            'job_id': job.pk,
+            'status_url': reverse('scraper_ingest_job_api', kwargs={'job_id': job.pk}),
+            'n_records': job.n_records,
+            'n_errors': job.n_errors,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+def hash_payload(post_data, digest):
+    """
+    Add a payload to digest. Lists and NDJSON generators are returned as
+    generators hashing each entry when it is consumed, other payloads are
+    hashed right away and returned unchanged.
+    """
+    if not isinstance(post_data, (list, GeneratorType)):
+        digest.update(json.dumps(post_data, sort_keys=True).encode())
+        return post_data
+    return iter_hashed(post_data, digest)
+
+
+def iter_hashed(entries, digest):
+    for entry in entries:
+        digest.update(json.dumps(entry, sort_keys=True).encode() + b'\n')
+        yield entry
+
+
+def is_valid_entry(entry):
+    if not isinstance(entry, dict):
+        return False
+    try:
+        int(entry.get('id'))
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+class IngestJobStatusAPI(APIView):
+    """
+    Endpoint to get (GET) the status of a bulk ingest job started with
+    ScraperPostAPI.
+
+    Examples:
+        GET api/post/jobs/<job_id>/
+    """
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            job = IngestJob.objects.get(
+                pk=self.kwargs.get('job_id'), created_by=request.user)
+        except IngestJob.DoesNotExist:
+            raise Http404('Ingest job not found')
+
+        return Response({
+            'job_id': job.pk,
+            'status': job.status,
+            'n_records': job.n_records,
+            'n_processed': job.n_processed,
+            'n_errors': job.n_errors,
+            'error_message': job.error_message,
+            'created': job.created,
+            'finished': job.finished,
+        })
+
 
 class LargeResultsSetPagination(PageNumberPagination):
     page_size = 1000
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from scraper.management.commands.benchmark_page_parsing import make_synthetic_page
+from scraper.TikTok_Content_Scraper.TT_Scraper._extract_rehydration_data import (
+    extract_rehydration_data
+)
+from scraper.TikTok_Content_Scraper.TT_Scraper._json_codec import get_codec, orjson
+from scraper.utils.fake_api import FakeResearchAPI
+
+
+def make_payloads():
+    """Return typical payloads of the scrapers by name."""
+    api = FakeResearchAPI(pages=1)
+    params = {'start_date': '20250101', 'end_date': '20250101', 'max_count': 100}
+    _, api_page = api.query_videos(params, None)
+    rehydration = extract_rehydration_data(make_synthetic_page(), get_codec('json'))
+    item = rehydration['__DEFAULT_SCOPE__']['webapp.video-detail']['itemInfo']['itemStruct']
+    metadata_package = {
+        'video_metadata': {**item, 'comments': [{'text': 'Kommentar äöü', 'digg_count': 3}] * 50},
+        'file_metadata': {'filepath': 'data/tiktok_1_*', 'duration': 15},
+        'music_metadata': {'id': 7068650753636501506},
+        'author_metadata': {'id': '6789', 'username': 'someuser'},
+        'hashtags_metadata': [],
+    }
+    return {
+        'Research API page': (api_page, False),
+        'Rehydration data': (rehydration, False),
+        'Metadata file': (metadata_package, True),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the CPU time of decoding and encoding typical scraper payloads '
+        'with the JSON codecs (standard library and, if installed, orjson).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def measure(self, function, repeat):
+        start = time.process_time()
+        for _ in range(repeat):
+            function()
+        return (time.process_time() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        codecs = [get_codec('json')]
+        if orjson is not None:
+            codecs.append(get_codec('orjson'))
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed; only measuring json'))
+
+        for name, (payload, indent) in make_payloads().items():
+            encoded = codecs[0].dumps(payload, indent=indent)
+            self.stdout.write(f'{name} ({len(encoded) / 1024:.0f} KB):')
+            for codec in codecs:
+                loads = self.measure(lambda: codec.loads(encoded), repeat)
+                dumps = self.measure(lambda: codec.dumps(payload, indent=indent), repeat)
+                self.stdout.write(
+                    f'  {codec.name:>6}: loads {loads:.3f} ms, dumps {dumps:.3f} ms')
+        self.stdout.write(self.style.SUCCESS('Done'))
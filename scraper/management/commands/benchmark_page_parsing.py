@@ -0,0 +1,105 @@
+import json
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand, CommandError
+
+from scraper.TikTok_Content_Scraper.TT_Scraper._extract_rehydration_data import (
+    extract_rehydration_data
+)
+
+
+def make_synthetic_page(n_elements=3000):
+    """
+    Build a page resembling a TikTok video page: a large document with the
+    rehydration script (about 100 KB of JSON) in the middle.
+    """
+    item = {
+        'id': '7445371706207669526',
+        'desc': 'Some description #hashtag1 #hashtag2',
+        'stats': {'diggCount': 146, 'shareCount': 8, 'commentCount': 25, 'playCount': 1318},
+        'contents': [{'desc': 'Some description', 'textExtra': []}] * 20,
+    }
+    # The rehydration data of real pages also contains app state, e.g., lists
+    # of related videos.
+    related = [{**item, 'id': str(int(item['id']) + i)} for i in range(1, 100)]
+    data = {'__DEFAULT_SCOPE__': {
+        'webapp.video-detail': {'itemInfo': {'itemStruct': item}},
+        'webapp.related-videos': {'itemList': related},
+    }}
+    head = ''.join(
+        f'<link rel="preload" href="https://example.com/static/{i}.js" as="script">'
+        for i in range(200)
+    )
+    body = ''.join(
+        f'<div class="css-{i}"><span data-e2e="item-{i}">Item {i} &amp; more</span></div>'
+        for i in range(n_elements)
+    )
+    script = (
+        '<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+        f'{json.dumps(data)}</script>'
+    )
+    return f'<!DOCTYPE html><html><head>{head}</head><body>{body}{script}{body}</body></html>'.encode()
+
+
+def parse_with_soup(content):
+    soup = BeautifulSoup(content.decode('utf-8'), 'html.parser')
+    tt_script = soup.find('script', attrs={'id': '__UNIVERSAL_DATA_FOR_REHYDRATION__'})
+    return json.loads(tt_script.string)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the CPU time per page of extracting the rehydration data from '
+        'recorded TikTok video pages, by slicing the raw bytes and by parsing '
+        'the page with BeautifulSoup.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'pages',
+            nargs='*',
+            type=str,
+            help='Recorded HTML pages or directories of them (default: a synthetic page).'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def load_pages(self, paths):
+        if not paths:
+            return [make_synthetic_page()]
+        pages = []
+        for path in map(Path, paths):
+            files = sorted(path.glob('*.html')) if path.is_dir() else [path]
+            pages.extend(file.read_bytes() for file in files)
+        if not pages:
+            raise CommandError('No pages found')
+        return pages
+
+    def measure(self, parse, pages, repeat):
+        start = time.process_time()
+        for _ in range(repeat):
+            for page in pages:
+                parse(page)
+        return (time.process_time() - start) / (repeat * len(pages))
+
+    def handle(self, *args, **options):
+        pages = self.load_pages(options['pages'])
+        repeat = options['repeat']
+
+        n_fallback = sum(extract_rehydration_data(page) is None for page in pages)
+        mismatches = sum(
+            extract_rehydration_data(page) != parse_with_soup(page)
+            for page in pages if extract_rehydration_data(page) is not None
+        )
+        sliced = self.measure(extract_rehydration_data, pages, repeat)
+        soup = self.measure(parse_with_soup, pages, repeat)
+
+        avg_size = sum(len(page) for page in pages) / len(pages) / 1024
+        self.stdout.write(f'{len(pages)} pages, {avg_size:.0f} KB on average, {repeat} repetitions')
+        self.stdout.write(f'Byte slicing: {sliced * 1000:.2f} ms CPU per page')
+        self.stdout.write(f'BeautifulSoup: {soup * 1000:.2f} ms CPU per page')
+        self.stdout.write(self.style.SUCCESS(
+            f'Speedup: {soup / sliced:.0f}x; {n_fallback} pages need the soup fallback, '
+            f'{mismatches} results differ'
+        ))
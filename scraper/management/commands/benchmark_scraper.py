@@ -0,0 +1,107 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from scraper.models import ScrapeCheckpoint
+from scraper.scraper import (
+    get_tt_videos_new_day,
+    get_tt_videos_update_account_data,
+    setup_logger
+)
+from scraper.utils.fake_api import FakeResearchAPI, FakeResearchAPIServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the pages/sec and rows/sec of the scrape_and_save modes '
+        'against a local fake Research API. All database writes are rolled '
+        'back afterwards unless --keep is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            type=str,
+            choices=['day', 'accounts'],
+            default='day',
+            help='Scrape function to benchmark (new day or account history update).'
+        )
+        parser.add_argument('--date', type=str, default='20250101')
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=20,
+            help='Number of result pages per date window (100 videos each).'
+        )
+        parser.add_argument('--latency', type=float, default=0.05)
+        parser.add_argument('--error_rate', type=float, default=0.0)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=1,
+            help='Number of query shards (day mode only).'
+        )
+        parser.add_argument('--requests_per_minute', type=float, default=60000)
+        parser.add_argument(
+            '--backoff',
+            type=float,
+            default=0.1,
+            help='Seconds requests pause after an (injected) error.'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the fake videos in the database.'
+        )
+
+    def handle(self, *args, **options):
+        logger = setup_logger(f'benchmark_{options["mode"]}')
+        api = FakeResearchAPI(
+            pages=options['pages'],
+            latency=options['latency'],
+            error_rate=options['error_rate']
+        )
+        rate = options['requests_per_minute']
+
+        with FakeResearchAPIServer(api) as server, override_settings(
+            TT_API_BASE_URL=server.url,
+            # Keep the fake token out of the shared token cache.
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            SCRAPER_REQUESTS_PER_MINUTE=rate,
+            SCRAPER_MAX_REQUESTS_PER_MINUTE=rate,
+            SCRAPER_BASE_BACKOFF=options['backoff'],
+            SCRAPER_ARCHIVE_RAW_PAGES=False,
+            # Neither limited by nor counted against the real request quota.
+            SCRAPER_DAILY_REQUEST_QUOTA=0
+        ):
+            self.stdout.write(f'Benchmarking mode {options["mode"]} against {server.url}...')
+            started = timezone.now()
+            start = time.monotonic()
+            with transaction.atomic():
+                if options['mode'] == 'day':
+                    get_tt_videos_new_day(specific_date=options['date'], logger=logger,
+                                          query_shards=options['shards'])
+                else:
+                    get_tt_videos_update_account_data(
+                        logger=logger, max_workers=options['workers'])
+                elapsed = time.monotonic() - start
+                n_incomplete = ScrapeCheckpoint.objects.filter(
+                    last_updated__gte=started, completed=False).count()
+                if not options['keep']:
+                    transaction.set_rollback(True)
+
+        stats = api.stats()
+        msg = (
+            f'{stats["pages"]} pages / {stats["videos"]} rows in {elapsed:.2f}s: '
+            f'{stats["pages"] / elapsed:.1f} pages/sec, {stats["videos"] / elapsed:.1f} rows/sec '
+            f'({stats["errors"]} injected errors)'
+        )
+        logger.info(msg)
+        if n_incomplete:
+            raise CommandError(
+                f'Truncated run, {n_incomplete} date windows did not complete: {msg}')
+        self.stdout.write(self.style.SUCCESS(msg))
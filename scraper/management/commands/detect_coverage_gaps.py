@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from scraper.scraper import (
+    get_formatted_date,
+    get_rate_limiter,
+    get_request_budget,
+    get_tt_videos_new_day,
+    setup_logger
+)
+from scraper.utils.coverage import find_coverage_gaps
+from scraper.utils.window_splitter import DATE_FORMAT
+
+
+def backfill_day_in_thread(date, logger, rate_limiter, budget):
+    """Rescrape a day in a worker thread, which uses its own DB connection."""
+    try:
+        get_tt_videos_new_day(specific_date=date, logger=logger,
+                              rate_limiter=rate_limiter, budget=budget)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Flag days whose number of scraped videos dips below a rolling '
+        'baseline and optionally rescrape them (like scrape_and_save --mode=day).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=str,
+            help='First day to check in YYYYMMDD format (default: 60 days before --end).'
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='Last day to check in YYYYMMDD format (default: the day scraped by --mode=past_day).'
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=14,
+            help='Number of preceding days the rolling median baseline is computed from.'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.5,
+            help='Days with fewer videos than threshold * baseline are flagged.'
+        )
+        parser.add_argument(
+            '--min_baseline',
+            type=int,
+            default=10,
+            help='Days with a lower baseline are never flagged.'
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Rescrape the flagged days.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Number of days rescraped at the same time (sharing one request rate).'
+        )
+
+    def backfill(self, dates, workers, logger, budget):
+        """Yield (date, exception or None) as days finish rescraping."""
+        # All days share one request rate.
+        rate_limiter = get_rate_limiter(logger=logger)
+        if workers <= 1:
+            for date in dates:
+                try:
+                    get_tt_videos_new_day(specific_date=date, logger=logger,
+                                          rate_limiter=rate_limiter, budget=budget)
+                    yield date, None
+                except Exception as e:
+                    yield date, e
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(backfill_day_in_thread, date, logger,
+                                rate_limiter, budget): date
+                for date in dates
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.exception()
+
+    def handle(self, *args, **options):
+        logger = setup_logger('coverage_gaps')
+        end = options['end'] or get_formatted_date()
+        start = options['start'] or (
+            datetime.strptime(end, DATE_FORMAT) - timedelta(days=60)).strftime(DATE_FORMAT)
+
+        gaps = find_coverage_gaps(
+            start, end, window=options['window'], threshold=options['threshold'],
+            min_baseline=options['min_baseline']
+        )
+        for day, count, baseline in gaps:
+            msg = f'{day.strftime(DATE_FORMAT)}: {count} videos (baseline {baseline:g})'
+            logger.info(f'Coverage gap {msg}')
+            self.stdout.write(msg)
+        self.stdout.write(f'Found {len(gaps)} coverage gaps between {start} and {end}')
+
+        if not options['backfill'] or not gaps:
+            return
+
+        dates = [day.strftime(DATE_FORMAT) for day, _, _ in gaps]
+        workers = max(1, min(options['workers'], len(dates)))
+        logger.info(f'Backfilling {len(dates)} days with {workers} worker(s)')
+
+        # All days share the 'backfill' share of the daily request quota.
+        budget = get_request_budget('backfill', logger)
+        n_failed = 0
+        for date, error in self.backfill(dates, workers, logger, budget):
+            if error is not None:
+                n_failed += 1
+                logger.error(f'Backfill of {date} failed: {error}')
+        if budget is not None:
+            budget.finish(completed=n_failed == 0 and not budget.exhausted())
+
+        msg = f'Backfilled {len(dates) - n_failed}/{len(dates)} days'
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
+
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from scraper.scraper import save_videos_to_db, setup_logger
+from scraper.utils.archive import find_shards, iter_shard_pages
+
+
+def replay_shard(shard_path, logger):
+    """Re-ingest all pages of a shard. Returns the number of pages and videos."""
+    n_pages = 0
+    n_videos = 0
+    for record in iter_shard_pages(shard_path):
+        videos = record['data'].get('videos')
+        if videos:
+            save_videos_to_db(videos, record['scrape_ts'], logger)
+            n_videos += len(videos)
+        n_pages += 1
+    return n_pages, n_videos
+
+
+def replay_shard_in_thread(shard_path, logger):
+    """Replay a shard in a worker thread, which uses its own DB connection."""
+    try:
+        return replay_shard(shard_path, logger)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-ingest archived raw Research API pages into the database '
+        'without calling the API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='Shard files or archive/run directories to replay (default: the whole archive).'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of shards ingested in parallel (use 1 with SQLite).'
+        )
+
+    def replay(self, shards, workers, logger):
+        """Yield (shard, (n_pages, n_videos)) as shards finish replaying."""
+        if workers <= 1:
+            for shard in shards:
+                yield shard, replay_shard(shard, logger)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(replay_shard_in_thread, shard, logger): shard
+                for shard in shards
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [settings.SCRAPER_RAW_ARCHIVE_DIR]
+        workers = options['workers']
+        logger = setup_logger('replay')
+
+        shards = find_shards(paths)
+        logger.info(f'Replaying {len(shards)} shards with {workers} worker(s)')
+        self.stdout.write(f'Replaying {len(shards)} shards with {workers} worker(s)...')
+
+        total_pages = 0
+        total_videos = 0
+        for shard, (n_pages, n_videos) in self.replay(shards, workers, logger):
+            total_pages += n_pages
+            total_videos += n_videos
+            logger.info(f'Replayed {shard}: {n_pages} pages, {n_videos} videos')
+
+        msg = f'Replayed {total_pages} pages with {total_videos} videos from {len(shards)} shards'
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
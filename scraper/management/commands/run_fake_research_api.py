@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from scraper.utils.fake_api import FakeResearchAPI, FakeResearchAPIServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local fake of the TikTok Research API token and video query '
+        'endpoints (point TT_API_BASE_URL to it).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=5,
+            help='Number of result pages per date window.'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.0,
+            help='Seconds each request is delayed.'
+        )
+        parser.add_argument(
+            '--error_rate',
+            type=float,
+            default=0.0,
+            help='Share of video queries answered with an internal_error or invalid_params error.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        api = FakeResearchAPI(
+            pages=options['pages'],
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            seed=options['seed']
+        )
+        server = FakeResearchAPIServer(api, options['host'], options['port'])
+        self.stdout.write(self.style.SUCCESS(f'Fake Research API running at {server.url}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        self.stdout.write(f'Served {api.stats()}')
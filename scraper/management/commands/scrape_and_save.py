@@ -32,11 +32,42 @@ class Command(BaseCommand):
             type=str,
             help='Specific date to scrape in YYYYMMDD format (only used with --mode=day)'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of date windows fetched concurrently when updating account data.'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            help=('Number of parallel sub-queries the usernames and hashtags of a day are split into '
+                  '(with --resume, the shards of the interrupted run are reused).')
+        )
+        parser.add_argument(
+            '--requests_per_minute',
+            type=float,
+            help='Initial Research API request rate shared by all workers (adapts to API responses).'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue from the last checkpoint instead of starting from the first page.'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only refresh account history windows that are due (recent windows daily, older ones less often).'
+        )
 
     def handle(self, *args, **options):
         mode = options['mode']
         date = options.get('date')
         is_test = mode == 'all_test'
+        workers = options.get('workers')
+        shards = options.get('shards')
+        requests_per_minute = options.get('requests_per_minute')
+        resume = options.get('resume')
+        incremental = options.get('incremental')
 
         # Setup single logger for entire session
         logger = setup_logger(f'command_{mode}')
@@ -47,28 +78,44 @@ class Command(BaseCommand):
             logger.info('TEST MODE: Will stop after first successful request')
         if date:
             logger.info(f'Target date: {date}')
+        if resume:
+            logger.info('Resuming from last checkpoints')
 
         try:
             if mode in ['all', 'all_test']:
                 logger.info('Running complete scraping...')
-                get_tt_videos_new_day(logger=logger, test_mode=is_test)
-                get_tt_videos_update_account_data(logger=logger, test_mode=is_test)
+                get_tt_videos_new_day(
+                    logger=logger, test_mode=is_test,
+                    requests_per_minute=requests_per_minute, resume=resume,
+                    query_shards=shards)
+                get_tt_videos_update_account_data(
+                    logger=logger, test_mode=is_test, max_workers=workers,
+                    requests_per_minute=requests_per_minute, resume=resume,
+                    incremental=incremental)
             
             elif mode == 'day':
                 if not date:
                     logger.error('No date provided for day mode')
                     return
                 logger.info(f'Scraping specific day: {date}')
-                get_tt_videos_new_day(specific_date=date, logger=logger)
+                get_tt_videos_new_day(
+                    specific_date=date, logger=logger,
+                    requests_per_minute=requests_per_minute, resume=resume,
+                    query_shards=shards)
             
             elif mode == 'past_day':
                 past_date = get_formatted_date()
                 logger.info(f'Scraping past day (4 days ago): {past_date}')
-                get_tt_videos_new_day(logger=logger)
+                get_tt_videos_new_day(
+                    logger=logger, requests_per_minute=requests_per_minute, resume=resume,
+                    query_shards=shards)
             
             elif mode == 'accounts':
                 logger.info('Updating account data only...')
-                get_tt_videos_update_account_data(logger=logger)
+                get_tt_videos_update_account_data(
+                    logger=logger, max_workers=workers,
+                    requests_per_minute=requests_per_minute, resume=resume,
+                    incremental=incremental)
 
             logger.info('Scraping completed successfully')
             self.stdout.write(self.style.SUCCESS('Scraping completed successfully'))
@@ -1,3 +1,6 @@
+import subprocess
+import sys
+
 from django.core.management.base import BaseCommand
 from scraper.scraper_B import (
     setup_logger,
@@ -30,11 +33,40 @@ class Command(BaseCommand):
             '''
         )
 
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help='Number of video pages requested concurrently (default: SCRAPER_B_CONCURRENCY).'
+        )
+
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes claiming disjoint batches of videos (default: 1).'
+        )
+
+    def spawn_workers(self, options, logger):
+        """Run the scraper in several worker processes and wait for them."""
+        command = [sys.executable, sys.argv[0], 'startscraperB', '--mode', options['mode']]
+        if options['download_files']:
+            command += ['--download_files', 'True']
+        if options['concurrency']:
+            command += ['--concurrency', str(options['concurrency'])]
+
+        processes = [subprocess.Popen(command) for _ in range(options['workers'])]
+        logger.info(f'Started {len(processes)} workers: {[p.pid for p in processes]}')
+        n_failed = sum(process.wait() != 0 for process in processes)
+        if n_failed:
+            raise RuntimeError(f'{n_failed}/{len(processes)} workers failed')
+
     def handle(self, *args, **options):
         mode = options['mode']
         is_test = mode == 'test'
 
         download_files = options['download_files']
+        concurrency = options['concurrency']
 
         # Setup single logger for entire session
         logger = setup_logger(f'command_{mode}')
@@ -45,13 +77,18 @@ class Command(BaseCommand):
             logger.info('TEST MODE: Will stop after first successful request')
 
         try:
-            if mode == 'production':
+            if options['workers'] > 1:
+                self.spawn_workers(options, logger)
+
+            elif mode == 'production':
                 logger.info('Running complete scraping...')
-                collect_metadata_for_all(logger=logger, test_mode=False, scrape_content=download_files)
+                collect_metadata_for_all(logger=logger, test_mode=False, scrape_content=download_files,
+                                         concurrency=concurrency)
             
             elif mode == 'test':
                 logger.info('Running test mode...')
-                collect_metadata_for_all(logger=logger, test_mode=True, scrape_content=download_files)
+                collect_metadata_for_all(logger=logger, test_mode=True, scrape_content=download_files,
+                                         concurrency=concurrency)
             
             logger.info('Scraping completed successfully')
             self.stdout.write(self.style.SUCCESS('Scraping completed successfully'))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0018_alter_tiktokvideo_b_suggested_words'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(max_length=50)),
+                ('start_date', models.CharField(max_length=8)),
+                ('end_date', models.CharField(max_length=8)),
+                ('cursor', models.IntegerField(default=0)),
+                ('search_id', models.CharField(blank=True, default='', max_length=255)),
+                ('completed', models.BooleanField(default=False)),
+                ('n_pages', models.IntegerField(default=0)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='scrapecheckpoint',
+            constraint=models.UniqueConstraint(fields=('mode', 'start_date', 'end_date'), name='unique_checkpoint_per_window'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0019_scrapecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeWindowWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.CharField(max_length=8)),
+                ('end_date', models.CharField(max_length=8)),
+                ('last_refreshed', models.DateTimeField(blank=True, null=True)),
+                ('n_refreshes', models.IntegerField(default=0)),
+                ('engagement_total', models.BigIntegerField(blank=True, null=True)),
+                ('engagement_change', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='scrapewindowwatermark',
+            constraint=models.UniqueConstraint(fields=('start_date', 'end_date'), name='unique_watermark_per_window'),
+        ),
+    ]
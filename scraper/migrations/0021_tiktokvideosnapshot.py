@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0020_scrapewindowwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TikTokVideoSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.BigIntegerField()),
+                ('scrape_date', models.DateTimeField()),
+                ('comment_count', models.IntegerField(null=True)),
+                ('like_count', models.IntegerField(null=True)),
+                ('share_count', models.IntegerField(null=True)),
+                ('view_count', models.IntegerField(null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tiktokvideosnapshot',
+            constraint=models.UniqueConstraint(fields=('video_id', 'scrape_date'), name='unique_snapshot_per_scrape'),
+        ),
+    ]
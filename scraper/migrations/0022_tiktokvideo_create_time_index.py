@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0021_tiktokvideosnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tiktokvideo',
+            name='create_time',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
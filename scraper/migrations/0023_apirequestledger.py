@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0022_tiktokvideo_create_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiRequestLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('credential', models.CharField(max_length=255)),
+                ('job', models.CharField(max_length=50)),
+                ('n_requests', models.IntegerField(default=0)),
+                ('finished', models.BooleanField(default=False)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='apirequestledger',
+            constraint=models.UniqueConstraint(fields=('date', 'credential', 'job'), name='unique_ledger_entry_per_job'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0024_ingestjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tiktokvideo_b',
+            name='lease_expires',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tiktokvideo_b',
+            name='lease_owner',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper', '0025_tiktokvideo_b_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapecheckpoint',
+            name='query',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
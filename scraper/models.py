@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.utils.timezone import make_aware
 from datetime import datetime
@@ -64,7 +65,7 @@ class TikTokUser_B(models.Model):
 class TikTokVideo(models.Model):
     video_id = models.BigIntegerField(unique=True)
     video_description = models.TextField(null=True, blank=True)
-    create_time = models.DateTimeField()
+    create_time = models.DateTimeField(db_index=True)
     author_id = models.ForeignKey(
         TikTokUser,
         on_delete=models.SET_NULL,
@@ -92,6 +93,31 @@ class TikTokVideo(models.Model):
         return str(self.video_id)
 
 
+class TikTokVideoSnapshot(models.Model):
+    """
+    Engagement counters of a TikTokVideo at a scrape date. Appended on every
+    scrape, while the TikTokVideo columns hold the latest values.
+    """
+    video_id = models.BigIntegerField()
+    scrape_date = models.DateTimeField()
+
+    comment_count = models.IntegerField(null=True)
+    like_count = models.IntegerField(null=True)
+    share_count = models.IntegerField(null=True)
+    view_count = models.IntegerField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['video_id', 'scrape_date'],
+                name='unique_snapshot_per_scrape'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.video_id} ({self.scrape_date})'
+
+
 class TikTokVideo_B(models.Model):
     video_id = models.CharField(max_length=100, unique=True)
     video_description = models.TextField(null=True, blank=True)
@@ -178,6 +204,9 @@ class TikTokVideo_B(models.Model):
         blank=True,
         default=None
     )
+    # Claim of a scraper B worker on the video (expired leases can be claimed again).
+    lease_owner = models.CharField(max_length=255, null=True, blank=True)
+    lease_expires = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         verbose_name = "TikTok Video (scraper B)"
@@ -185,3 +214,122 @@ class TikTokVideo_B(models.Model):
 
     def __str__(self):
         return str(self.video_id)
+
+
+class ScrapeCheckpoint(models.Model):
+    """
+    Pagination progress of a Research API scrape for a single date window.
+    Updated after each persisted page, so interrupted runs can be resumed.
+    """
+    mode = models.CharField(max_length=50)
+    start_date = models.CharField(max_length=8)  # YYYYMMDD
+    end_date = models.CharField(max_length=8)  # YYYYMMDD
+
+    cursor = models.IntegerField(default=0)
+    search_id = models.CharField(max_length=255, blank=True, default='')
+    completed = models.BooleanField(default=False)
+    n_pages = models.IntegerField(default=0)
+    last_updated = models.DateTimeField(auto_now=True)
+    # Usernames and hashtags of a query shard, so that a resumed scrape
+    # continues each cursor with the query it belongs to.
+    query = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['mode', 'start_date', 'end_date'],
+                name='unique_checkpoint_per_window'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.mode}: {self.start_date}-{self.end_date}'
+
+
+class ScrapeWindowWatermark(models.Model):
+    """
+    Refresh state of a date window of the account history. Used to refresh
+    old windows, whose engagement barely changes, less often than recent ones.
+    """
+    start_date = models.CharField(max_length=8)  # YYYYMMDD
+    end_date = models.CharField(max_length=8)  # YYYYMMDD
+
+    last_refreshed = models.DateTimeField(null=True, blank=True)
+    n_refreshes = models.IntegerField(default=0)
+    # Sum of views, likes, shares and comments of the window's videos.
+    engagement_total = models.BigIntegerField(null=True, blank=True)
+    # Relative change of engagement_total during the last refresh.
+    engagement_change = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['start_date', 'end_date'],
+                name='unique_watermark_per_window'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.start_date}-{self.end_date}'
+
+
+class ApiRequestLedger(models.Model):
+    """
+    Number of Research API requests made per day, API credential and scrape
+    job. Used to divide the daily request quota between the jobs.
+    """
+    date = models.DateField()
+    credential = models.CharField(max_length=255)
+    job = models.CharField(max_length=50)
+
+    n_requests = models.IntegerField(default=0)
+    # Set when the job completed its work for the day (releasing the rest
+    # of its share of the quota to lower priority jobs).
+    finished = models.BooleanField(default=False)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'credential', 'job'],
+                name='unique_ledger_entry_per_job'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.job}: {self.n_requests}'
+
+
+class IngestJob(models.Model):
+    """
+    Batch of videos posted to the bulk mode of the scraper post API. The
+    payload is staged as zlib-compressed JSON and ingested by a Celery task.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+
+    scrape_ts = models.FloatField(null=True, blank=True)
+    # Cleared once the job has been ingested.
+    payload = models.BinaryField(null=True, blank=True)
+
+    n_records = models.IntegerField(default=0)
+    n_processed = models.IntegerField(default=0)
+    n_errors = models.IntegerField(default=0)
+    error_message = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f'IngestJob {self.pk} ({self.status})'
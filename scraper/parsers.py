@@ -0,0 +1,31 @@
+import json
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON (one video per line).
+
+    The request stream is read line by line while the returned generator is
+    consumed, so request.data is never held in memory as a whole. Lines that
+    are not valid JSON are yielded as None; empty lines are skipped.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return iter_ndjson(stream, encoding)
+
+
+def iter_ndjson(lines, encoding='utf-8'):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line.decode(encoding))
+        except ValueError:
+            yield None
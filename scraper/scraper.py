@@ -7,17 +7,57 @@ import requests
 import time
 from datetime import datetime, date, timedelta
 
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from django.utils.timezone import make_aware
 from dotenv import load_dotenv
 from scraper.hashtags import HASHTAG_LIST
-from scraper.models import TikTokVideo, Hashtag, TikTokUser
+from scraper.models import TikTokVideo, TikTokVideoSnapshot, Hashtag, TikTokUser
+from scraper.utils.access_token import AccessTokenManager
+from scraper.utils.archive import RawPageArchive
+from scraper.utils.checkpoints import get_checkpoint, update_checkpoint
+from scraper.utils.http import get_session, log_connection_stats
+from scraper.utils.json_codec import get_json_codec
+from scraper.utils.pipeline import fan_out_windows
+from scraper.utils.quota import RequestBudget, RequestBudgetExhausted
+from scraper.utils.query_shards import (
+    QueryShard, get_query_weights, load_query_shards, plan_query_shards
+)
+from scraper.utils.rate_limiter import AdaptiveRateLimiter, get_backoff_delay
+from scraper.utils.seen_filter import SeenVideoFilter
+from scraper.utils.watermarks import get_due_windows, record_window_refresh
+from scraper.utils.window_splitter import (
+    bisect_window, get_daily_video_counts, split_dense_windows
+)
 import warnings
 
 warnings.filterwarnings('ignore', category=Warning)
 
 load_dotenv()
 
+ENGAGEMENT_FIELDS = ['comment_count', 'like_count', 'share_count', 'view_count']
+# Fields requested from the Research API: "full" for discovering new videos,
+# "engagement" for refreshing the counters of known videos.
+FIELD_PROFILES = {
+    'full': [
+        'id',
+        'video_description',
+        'create_time',
+        'region_code',
+        'share_count',
+        'view_count',
+        'like_count',
+        'comment_count',
+        'music_id',
+        'hashtag_names',
+        'username',
+        'voice_to_text'
+    ],
+    'engagement': ['id'] + ENGAGEMENT_FIELDS,
+}
+RETRYABLE_ERROR_CODES = ['internal_error', 'invalid_params', 'rate_limit_exceeded']
+
 def setup_logger(mode, existing_logger=None):
     """Setup logger for a specific scrape session or return existing logger."""
     if existing_logger:
@@ -109,13 +149,17 @@ def get_formatted_date(delay=4):
     return formatted_date
 
 
-def request_access_token():
-    """ Function to make first call to API to get the access token. """
+def fetch_access_token():
+    """
+    Make a call to the API to get a new access token.
+
+    Returns the decoded response containing 'access_token' and 'expires_in'.
+    """
     client_key = os.environ.get('TT_API_CLIENT_KEY')
     client_secret = os.environ.get('TT_API_CLIENT_SECRET')
 
     # Set request parameters.
-    base_url = 'https://open.tiktokapis.com/v2/oauth/token/'
+    base_url = get_api_url('/v2/oauth/token/')
     headers = {
         'Content-Type': 'application/x-www-form-urlencoded',
         'Cache-Control': 'no-cache'
@@ -127,10 +171,22 @@ def request_access_token():
     }
 
     # Request bearer auth token.
-    response = requests.post(base_url, headers=headers, data=payload)
-    response_as_json = response.json()
-    access_token = response_as_json['access_token']
-    return access_token
+    response = get_session().post(base_url, headers=headers, data=payload)
+    return response.json()
+
+
+access_token_manager = AccessTokenManager(
+    fetch_access_token,
+    cache_key=f'tt_api_access_token_{os.environ.get("TT_API_CLIENT_KEY")}'
+)
+
+
+def request_access_token():
+    """
+    Return the access token for the API. The token is cached and only
+    requested anew shortly before it expires.
+    """
+    return access_token_manager.get_token()
 
 
 def log_server_ip(logger=None):
@@ -139,71 +195,96 @@ def log_server_ip(logger=None):
         logger = setup_logger('ip_check')
         
     try:
-        response = requests.get('https://api.ipify.org?format=json')
+        response = get_session().get('https://api.ipify.org?format=json')
         logger.info(f'Server IP: {response.json()["ip"]}')
     except Exception as e:
         logger.error(f"Error checking server IP: {str(e)}")
     return
 
 
-def get_video_query_url():
-    base_url = 'https://open.tiktokapis.com/v2/research/video/query/'
-    query_fields = [
-        'id',
-        'video_description',
-        'create_time',
-        'region_code',
-        'share_count',
-        'view_count',
-        'like_count',
-        'comment_count',
-        'music_id',
-        'hashtag_names',
-        'username',
-        'voice_to_text'
-    ]
+def get_api_url(path):
+    """Return the URL of an API endpoint (see settings.TT_API_BASE_URL)."""
+    return settings.TT_API_BASE_URL.rstrip('/') + path
+
+
+def get_video_query_url(field_profile='full'):
+    """
+    Return the video query URL requesting the fields of field_profile (see
+    FIELD_PROFILES).
+    """
+    base_url = get_api_url('/v2/research/video/query/')
+    query_fields = FIELD_PROFILES[field_profile]
     query_url = base_url + '?fields=' + ','.join(query_fields)
     return query_url
 
 
-def make_api_request(url, headers, query_params, max_retries=3, retry_delay=10, logger=None):
-    """Generic function to make API requests with retry logic."""
+def make_api_request(url, headers, query_params, max_retries=3, retry_delay=10,
+                     logger=None, rate_limiter=None, budget=None):
+    """
+    Generic function to make API requests with retry logic.
+
+    If a rate_limiter is given, every attempt waits for the limiter and
+    failed attempts as well as HTTP 429 responses make the limiter back off.
+    Otherwise, failed attempts are retried after an exponential backoff
+    with jitter. Every attempt is reserved in the request budget, if given,
+    and RequestBudgetExhausted is raised when the budget does not allow it.
+    """
     if logger is None:
         logger = setup_logger('api_request')
+    codec = get_json_codec()
         
     for attempt in range(max_retries):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        if budget is not None and not budget.try_consume():
+            raise RequestBudgetExhausted(f'Request budget of {budget.job} exhausted')
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(query_params))
-            #print(response)
-            #print(response.status_code)
+            # Always use the current token so expired tokens get replaced.
+            access_token = request_access_token()
+            request_headers = {**headers, 'Authorization': f'Bearer {access_token}'}
+            response = get_session().post(url, headers=request_headers, data=codec.dumps(query_params))
             logger.debug(f"Response status code: {response.status_code}")
-            return response.json()
+            if response.status_code == 401 and attempt < max_retries - 1:
+                logger.warning('Access token was rejected. Requesting a new token.')
+                access_token_manager.invalidate(access_token)
+                continue
+            if response.status_code == 429 and attempt < max_retries - 1:
+                logger.warning(f"Attempt {attempt + 1}/{max_retries}: Rate limit hit (HTTP 429).")
+                _back_off(attempt, retry_delay, rate_limiter)
+                continue
+            return codec.loads(response.content)
         except (json.JSONDecodeError, requests.RequestException) as e:
             if attempt < max_retries - 1:
                 logger.warning(
-                    f"Attempt {attempt + 1}/{max_retries}: Request failed: {str(e)}. "
-                    f"Retrying in {retry_delay} seconds..."
+                    f"Attempt {attempt + 1}/{max_retries}: Request failed: {str(e)}. Retrying..."
                 )
-                time.sleep(retry_delay)
+                _back_off(attempt, retry_delay, rate_limiter)
                 continue
             logger.error(f"Failed after {max_retries} attempts: {str(e)}")
             raise
 
 
+def _back_off(attempt, retry_delay, rate_limiter=None):
+    """Let the rate limiter back off or sleep for an exponential backoff."""
+    if rate_limiter is not None:
+        rate_limiter.on_error()
+    else:
+        time.sleep(get_backoff_delay(attempt, retry_delay))
+
+
 def build_query_params(usernames, hashtags=None, start_date=None, end_date=None, 
-                      cursor=0, search_id=None, max_count=100, logger=None):
-    """Build query parameters for TikTok API."""
+                      cursor=0, search_id=None, max_count=100, logger=None,
+                      video_ids=None):
+    """
+    Build query parameters for TikTok API.
+
+    If video_ids is given, the results are restricted to these videos.
+    """
     if logger is None:
         logger = setup_logger('query_builder')
     
     query = {
-        'or': [
-            {
-                'operation': 'IN',
-                'field_name': 'username',
-                'field_values': usernames
-            }
-        ],
+        'or': [],
         'and': [
             {
                 'operation': 'IN',
@@ -213,6 +294,13 @@ def build_query_params(usernames, hashtags=None, start_date=None, end_date=None,
         ]
     }
     
+    if usernames:
+        query['or'].append({
+            'operation': 'IN',
+            'field_name': 'username',
+            'field_values': usernames
+        })
+
     if hashtags:
         query['or'].append({
             'operation': 'IN',
@@ -220,6 +308,16 @@ def build_query_params(usernames, hashtags=None, start_date=None, end_date=None,
             'field_values': hashtags
         })
 
+    if video_ids:
+        query['and'].append({
+            'operation': 'IN',
+            'field_name': 'video_id',
+            'field_values': [str(video_id) for video_id in video_ids]
+        })
+
+    if not query['or']:
+        del query['or']
+
     params = {
         'query': query,
         'max_count': max_count,
@@ -240,7 +338,7 @@ def process_api_response(response_data, error_counter=0, logger=None):
     if logger is None:
         logger = setup_logger('response_processor')
     
-    if 'error' in response_data and response_data['error'].get('code') in ['internal_error', 'invalid_params']:
+    if 'error' in response_data and response_data['error'].get('code') in RETRYABLE_ERROR_CODES:
         error_counter += 1
         logger.warning(f'Error encountered: {response_data["error"]["message"]} ({error_counter})')
         logger.warning(f'Error code: {response_data["error"]["code"]}')
@@ -261,74 +359,269 @@ def process_api_response(response_data, error_counter=0, logger=None):
     return response_data['data'], 0, True  # Reset error counter on success
 
 
-def get_tt_videos_new_day(specific_date=None, logger=None, test_mode=False):
-    """Scrape videos for a specific day or the default past day."""
+def get_tt_videos_new_day(specific_date=None, logger=None, test_mode=False,
+                          requests_per_minute=None, resume=False,
+                          query_shards=None, max_workers=None, rate_limiter=None,
+                          budget=None):
+    """
+    Scrape videos for a specific day or the default past day.
+
+    The usernames and hashtags can be split into query_shards sub-queries
+    of similar expected size, which are paginated independently by up to
+    max_workers threads (default: one per shard). Videos matched by several
+    shards are only saved again if their engagement changed. If a shard fails, the other shards are
+    still completed and the failed one can be continued with resume.
+
+    Pages are fetched in background threads and written by the calling
+    thread, so that API requests and database writes overlap.
+
+    A rate_limiter and a request budget can be passed to share the request
+    rate and quota with other scrapes running at the same time. Otherwise,
+    the scrape uses the 'new_day' share of the daily request quota and stops
+    when it is exhausted.
+
+    If resume is True, the scrape continues from the last checkpoints of the
+    day (and is skipped if the day has already been completed). The shards
+    are stored with the checkpoints and a resumed scrape reuses them (and
+    their number), since a new plan would differ with the video counts
+    changed by the interrupted run. Terms added in between are not queried
+    until the day is scraped without resume.
+    """
     logger = setup_logger('new_day', logger)
     logger.info('========Scraping I new day videos========')
     if test_mode:
         logger.info('TEST MODE: Will stop after 5 successful requests')
     
-    access_token = request_access_token()
+    # Fail early if no access token can be obtained.
+    request_access_token()
     
     start_date = end_date = specific_date or get_formatted_date()
     scrape_date = timezone.now().timestamp()
+
+    query_shards = query_shards or settings.SCRAPER_QUERY_SHARDS
+    shards = load_query_shards('new_day', (start_date, end_date)) if resume else None
+    if shards is not None:
+        logger.info(f'Resuming with the {len(shards)} query shards of the last run')
+    elif query_shards > 1:
+        shards = plan_query_shards(get_username_list(), HASHTAG_LIST,
+                                   query_shards, *get_query_weights())
+        logger.info(f'Split query into {len(shards)} shards')
+    else:
+        shards = [QueryShard(get_username_list(), HASHTAG_LIST)]
+
+    checkpoints = {}
+    for i, shard in enumerate(shards):
+        if len(shards) == 1:
+            mode, query = 'new_day', None
+        else:
+            mode, query = f'new_day_{i + 1}of{len(shards)}', shard._asdict()
+        checkpoints[(start_date, end_date, i)] = get_checkpoint(
+            mode, (start_date, end_date), resume, query=query)
+    windows = [w for w, c in checkpoints.items() if not c.completed]
+    if not windows:
+        logger.info(f'Day {start_date} already completed according to checkpoint')
+        return
+    for window in windows:
+        if checkpoints[window].n_pages:
+            logger.info(f'Resuming day {start_date} shard {window[2]} '
+                        f'at cursor {checkpoints[window].cursor}')
     
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
-    
-    cursor = 0
-    search_id = ''
+    owns_budget = budget is None
+    if owns_budget:
+        budget = get_request_budget('new_day', logger)
+    if budget is not None and budget.exhausted():
+        logger.warning(f'No request budget left to scrape day {start_date}')
+        return
+
+    headers = {'Content-Type': 'application/json'}
+    rate_limiter = rate_limiter or get_rate_limiter(requests_per_minute, logger)
+    archive = get_raw_page_archive('new_day', logger)
+    seen_filter = SeenVideoFilter()
+
+    def fetch_window(window):
+        shard = shards[window[2]]
+        checkpoint = checkpoints[window]
+        return iter_window_pages(window[:2], shard.usernames, headers,
+                                 rate_limiter, logger, hashtags=shard.hashtags,
+                                 cursor=checkpoint.cursor,
+                                 search_id=checkpoint.search_id,
+                                 budget=budget)
+
+    def save_page(window, data):
+        checkpoint = checkpoints[window]
+        if archive:
+            archive.append(window[:2], checkpoint.cursor, checkpoint.search_id,
+                           scrape_date, data)
+        # Skip unchanged videos already saved from an overlapping shard.
+        videos = seen_filter.filter(data.get('videos', []))
+        with transaction.atomic():
+            if videos:
+                save_videos_to_db(videos, scrape_date, logger)
+            update_checkpoint(checkpoint, data)
+        if budget is not None:
+            budget.flush()
+
+    # The next pages are fetched while the current one is being written.
+    n_pages = fan_out_windows(
+        windows, fetch_window, save_page, max_workers or len(windows), logger,
+        max_pages=5 if test_mode else None, fail_fast=len(shards) == 1
+    )
+    if test_mode and n_pages >= 5:
+        logger.info('TEST MODE: Completed 5 successful requests')
+    else:
+        incomplete = [w[2] for w in windows if not checkpoints[w].completed]
+        if incomplete:
+            logger.warning(f'Day {start_date}: shards {incomplete} did not complete')
+    logger.info(f'Saved {n_pages} pages')
+    seen_filter.log_stats(logger)
+    if budget is not None:
+        if owns_budget:
+            budget.finish(completed=all(c.completed for c in checkpoints.values()))
+        else:
+            budget.flush()
+
+    log_connection_stats(get_session(), logger)
+
+
+def get_rate_limiter(requests_per_minute=None, logger=None):
+    """Return a rate limiter configured by the scraper settings."""
+    return AdaptiveRateLimiter(
+        requests_per_minute or settings.SCRAPER_REQUESTS_PER_MINUTE,
+        min_requests_per_minute=settings.SCRAPER_MIN_REQUESTS_PER_MINUTE,
+        max_requests_per_minute=settings.SCRAPER_MAX_REQUESTS_PER_MINUTE,
+        base_backoff=settings.SCRAPER_BASE_BACKOFF,
+        logger=logger
+    )
+
+
+def get_request_budget(job, logger=None):
+    """
+    Return the request budget of a job (see SCRAPER_QUOTA_SHARES), or None if
+    no daily request quota is configured.
+    """
+    if not settings.SCRAPER_DAILY_REQUEST_QUOTA:
+        return None
+    return RequestBudget(
+        job,
+        os.environ.get('TT_API_CLIENT_KEY') or 'default',
+        settings.SCRAPER_DAILY_REQUEST_QUOTA,
+        settings.SCRAPER_QUOTA_SHARES,
+        logger=logger
+    )
+
+
+def get_raw_page_archive(mode, logger):
+    """Return an archive for the raw pages of a run if archiving is enabled."""
+    if not settings.SCRAPER_ARCHIVE_RAW_PAGES:
+        return None
+    archive = RawPageArchive(mode)
+    logger.info(f"Archiving raw pages to {archive.run_dir}")
+    return archive
+
+
+def iter_window_pages(date_range, usernames, headers, rate_limiter, logger,
+                      hashtags=None, cursor=0, search_id='', video_ids=None,
+                      field_profile='full', budget=None):
+    """
+    Paginate through the results of a single date window, starting at cursor
+    and search_id (e.g., from a checkpoint). Only the fields of field_profile
+    are requested.
+
+    Yields the data of each successfully retrieved page. The cursor and
+    search_id state is local to the generator, so several windows can be
+    paginated at the same time. Stops early if the request budget is
+    exhausted.
+    """
     has_more = True
     error_counter = 0
-    
-    request_count = 0
+
     while has_more and error_counter < 20:
+        if budget is not None and budget.exhausted():
+            logger.warning(f"Request budget exhausted; stopping window {date_range[0]}-{date_range[1]}")
+            break
         try:
             query_params = build_query_params(
-                usernames=get_username_list(),
-                hashtags=HASHTAG_LIST,
-                start_date=start_date,
-                end_date=end_date,
+                usernames=usernames,
+                hashtags=hashtags,
+                start_date=date_range[0],
+                end_date=date_range[1],
                 cursor=cursor,
                 search_id=search_id,
-                logger=logger
+                logger=logger,
+                video_ids=video_ids
+            )
+
+            response_data = make_api_request(
+                get_video_query_url(field_profile), headers, query_params,
+                logger=logger, rate_limiter=rate_limiter, budget=budget
             )
-            
-            response_data = make_api_request(get_video_query_url(), headers, query_params, logger=logger)
             data, error_counter, should_continue = process_api_response(response_data, error_counter, logger=logger)
-            
-            if not should_continue:
-                break
-                
-            if data:
-                if 'videos' in data:
-                    save_videos_to_db(data['videos'], scrape_date, logger)
-                    request_count += 1
-                    if test_mode and request_count >= 5:
-                        logger.info('TEST MODE: Completed 5 successful requests')
-                        return
-                
-                cursor = data.get('cursor', 0)
-                has_more = data.get('has_more', False)
-                search_id = data.get('search_id', '')
-                
-            time.sleep(10)
-            
+        except RequestBudgetExhausted:
+            logger.warning(f"Request budget exhausted; stopping window {date_range[0]}-{date_range[1]}")
+            break
         except Exception as e:
             logger.error(f"Error during scraping: {str(e)}", exc_info=True)
             raise
 
+        if not should_continue:
+            break
+
+        if data is None:
+            rate_limiter.on_error()
+        else:
+            rate_limiter.on_success()
+            yield data
+
+            cursor = data.get('cursor', 0)
+            has_more = data.get('has_more', False)
+            search_id = data.get('search_id', '')
+
+
+def get_tt_videos_update_account_data(logger=None, test_mode=False,
+                                      max_workers=None, requests_per_minute=None,
+                                      resume=False, incremental=False):
+    """
+    Update historical account data.
+
+    The date windows are independent of each other and are fetched by
+    max_workers threads at the same time, sharing one adaptive rate limiter
+    starting at requests_per_minute. The pages are written to the database
+    by the calling thread while the next pages are being fetched.
+
+    If resume is True, completed windows are skipped and interrupted windows
+    continue from their last checkpoint.
+
+    Windows whose estimated number of result pages (based on the videos
+    already stored) exceeds SCRAPER_MAX_PAGES_PER_WINDOW are bisected, down
+    to single days. Windows that fail after too many API errors are retried
+    in halves, and count as completed (and refreshed) once all of their
+    halves are.
+
+    Since the split follows the current video counts, the windows change
+    when a window crosses the threshold. Checkpoints and watermarks are
+    keyed by window, so a newly split window is scraped from scratch (even
+    with resume) and is due in incremental mode until it has a watermark.
+
+    The scrape uses the 'accounts' share of the daily request quota and
+    stops when it is exhausted (continue with resume).
 
-def get_tt_videos_update_account_data(logger=None, test_mode=False):
-    """Update historical account data."""
+    Only the engagement counters are requested from the API. Videos that
+    are not in the database yet are fetched again with all fields.
+
+    If incremental is True, only windows that are due according to their
+    watermark are refreshed (recent windows daily, older windows less often),
+    the most overdue first.
+    """
     logger = setup_logger('account_update', logger)
     logger.info('========Scraping II update account data========')
     if test_mode:
         logger.info('TEST MODE: Will stop after 5 successful requests')
+
+    max_workers = max_workers or settings.SCRAPER_MAX_WORKERS
+    logger.info(f"Using {max_workers} worker(s)")
     
-    access_token = request_access_token()
+    # Fail early if no access token can be obtained.
+    request_access_token()
     
     start_date = "20250101"
     end_date = get_formatted_date(delay=5)
@@ -336,73 +629,151 @@ def get_tt_videos_update_account_data(logger=None, test_mode=False):
     logger.info(f"Generating date range from {start_date} to {end_date}")
     date_ranges = generate_date_range(start_date, end_date)
     logger.info(f"Generated {len(date_ranges)} date ranges")
-    
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
+
+    date_ranges = split_dense_windows(
+        date_ranges, get_daily_video_counts(start_date, end_date),
+        settings.SCRAPER_MAX_PAGES_PER_WINDOW
+    )
+    logger.info(f"Split dense windows into {len(date_ranges)} date ranges")
+
+    checkpoints = {
+        date_range: get_checkpoint('accounts', date_range, resume)
+        for date_range in date_ranges
     }
+    date_ranges = [d for d in date_ranges if not checkpoints[d].completed]
+    if resume:
+        logger.info(f"Resuming: {len(date_ranges)} date ranges left to scrape")
+
+    if incremental:
+        date_ranges = get_due_windows(date_ranges)
+        logger.info(f"Incremental mode: {len(date_ranges)} date ranges due for refresh")
+    
+    headers = {'Content-Type': 'application/json'}
     
     scrape_date = timezone.now().timestamp()
     usernames = get_username_list()
-    
-    request_count = 0
-    for date_range in date_ranges:
-        cursor = 0
-        search_id = ''
-        has_more = True
-        error_counter = 0
-        
-        while has_more and error_counter < 20:
-            try:
-                query_params = build_query_params(
-                    usernames=usernames,
-                    start_date=date_range[0],
-                    end_date=date_range[1],
-                    cursor=cursor,
-                    search_id=search_id,
-                    logger=logger
-                )
-                
-                response_data = make_api_request(get_video_query_url(), headers, query_params, logger=logger)
-                data, error_counter, should_continue = process_api_response(response_data, error_counter, logger=logger)
-                
-                if not should_continue:
-                    break
-                    
-                if data:
-                    if 'videos' in data:
-                        save_videos_to_db(data['videos'], scrape_date, logger)
-                        request_count += 1
-                        if test_mode and request_count >= 5:
-                            logger.info('TEST MODE: Completed 5 successful requests')
-                            return
-                    
-                    cursor = data.get('cursor', 0)
-                    has_more = data.get('has_more', False)
-                    search_id = data.get('search_id', '')
-                    
-                time.sleep(10)
-                
-            except Exception as e:
-                logger.error(f"Error during scraping: {str(e)}", exc_info=True)
-                raise
-    
+    rate_limiter = get_rate_limiter(requests_per_minute, logger)
+    archive = get_raw_page_archive('accounts', logger)
+    seen_filter = SeenVideoFilter()
+    budget = get_request_budget('accounts', logger)
+
+    def fetch_window(date_range):
+        checkpoint = checkpoints[date_range]
+        return iter_window_pages(
+            date_range, usernames, headers, rate_limiter, logger,
+            cursor=checkpoint.cursor, search_id=checkpoint.search_id,
+            field_profile='engagement', budget=budget
+        )
+
+    def save_page(date_range, data):
+        checkpoint = checkpoints[date_range]
+        if archive:
+            archive.append(date_range, checkpoint.cursor, checkpoint.search_id,
+                           scrape_date, data)
+        # Skip unchanged videos already saved from a retried window.
+        videos = seen_filter.filter(data.get('videos', []))
+        # Videos not discovered by the day scrape need all fields.
+        unknown_ids = get_unknown_video_ids(videos)
+        if unknown_ids:
+            logger.info(f"Fetching all fields of {len(unknown_ids)} unknown videos")
+            full_videos = fetch_full_videos(
+                unknown_ids, date_range, headers, rate_limiter, logger,
+                budget=budget)
+            if archive:
+                archive.append(date_range, None, '', scrape_date, {'videos': full_videos})
+            videos = [v for v in videos if int(v['id']) not in unknown_ids] + full_videos
+        with transaction.atomic():
+            if videos:
+                save_videos_to_db(videos, scrape_date, logger)
+            update_checkpoint(checkpoint, data)
+        if budget is not None:
+            budget.flush()
+        if checkpoint.completed:
+            log_window_refresh(date_range, logger)
+
+    n_pages = fan_out_windows(
+        date_ranges, fetch_window, save_page, max_workers, logger,
+        max_pages=5 if test_mode else None
+    )
+    if test_mode and n_pages >= 5:
+        logger.info('TEST MODE: Completed 5 successful requests')
+        return
+
+    # Windows that gave up after too many errors are retried in halves.
+    failed = [d for d in date_ranges if not checkpoints[d].completed]
+    retried = []
+    while failed and not (budget is not None and budget.exhausted()):
+        halves = [half for d in failed for half in bisect_window(d)]
+        unsplittable = [d for d in failed if not bisect_window(d)]
+        if unsplittable:
+            logger.warning(f"Could not complete date ranges {unsplittable}")
+        if not halves:
+            break
+        logger.info(f"Retrying {len(failed) - len(unsplittable)} failed date ranges "
+                    f"as {len(halves)} halves")
+        for half in halves:
+            checkpoints[half] = get_checkpoint('accounts', half, resume)
+        n_pages += fan_out_windows(
+            [half for half in halves if not checkpoints[half].completed],
+            fetch_window, save_page, max_workers, logger
+        )
+        retried.append(failed)
+        failed = [d for d in halves if not checkpoints[d].completed]
+
+    # Complete the failed windows whose halves completed, innermost first.
+    for windows in reversed(retried):
+        for date_range in windows:
+            halves = bisect_window(date_range)
+            if halves and all(checkpoints[half].completed for half in halves):
+                complete_window(checkpoints[date_range], date_range, logger)
+
+    logger.info(f"Saved {n_pages} pages from {len(date_ranges)} date ranges")
+    seen_filter.log_stats(logger)
+    if budget is not None:
+        budget.finish(completed=not failed)
+
     log_server_ip(logger=logger)
+    log_connection_stats(get_session(), logger)
 
 
-def get_datetime_from_unix_ts(unix_ts):
-    return datetime.fromtimestamp(unix_ts, timezone.utc)
+def log_window_refresh(date_range, logger):
+    watermark = record_window_refresh(date_range)
+    logger.info(
+        f"Refreshed window {date_range[0]}-{date_range[1]} "
+        f"(engagement change: {watermark.engagement_change})"
+    )
 
 
-def save_videos_to_file(videos, start_date, search_id, cursor):
-    """ Save retrieved data to JSON file. """
-    file_name = f'{start_date}_{search_id}_{cursor - 100}.json'
-    save_directory = 'scraper/data'
-    file_path = os.path.join(save_directory, file_name)
-    json_string = json.dumps(videos)
-    with open(file_path, 'w') as f:
-        json.dump(json_string, f)
-    return
+def complete_window(checkpoint, date_range, logger):
+    """Mark a window completed whose pages were scraped in smaller windows."""
+    checkpoint.completed = True
+    checkpoint.save(update_fields=['completed', 'last_updated'])
+    log_window_refresh(date_range, logger)
+
+
+def get_unknown_video_ids(videos):
+    """Return the IDs of the videos that are not in the database yet."""
+    video_ids = {int(v['id']) for v in videos}
+    known_ids = TikTokVideo.objects.filter(
+        video_id__in=video_ids).values_list('video_id', flat=True)
+    return video_ids - set(known_ids)
+
+
+def fetch_full_videos(video_ids, date_range, headers, rate_limiter, logger,
+                      chunk_size=100, budget=None):
+    """Fetch all fields of the given videos created within date_range."""
+    video_ids = sorted(video_ids)
+    videos = []
+    for i in range(0, len(video_ids), chunk_size):
+        for data in iter_window_pages(date_range, None, headers, rate_limiter,
+                                      logger, video_ids=video_ids[i:i + chunk_size],
+                                      budget=budget):
+            videos.extend(data.get('videos', []))
+    return videos
+
+
+def get_datetime_from_unix_ts(unix_ts):
+    return datetime.fromtimestamp(unix_ts, timezone.utc)
 
 
 def get_datetime_from_ts(ts):
@@ -416,10 +787,14 @@ def save_video_to_db(video_data, scrape_ts=None, logger=None):
         logger = setup_logger('save_video')
         
     try:
-        tt_user, _ = TikTokUser.objects.get_or_create(name=video_data.get('username'))
-
+        if video_data.get('id') is None:
+            raise ValueError('Video data without id')
         video = TikTokVideo.objects.filter(video_id=video_data.get('id')).first()
         if video is None:
+            if 'create_time' not in video_data:
+                logger.warning(f"Skipped unknown video {video_data.get('id')} without create_time")
+                return False
+            tt_user, _ = TikTokUser.objects.get_or_create(name=video_data.get('username'))
             video = TikTokVideo.objects.create(
                 video_id=video_data.get('id'),
                 video_description=video_data.get('video_description'),
@@ -451,7 +826,12 @@ def save_video_to_db(video_data, scrape_ts=None, logger=None):
                 video.view_count = video_data.get('view_count')
                 video.scrape_date = scrape_date
                 video.save()
-        return
+
+        snapshot_date = get_datetime_from_ts(scrape_ts) if scrape_ts else video.scrape_date
+        TikTokVideoSnapshot.objects.bulk_create(
+            [make_snapshot(video.video_id, video_data, snapshot_date)],
+            ignore_conflicts=True)
+        return True
 
     except Exception as e:
         logger.error(f"Error saving video {video_data.get('id', 'unknown')}: {str(e)}")
@@ -459,19 +839,189 @@ def save_video_to_db(video_data, scrape_ts=None, logger=None):
         raise
 
 
+def make_snapshot(video_id, video_data, scrape_date):
+    """Return an (unsaved) engagement snapshot of a video."""
+    return TikTokVideoSnapshot(
+        video_id=video_id,
+        scrape_date=scrape_date,
+        comment_count=video_data.get('comment_count'),
+        like_count=video_data.get('like_count'),
+        share_count=video_data.get('share_count'),
+        view_count=video_data.get('view_count'),
+    )
+
+
+def bulk_save_videos_to_db(videos, scrape_ts=None, logger=None):
+    """
+    Saves a whole page of videos to the database using set-based queries.
+
+    Users and hashtags are resolved in bulk, new videos are inserted with a
+    single bulk_create, the engagement counters of existing videos are
+    refreshed with a single bulk_update (only for rows with an older
+    scrape_date), an engagement snapshot of every video is appended in a
+    single bulk_create and the hashtag relations of new videos are written
+    in one statement. The number of queries per page is therefore constant.
+
+    Args:
+        videos (list): List of video dicts as returned by the Research API.
+        scrape_ts (float): Unix timestamp of the scrape run.
+        logger: Logger instance.
+
+    Returns:
+        set: IDs of the videos that have been created or are already stored
+            (updated or not). Unknown videos without a create_time are not
+            saved.
+    """
+    if logger is None:
+        logger = setup_logger('save_videos')
+
+    # Deduplicate the page; later entries take precedence.
+    videos_by_id = {int(v['id']): v for v in videos}
+    if not videos_by_id:
+        return set()
+
+    if scrape_ts:
+        scrape_date = get_datetime_from_ts(scrape_ts)
+    else:
+        scrape_date = TikTokVideo._meta.get_field('scrape_date').get_default()
+
+    with transaction.atomic():
+        # Split page into new and existing videos.
+        existing = {
+            v.video_id: v for v in
+            TikTokVideo.objects
+            .filter(video_id__in=videos_by_id.keys())
+            .only('pk', 'video_id', 'scrape_date')
+        }
+        # Videos fetched with the engagement field profile cannot be created.
+        new_data = {
+            video_id: data for video_id, data in videos_by_id.items()
+            if video_id not in existing and 'create_time' in data
+        }
+        n_incomplete = len(videos_by_id) - len(existing) - len(new_data)
+
+        # Resolve users of new videos.
+        usernames = {v.get('username') for v in new_data.values()}
+        users = {}
+        for user in TikTokUser.objects.filter(name__in=usernames).order_by('pk'):
+            users.setdefault(user.name, user)
+        missing_users = [TikTokUser(name=n) for n in usernames if n not in users]
+        for user in TikTokUser.objects.bulk_create(missing_users):
+            users[user.name] = user
+
+        new_videos = [
+            TikTokVideo(
+                video_id=video_id,
+                video_description=data.get('video_description'),
+                create_time=get_datetime_from_unix_ts(data.get('create_time')),
+                author_id=users[data.get('username')],
+                comment_count=data.get('comment_count'),
+                like_count=data.get('like_count'),
+                share_count=data.get('share_count'),
+                view_count=data.get('view_count'),
+                music_id=data.get('music_id'),
+                region_code=data.get('region_code'),
+                scrape_date=scrape_date,
+            )
+            for video_id, data in new_data.items()
+        ]
+        TikTokVideo.objects.bulk_create(new_videos, ignore_conflicts=True)
+
+        # Refresh engagement counters of videos scraped at an earlier date.
+        updated_videos = []
+        for video_id, video in existing.items():
+            if scrape_date <= video.scrape_date:
+                continue
+            data = videos_by_id[video_id]
+            video.comment_count = data.get('comment_count')
+            video.like_count = data.get('like_count')
+            video.share_count = data.get('share_count')
+            video.view_count = data.get('view_count')
+            video.scrape_date = scrape_date
+            updated_videos.append(video)
+        n_updated = (
+            TikTokVideo.objects
+            .filter(scrape_date__lt=scrape_date)
+            .bulk_update(updated_videos, ENGAGEMENT_FIELDS + ['scrape_date'])
+        )
+
+        # Append the engagement of all videos to their time series.
+        TikTokVideoSnapshot.objects.bulk_create([
+            make_snapshot(video_id, data, scrape_date)
+            for video_id, data in videos_by_id.items()
+            if video_id in existing or video_id in new_data
+        ], ignore_conflicts=True)
+
+        # Resolve hashtags and link them to the new videos.
+        new_ids = [v.video_id for v in new_videos]
+        hashtag_names = {
+            name for video_id in new_ids
+            for name in videos_by_id[video_id].get('hashtag_names') or []
+        }
+        if hashtag_names:
+            Hashtag.objects.bulk_create(
+                [Hashtag(name=n) for n in hashtag_names], ignore_conflicts=True)
+            hashtag_pks = dict(
+                Hashtag.objects
+                .filter(name__in=hashtag_names)
+                .values_list('name', 'pk')
+            )
+            video_pks = dict(
+                TikTokVideo.objects
+                .filter(video_id__in=new_ids)
+                .values_list('video_id', 'pk')
+            )
+            through = TikTokVideo.hashtags.through
+            through.objects.bulk_create([
+                through(tiktokvideo_id=video_pks[video_id], hashtag_id=hashtag_pks[name])
+                for video_id in new_ids
+                for name in set(videos_by_id[video_id].get('hashtag_names') or [])
+            ], ignore_conflicts=True)
+
+    if n_incomplete:
+        logger.warning(f"Skipped {n_incomplete} unknown videos without create_time")
+    logger.info(
+        f"Bulk saved page: {len(new_videos)} created, {n_updated} updated, "
+        f"{len(existing) - n_updated} unchanged"
+    )
+    return set(existing) | set(new_data)
+
+
 def save_videos_to_db(videos, scrape_ts=None, logger=None):
-    """Save multiple videos to database."""
+    """
+    Save multiple videos to database.
+
+    Uses the set-based bulk path and falls back to saving the videos one by
+    one if the page contains entries that cannot be processed in bulk. Each
+    video of the fallback is saved in its own savepoint, so a failing video
+    does not break the transaction of the caller (e.g., a page and its
+    checkpoint).
+
+    Returns:
+        int: Number of videos saved without an error. Unknown videos without
+            a create_time are skipped and not counted.
+    """
     if logger is None:
         logger = setup_logger('save_videos')
     
     logger.info(f"Starting to save batch of {len(videos)} videos")
+
+    try:
+        saved_ids = bulk_save_videos_to_db(videos, scrape_ts, logger)
+        success_count = sum(int(video['id']) in saved_ids for video in videos)
+        logger.info(f"Successfully saved {success_count}/{len(videos)} videos from batch")
+        return success_count
+    except Exception as e:
+        logger.warning(f"Bulk save failed ({e}); falling back to saving videos one by one")
+
     success_count = 0
-    
     for video in videos:
         try:
-            save_video_to_db(video, scrape_ts, logger)
-            success_count += 1
+            with transaction.atomic():
+                if save_video_to_db(video, scrape_ts, logger):
+                    success_count += 1
         except Exception as e:
             logger.error(f'Video: {video.get("id")}; Exception: {e}')
     
     logger.info(f"Successfully saved {success_count}/{len(videos)} videos from batch")
+    return success_count
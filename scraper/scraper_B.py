@@ -1,17 +1,30 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from .TikTok_Content_Scraper.TT_Scraper import TT_Scraper
 from scraper.models import TikTokVideo_B, Hashtag, TikTokUser_B
+from scraper.utils.async_fetch import iter_fetched
+from scraper.utils.http import build_session, get_session, log_connection_stats
+from scraper.utils.json_codec import get_json_codec
 from django.utils.timezone import make_aware
-from datetime import datetime
+from datetime import datetime, timedelta
+import copy
 import os
 import logging
+import socket
 import traceback
 import sys
+import threading
+import time
+from urllib.parse import urlparse
 
 
 logging.getLogger("django.db.backends").setLevel(logging.WARNING)
 
+VIDEO_PAGE_URL = 'https://www.tiktok.com/@tiktok/video/{}'
+
 
 def setup_logger(mode, existing_logger=None):
     """Setup logger for a specific scrape session or return existing logger."""
@@ -76,16 +89,74 @@ def get_datetime_from_ts(ts):
     naive_datetime = datetime.fromtimestamp(ts)
     return make_aware(naive_datetime)
 
-def load_video_ids_from_db():
-    """Load video IDs in batches of 1000 that haven't been scraped yet."""
-    BATCH_SIZE = 1000
-    video_ids = (
+def get_lease_owner():
+    """Identify the current worker process (host and PID)."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def load_video_ids_from_db(owner=None, batch_size=1000, lease_seconds=None):
+    """
+    Claim the next batch of up to batch_size videos that haven't been
+    scraped yet and are not leased by another worker (or whose lease has
+    expired), and return their IDs by priority.
+
+    The videos are leased to owner for lease_seconds (default:
+    SCRAPER_B_LEASE_SECONDS). On databases supporting it, the batch is
+    locked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers
+    claim disjoint batches without waiting for each other. Otherwise (e.g.,
+    SQLite), the candidates are claimed with a conditional UPDATE, and only
+    the videos actually leased by owner are returned.
+    """
+    owner = owner or get_lease_owner()
+    lease_seconds = lease_seconds or settings.SCRAPER_B_LEASE_SECONDS
+    now = timezone.now()
+    lease_expires = now + timedelta(seconds=lease_seconds)
+
+    claimable = (
         TikTokVideo_B.objects
         .filter(scrape_date__isnull=True)
+        .filter(Q(lease_expires__isnull=True) | Q(lease_expires__lt=now))
+    )
+    candidates = claimable.order_by('-scrape_priority', '-pk')
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            pks = list(
+                candidates.select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            TikTokVideo_B.objects.filter(pk__in=pks).update(
+                lease_owner=owner, lease_expires=lease_expires)
+        else:
+            pks = list(candidates.values_list('pk', flat=True)[:batch_size])
+            # Videos claimed by another worker in the meantime are skipped.
+            claimable.filter(pk__in=pks).update(
+                lease_owner=owner, lease_expires=lease_expires)
+
+    video_ids = (
+        TikTokVideo_B.objects
+        .filter(lease_owner=owner, lease_expires=lease_expires, scrape_date__isnull=True)
         .order_by('-scrape_priority', '-pk')
-        .values_list('video_id', flat=True)[:BATCH_SIZE]
+        .values_list('video_id', flat=True)
     )
-    return video_ids
+    return list(video_ids)
+
+
+def renew_leases(owner, lease_seconds=None):
+    """
+    Extend the leases of owner on the videos it has not scraped yet by
+    lease_seconds (default: SCRAPER_B_LEASE_SECONDS) from now, so a batch
+    taking longer than a lease is not claimed by another worker.
+    """
+    lease_seconds = lease_seconds or settings.SCRAPER_B_LEASE_SECONDS
+    return TikTokVideo_B.objects.filter(lease_owner=owner, scrape_date__isnull=True).update(
+        lease_expires=timezone.now() + timedelta(seconds=lease_seconds))
+
+
+def release_leases(owner):
+    """Release the leases of owner, e.g., on videos left unscraped."""
+    return TikTokVideo_B.objects.filter(lease_owner=owner).update(
+        lease_owner=None, lease_expires=None)
 
 def save_tt_user_to_db(author_id, author_metadata, logger):
     logger.info(f"Processing user: {author_id}")
@@ -101,29 +172,122 @@ def save_tt_user_to_db(author_id, author_metadata, logger):
     if tt_user.scrape_success:
         return tt_user
 
-    # Update user fields
-    tt_user.username = author_metadata.get('username')
-    tt_user.nick_name = author_metadata.get("name")
-    tt_user.signature = author_metadata.get("signature")
-    tt_user.create_time = author_metadata.get("create_time")
-    tt_user.verified = author_metadata.get("verified")
-    tt_user.ftc = author_metadata.get("ftc")
-    tt_user.relation = author_metadata.get("relation")
-    tt_user.open_favorite = author_metadata.get("open_favorite")
-    tt_user.comment_setting = author_metadata.get("comment_setting")
-    tt_user.duet_setting = author_metadata.get("duet_setting")
-    tt_user.stitch_setting = author_metadata.get("stitch_setting")
-    tt_user.private_account = author_metadata.get("private_account")
-    tt_user.secret = author_metadata.get("secret")
-    tt_user.is_ad_virtual = author_metadata.get("is_ad_virtual")
-    tt_user.download_setting = author_metadata.get("download_setting")
-    tt_user.recommend_reason = author_metadata.get("recommend_reason")
-    tt_user.suggest_account_bind = author_metadata.get("suggest_account_bind")
-    tt_user.scrape_success = True
-    tt_user.scrape_date = timezone.now()
+    set_user_fields(tt_user, author_metadata)
     tt_user.save()
     return tt_user
 
+
+# TikTokUser_B fields set from the author_metadata keys.
+USER_FIELDS = {
+    'username': 'username',
+    'nick_name': 'name',
+    'signature': 'signature',
+    'create_time': 'create_time',
+    'verified': 'verified',
+    'ftc': 'ftc',
+    'relation': 'relation',
+    'open_favorite': 'open_favorite',
+    'comment_setting': 'comment_setting',
+    'duet_setting': 'duet_setting',
+    'stitch_setting': 'stitch_setting',
+    'private_account': 'private_account',
+    'secret': 'secret',
+    'is_ad_virtual': 'is_ad_virtual',
+    'download_setting': 'download_setting',
+    'recommend_reason': 'recommend_reason',
+    'suggest_account_bind': 'suggest_account_bind',
+}
+
+# TikTokVideo_B fields set from the video_metadata keys (the scraper's
+# names differ from the Research API's, e.g., diggcount for like_count).
+VIDEO_FIELDS = {
+    'video_description': 'description',
+    'create_time': 'time_created',
+    'comment_count': 'commentcount',
+    'like_count': 'diggcount',
+    'share_count': 'sharecount',
+    'view_count': 'playcount',
+    'region_code': 'location_created',
+    'schedule_time': 'schedule_time',
+    'is_ad': 'is_ad',
+    'suggested_words': 'suggested_words',
+    'diggcount': 'diggcount',
+    'collectcount': 'collectcount',
+    'repostcount': 'repostcount',
+    'poi_name': 'poi_name',
+    'poi_address': 'poi_address',
+    'poi_city': 'poi_city',
+    'warn_info': 'warn_info',
+    'original_item': 'original_item',
+    'offical_item': 'offical_item',
+    'secret': 'secret',
+    'for_friend': 'for_friend',
+    'digged': 'digged',
+    'item_comment_status': 'item_comment_status',
+    'take_down': 'take_down',
+    'effect_stickers': 'effect_stickers',
+    'private_item': 'private_item',
+    'duet_enabled': 'duet_enabled',
+    'stitch_enabled': 'stitch_enabled',
+    'stickers_on_item': 'stickers_on_item',
+    'share_enabled': 'share_enabled',
+    'comments': 'comments',
+    'duet_display': 'duet_display',
+    'index_enabled': 'index_enabled',
+    'diversification_labels': 'diversification_labels',
+    'diversification_id': 'diversification_id',
+    'channel_tags': 'channel_tags',
+    'keyword_tags': 'keyword_tags',
+    'is_ai_gc': 'is_ai_gc',
+    'ai_gc_description': 'ai_gc_description',
+}
+
+# TikTokVideo_B fields set from the file_metadata keys.
+FILE_FIELDS = [
+    'filepath', 'duration', 'height', 'width', 'ratio', 'volume_loudness',
+    'volume_peak', 'has_original_audio', 'enable_audio_caption', 'no_caption_reason',
+]
+
+VIDEO_UPDATE_FIELDS = (
+    list(VIDEO_FIELDS) + FILE_FIELDS
+    + ['author_id', 'music_id', 'scrape_date', 'scrape_success']
+)
+REQUIRED_SECTIONS = ['video_metadata', 'file_metadata', 'music_metadata', 'author_metadata', 'hashtags_metadata']
+
+
+def set_user_fields(tt_user, author_metadata):
+    for field, key in USER_FIELDS.items():
+        setattr(tt_user, field, author_metadata.get(key))
+    tt_user.scrape_success = True
+    tt_user.scrape_date = timezone.now()
+
+
+def set_video_fields(video, video_data, tt_user):
+    video_metadata = video_data.get("video_metadata")
+    file_metadata = video_data.get("file_metadata")
+    music_metadata = video_data.get("music_metadata")
+
+    for field, key in VIDEO_FIELDS.items():
+        setattr(video, field, video_metadata.get(key))
+    for field in FILE_FIELDS:
+        setattr(video, field, file_metadata.get(field))
+    video.author_id = tt_user
+    video.music_id = music_metadata.get("id")
+    video.scrape_date = timezone.now()
+    video.scrape_success = True
+
+
+def get_package_error(video_data):
+    """Return an error message if a metadata package cannot be saved, else None."""
+    video_id = video_data.get("video_metadata", {}).get('id')
+    if not video_id:
+        return "No video ID found in video_metadata"
+    missing_sections = [section for section in REQUIRED_SECTIONS if section not in video_data]
+    if missing_sections:
+        return f"Missing required metadata sections for video {video_id}: {missing_sections}"
+    return None
+
+
 def save_video_to_db(video_data, logger=None):
     """Saves video data to database."""
     if logger is None:
@@ -178,63 +342,7 @@ def save_video_to_db(video_data, logger=None):
         if video.scrape_success:
             return None
 
-        # Update video fields
-        video.video_description = video_metadata.get("description")  # Changed from video_description to description
-        video.create_time = video_metadata.get("time_created")  # Changed from create_time to time_created
-        video.author_id = tt_user  # Set the author_id field to the TikTokUser_B instance
-        video.comment_count = video_metadata.get("commentcount")  # Changed from comment_count to commentcount
-        video.like_count = video_metadata.get("diggcount")  # Changed from like_count to diggcount
-        video.share_count = video_metadata.get("sharecount")  # Changed from share_count to sharecount
-        video.view_count = video_metadata.get("playcount")  # Changed from view_count to playcount
-
-        video.music_id = music_metadata.get("id")  # Changed from music_id to id
-        video.region_code = video_metadata.get("location_created")  # Changed from region_code to location_created
-
-        video.schedule_time = video_metadata.get("schedule_time")
-        video.is_ad = video_metadata.get("is_ad")
-        video.suggested_words = video_metadata.get("suggested_words")
-        video.diggcount = video_metadata.get("diggcount")
-        video.collectcount = video_metadata.get("collectcount")
-        video.repostcount = video_metadata.get("repostcount")
-        video.poi_name = video_metadata.get("poi_name")
-        video.poi_address = video_metadata.get("poi_address")
-        video.poi_city = video_metadata.get("poi_city")
-        video.warn_info = video_metadata.get("warn_info")
-        video.original_item = video_metadata.get("original_item")
-        video.offical_item = video_metadata.get("offical_item")
-        video.secret = video_metadata.get("secret")
-        video.for_friend = video_metadata.get("for_friend")
-        video.digged = video_metadata.get("digged")
-        video.item_comment_status = video_metadata.get("item_comment_status")
-        video.take_down = video_metadata.get("take_down")
-        video.effect_stickers = video_metadata.get("effect_stickers")
-        video.private_item = video_metadata.get("private_item")
-        video.duet_enabled = video_metadata.get("duet_enabled")
-        video.stitch_enabled = video_metadata.get("stitch_enabled")
-        video.stickers_on_item = video_metadata.get("stickers_on_item")
-        video.share_enabled = video_metadata.get("share_enabled")
-        video.comments = video_metadata.get("comments")
-        video.duet_display = video_metadata.get("duet_display")
-        video.index_enabled = video_metadata.get("index_enabled")
-        video.diversification_labels = video_metadata.get("diversification_labels")
-        video.diversification_id = video_metadata.get("diversification_id")
-        video.channel_tags = video_metadata.get("channel_tags")
-        video.keyword_tags = video_metadata.get("keyword_tags")
-        video.is_ai_gc = video_metadata.get("is_ai_gc")
-        video.ai_gc_description = video_metadata.get("ai_gc_description")
-
-        video.filepath = file_metadata.get("filepath")
-        video.duration = file_metadata.get("duration")
-        video.height = file_metadata.get("height")
-        video.width = file_metadata.get("width")
-        video.ratio = file_metadata.get("ratio")
-        video.volume_loudness = file_metadata.get("volume_loudness")
-        video.volume_peak = file_metadata.get("volume_peak")
-        video.has_original_audio = file_metadata.get("has_original_audio")
-        video.enable_audio_caption = file_metadata.get("enable_audio_caption")
-        video.no_caption_reason = file_metadata.get("no_caption_reason")
-
-        video.scrape_date = timezone.now()
+        set_video_fields(video, video_data, tt_user)
 
         # Handle mentions (ManyToManyField)
         mentions = video_metadata.get("mentions")
@@ -246,7 +354,7 @@ def save_video_to_db(video_data, logger=None):
                     author_id=author_id
                 )
                 if created:
-                    mentioned_user.username = f"temp_user_{author_id}",  # Temporary username until we get the actual username
+                    mentioned_user.username = f"temp_user_{author_id}"  # Temporary username until we get the actual username
                     mentioned_user.save()
 
                 mentioned_users.append(mentioned_user)
@@ -274,7 +382,6 @@ def save_video_to_db(video_data, logger=None):
         else:
             video.hashtags.clear()
 
-        video.scrape_success = True
         video.save()
         logger.info(f"Successfully saved video meta data to db: {video_id}")
         return None
@@ -286,36 +393,168 @@ def save_video_to_db(video_data, logger=None):
         raise
 
 
+def bulk_save_videos_to_db(packages, logger=None):
+    """
+    Saves a batch of metadata packages with set-based queries, with the same
+    result as calling save_video_to_db for each package.
+
+    Authors, mentioned users and hashtags are resolved in bulk (creating the
+    missing ones), unscraped authors are updated with one bulk_update, the
+    videos with another, and the mention and hashtag relations of the videos
+    are replaced with one DELETE and one bulk INSERT each, all in a single
+    transaction.
+
+    Returns:
+        dict: Error message (or None on success) by video ID.
+    """
+    if logger is None:
+        logger = setup_logger('save_video')
+
+    results = {}
+    valid = {}
+    for package in packages:
+        video_id = package.get("video_metadata", {}).get('id')
+        msg = get_package_error(package)
+        if msg is not None:
+            logger.error(msg)
+            results[video_id] = msg
+        else:
+            # Later packages of the same video take precedence.
+            valid[str(video_id)] = package
+    if not valid:
+        return results
+
+    author_metadata = {}
+    mention_ids = set()
+    hashtag_names = set()
+    for package in valid.values():
+        author_id = package["author_metadata"].get("id")
+        if author_id is not None:
+            author_metadata[str(author_id)] = package["author_metadata"]
+        mention_ids.update(str(m) for m in package["video_metadata"].get("mentions") or [])
+        hashtag_names.update(package["video_metadata"].get('hashtags') or [])
+
+    with transaction.atomic():
+        # Users: create the missing authors and mentioned users, then fill in
+        # the metadata of authors that have not been scraped yet.
+        user_ids = set(author_metadata) | mention_ids
+        users = {u.author_id: u for u in TikTokUser_B.objects.filter(author_id__in=user_ids)}
+        TikTokUser_B.objects.bulk_create(
+            [TikTokUser_B(author_id=user_id, username=f"temp_user_{user_id}")
+             for user_id in user_ids - set(users) - set(author_metadata)]
+            + [TikTokUser_B(author_id=user_id)
+               for user_id in set(author_metadata) - set(users)],
+            ignore_conflicts=True
+        )
+        users = {u.author_id: u for u in TikTokUser_B.objects.filter(author_id__in=user_ids)}
+        unscraped_authors = []
+        for author_id, metadata in author_metadata.items():
+            if not users[author_id].scrape_success:
+                set_user_fields(users[author_id], metadata)
+                unscraped_authors.append(users[author_id])
+        TikTokUser_B.objects.bulk_update(
+            unscraped_authors, list(USER_FIELDS) + ['scrape_success', 'scrape_date'])
+
+        if hashtag_names:
+            Hashtag.objects.bulk_create(
+                [Hashtag(name=name) for name in hashtag_names], ignore_conflicts=True)
+        hashtags = {h.name: h for h in Hashtag.objects.filter(name__in=hashtag_names)}
+
+        # Videos: create the missing ones and skip the ones already scraped.
+        TikTokVideo_B.objects.bulk_create(
+            [TikTokVideo_B(video_id=video_id) for video_id in valid], ignore_conflicts=True)
+        videos = []
+        for video in TikTokVideo_B.objects.filter(video_id__in=valid.keys()):
+            results[video.video_id] = None
+            if video.scrape_success:
+                continue
+            package = valid[video.video_id]
+            author_id = package["author_metadata"].get("id")
+            set_video_fields(video, package, users[str(author_id)] if author_id is not None else None)
+            videos.append(video)
+        TikTokVideo_B.objects.bulk_update(videos, VIDEO_UPDATE_FIELDS)
+
+        mentions_through = TikTokVideo_B.mentions.through
+        hashtags_through = TikTokVideo_B.hashtags.through
+        mentions_through.objects.filter(tiktokvideo_b__in=videos).delete()
+        hashtags_through.objects.filter(tiktokvideo_b__in=videos).delete()
+        mentions_through.objects.bulk_create([
+            mentions_through(tiktokvideo_b=video, tiktokuser_b=users[user_id])
+            for video in videos
+            for user_id in dict.fromkeys(
+                str(m) for m in valid[video.video_id]["video_metadata"].get("mentions") or [])
+        ])
+        hashtags_through.objects.bulk_create([
+            hashtags_through(tiktokvideo_b=video, hashtag=hashtags[name])
+            for video in videos
+            for name in dict.fromkeys(valid[video.video_id]["video_metadata"].get('hashtags') or [])
+        ])
+
+    logger.info(f"Saved {len(videos)} videos ({len(valid) - len(videos)} already scraped) in bulk")
+    return results
+
+
 # create a new class, that inherits the TT_Scraper
 class TT_Scraper_DB_metadata(TT_Scraper):
     def __init__(self, wait_time=0.35, output_files_fp="data/", logger=None):
-        super().__init__(wait_time, output_files_fp)
+        super().__init__(wait_time, output_files_fp, session=get_session(), json_codec=get_json_codec())
         self.log = logger if logger else setup_logger('scraper')
-
-    def scrape(self, id=None, scrape_content=False, download_metadata=False, download_content=False):
-        """Override scrape method to handle metadata retrieval and database storage."""
-        try:
-            metadata_package, success = super().scrape(id=id, scrape_content=scrape_content, download_metadata=False, download_content=scrape_content)
-            if metadata_package:
-                msg = save_video_to_db(metadata_package, logger=self.log)
-
-                if msg is not None:
-                    # Add scraping exception to db.
-                    video = TikTokVideo_B.objects.filter(video_id=id).first()
-                    if video is not None:
-                        video.scrape_success = False
-                        video.scrape_status = msg
-                        video.scrape_date = timezone.now()
-                        video.save()
-                    else:
-                        self.log.error(f'A: video is none: {id}')
-                    return False
-                else:
-                    self.log.info(f"Successfully processed video {id}")
-                    return True
-            else:
-                msg = f"Failed to get metadata for video {id}"
-                self.log.error(msg)
+        self.flush_size = settings.SCRAPER_B_FLUSH_SIZE
+        self.flush_interval = settings.SCRAPER_B_FLUSH_INTERVAL
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        # Owner of the leased videos being scraped (see scrape_leased_batches).
+        self.lease_owner = None
+        self.last_lease_renewal = time.monotonic()
+
+    def fetch(self, id, scrape_content=False):
+        """Request and parse the page of a video (without database access)."""
+        metadata_package, _ = super().scrape(id=id, scrape_content=scrape_content, download_metadata=False, download_content=scrape_content)
+        return metadata_package
+
+    def copy_for_thread(self):
+        """
+        Return a copy with its own session, headers and cookies, for fetching
+        in another thread. The scraper keeps its cookies and resets its
+        headers and session cookies after errors, which must not affect the
+        requests of other threads.
+        """
+        fetcher = copy.copy(self)
+        fetcher.buffer = []
+        fetcher.session = build_session(
+            pool_size=settings.SCRAPER_HTTP_POOL_SIZE, timeout=settings.SCRAPER_HTTP_TIMEOUT)
+        fetcher._init_request_headers()
+        return fetcher
+
+    def renew_leases(self):
+        """Renew the leases of lease_owner every quarter of the lease length."""
+        lease_seconds = settings.SCRAPER_B_LEASE_SECONDS
+        if (self.lease_owner is None
+                or time.monotonic() - self.last_lease_renewal < lease_seconds / 4):
+            return
+        n_renewed = renew_leases(self.lease_owner, lease_seconds)
+        self.last_lease_renewal = time.monotonic()
+        self.log.info(f"Renewed the leases of {n_renewed} videos")
+
+    def save_result(self, id, metadata_package, buffered=False):
+        """
+        Save the fetched metadata of a video, or its failure, to the database.
+
+        If buffered, complete metadata packages are added to the buffer
+        instead, which is saved in bulk when it holds flush_size videos or
+        flush_interval seconds have passed since the last flush.
+        """
+        if buffered and metadata_package and get_package_error(metadata_package) is None:
+            self.buffer.append((id, metadata_package))
+            if (len(self.buffer) >= self.flush_size
+                    or time.monotonic() - self.last_flush >= self.flush_interval):
+                self.flush()
+            return True
+        if metadata_package:
+            msg = save_video_to_db(metadata_package, logger=self.log)
+
+            if msg is not None:
+                # Add scraping exception to db.
                 video = TikTokVideo_B.objects.filter(video_id=id).first()
                 if video is not None:
                     video.scrape_success = False
@@ -323,34 +562,140 @@ class TT_Scraper_DB_metadata(TT_Scraper):
                     video.scrape_date = timezone.now()
                     video.save()
                 else:
-                    self.log.error(f'B: video is none: {id}')
+                    self.log.error(f'A: video is none: {id}')
                 return False
-        except Exception as e:
-            self.log.error(f"Error in scrape method for video {id}: {str(e)}")
-            self.log.error(f"Traceback: {traceback.format_exc()}")
+            else:
+                self.log.info(f"Successfully processed video {id}")
+                return True
+        else:
+            msg = f"Failed to get metadata for video {id}"
+            self.log.error(msg)
             video = TikTokVideo_B.objects.filter(video_id=id).first()
+            if video is not None:
+                video.scrape_success = False
+                video.scrape_status = msg
+                video.scrape_date = timezone.now()
+                video.save()
+            else:
+                self.log.error(f'B: video is none: {id}')
+            return False
+
+    def save_error(self, id, e, tb=None):
+        self.log.error(f"Error in scrape method for video {id}: {str(e)}")
+        self.log.error(f"Traceback: {tb or traceback.format_exc()}")
+        video = TikTokVideo_B.objects.filter(video_id=id).first()
+        if video is not None:
             video.scrape_date = timezone.now()
             video.save()
+
+    def flush(self):
+        """
+        Save the buffered metadata packages with bulk_save_videos_to_db. If
+        that fails, the videos are saved one by one, so a single bad package
+        only fails its own video.
+        """
+        buffer, self.buffer = self.buffer, []
+        self.last_flush = time.monotonic()
+        if not buffer:
+            return
+        try:
+            bulk_save_videos_to_db([package for _, package in buffer], logger=self.log)
+            self.log.info(f"Successfully processed {len(buffer)} videos")
+        except Exception as e:
+            self.log.error(f"Bulk save of {len(buffer)} videos failed, saving them one by one: {str(e)}")
+            for id, metadata_package in buffer:
+                try:
+                    self.save_result(id, metadata_package)
+                except Exception as e:
+                    self.save_error(id, e)
+
+    def scrape(self, id=None, scrape_content=False, download_metadata=False, download_content=False,
+               buffered=False):
+        """Override scrape method to handle metadata retrieval and database storage."""
+        try:
+            metadata_package = self.fetch(id, scrape_content=scrape_content)
+            return self.save_result(id, metadata_package, buffered=buffered)
+        except Exception as e:
+            self.save_error(id, e)
             return False
 
     def scrape_list(self, ids, scrape_content=False, batch_size=None, clear_console=True, total_videos=0, already_scraped_count=0, total_errors=0):
         """Override scrape_list to handle multiple videos."""
         self.log.info(f"Starting to scrape {len(ids)} videos")
         
-        for video_id in ids:
-            try:
-                # Check if video has already been processed
-                if TikTokVideo_B.objects.filter(video_id=video_id, scrape_date__isnull=False).exists():
-                    self.log.info(f"Video {video_id} has already been processed, skipping")
-                    continue
-                    
-                # Scrape and save in one step
-                success = self.scrape(id=video_id, scrape_content=scrape_content)
-                if not success:
-                    self.log.error(f"Failed to process video {video_id}")
-            except Exception as e:
-                self.log.error(f"Error processing video {video_id}: {str(e)}")
-                self.log.error(f"Traceback: {traceback.format_exc()}")
+        try:
+            for video_id in ids:
+                try:
+                    # Check if video has already been processed
+                    if TikTokVideo_B.objects.filter(video_id=video_id, scrape_date__isnull=False).exists():
+                        self.log.info(f"Video {video_id} has already been processed, skipping")
+                        continue
+
+                    # Scrape and add to the buffer (saved in bulk)
+                    success = self.scrape(id=video_id, scrape_content=scrape_content, buffered=True)
+                    if not success:
+                        self.log.error(f"Failed to process video {video_id}")
+                    self.renew_leases()
+                except Exception as e:
+                    self.log.error(f"Error processing video {video_id}: {str(e)}")
+                    self.log.error(f"Traceback: {traceback.format_exc()}")
+        finally:
+            self.flush()
+
+    def scrape_list_async(self, ids, scrape_content=False, concurrency=None, host_concurrency=None):
+        """
+        Scrape multiple videos concurrently with the same parse and save
+        semantics as scrape_list.
+
+        The video pages are requested by concurrency connection slots on an
+        asyncio event loop (at most host_concurrency per host, by default
+        all of them), and every slot waits WAIT_TIME seconds between its
+        requests. Each fetching thread uses its own copy of the scraper (see
+        copy_for_thread). The results are buffered and saved to the database
+        in bulk in the calling thread.
+        """
+        concurrency = concurrency or settings.SCRAPER_B_CONCURRENCY
+        host_concurrency = host_concurrency or settings.SCRAPER_B_HOST_CONCURRENCY or concurrency
+
+        processed = set(
+            TikTokVideo_B.objects
+            .filter(video_id__in=[str(video_id) for video_id in ids], scrape_date__isnull=False)
+            .values_list('video_id', flat=True)
+        )
+        ids = [video_id for video_id in ids if str(video_id) not in processed]
+        self.log.info(f"Starting to scrape {len(ids)} videos with {concurrency} connection slots "
+                      f"({len(processed)} already processed)")
+
+        local = threading.local()
+        fetchers = []
+
+        def fetch(video_id):
+            if not hasattr(local, 'fetcher'):
+                local.fetcher = self.copy_for_thread()
+                fetchers.append(local.fetcher)
+            return local.fetcher.fetch(video_id, scrape_content=scrape_content)
+
+        results = iter_fetched(
+            ids, fetch, concurrency, self.log,
+            host_of=lambda video_id: urlparse(VIDEO_PAGE_URL.format(video_id)).netloc,
+            host_concurrency=host_concurrency, wait_time=self.WAIT_TIME
+        )
+        try:
+            for video_id, metadata_package, error in results:
+                try:
+                    if error is not None:
+                        tb = ''.join(traceback.format_exception(error))
+                        self.save_error(video_id, error, tb)
+                    elif not self.save_result(video_id, metadata_package, buffered=True):
+                        self.log.error(f"Failed to process video {video_id}")
+                    self.renew_leases()
+                except Exception as e:
+                    self.log.error(f"Error processing video {video_id}: {str(e)}")
+                    self.log.error(f"Traceback: {traceback.format_exc()}")
+        finally:
+            self.flush()
+            for fetcher in fetchers:
+                fetcher.session.close()
 
     def insert_metadata_to_db(self, metadata_package):
         """Save video metadata to database."""
@@ -359,26 +704,45 @@ class TT_Scraper_DB_metadata(TT_Scraper):
         return msg
 
 
-def collect_metadata_for_all(scraper=None, logger=None, test_mode=False, scrape_content=False):
-    """Collect metadata for all videos in the database."""
+def collect_metadata_for_all(scraper=None, logger=None, test_mode=False, scrape_content=False,
+                             concurrency=None):
+    """
+    Collect metadata for all videos in the database.
+
+    The videos are claimed in leased batches (see load_video_ids_from_db),
+    so several workers can run at the same time without scraping the same
+    videos. While a batch is scraped, its leases are renewed every quarter
+    of SCRAPER_B_LEASE_SECONDS, and leases left at the end are released.
+
+    With a concurrency > 1 (default: SCRAPER_B_CONCURRENCY), the videos of a
+    batch are scraped concurrently with scrape_list_async.
+    """
     if logger is None:
         logger = setup_logger('collect_metadata')
     
     # Create TT_Scraper_DB_metadata instance with the same logger
     if scraper is None:
         scraper = TT_Scraper_DB_metadata(wait_time=0.35, logger=logger)
+    concurrency = concurrency or settings.SCRAPER_B_CONCURRENCY
+    owner = get_lease_owner()
+    try:
+        scrape_leased_batches(scraper, owner, logger, test_mode, scrape_content, concurrency)
+    finally:
+        release_leases(owner)
 
+
+def scrape_leased_batches(scraper, owner, logger, test_mode, scrape_content, concurrency):
+    scraper.lease_owner = owner
     while True:
 
         try:
-            video_ids = load_video_ids_from_db()
+            video_ids = load_video_ids_from_db(owner, batch_size=10 if test_mode else 1000)
             if len(video_ids) == 0:
                 break
 
-            logger.info(f'Loaded {len(video_ids)} videos from database')
+            logger.info(f'Claimed {len(video_ids)} videos from database as {owner}')
 
             if test_mode:
-                video_ids = video_ids[:10]
                 logger.info(f'Test mode: Processing first {len(video_ids)} videos')
 
             # Redirect stdout to prevent binary data from being printed
@@ -386,7 +750,11 @@ def collect_metadata_for_all(scraper=None, logger=None, test_mode=False, scrape_
             sys.stdout = open(os.devnull, 'w')
 
             try:
-                scraper.scrape_list(video_ids, scrape_content=scrape_content)
+                if concurrency > 1:
+                    scraper.scrape_list_async(video_ids, scrape_content=scrape_content,
+                                              concurrency=concurrency)
+                else:
+                    scraper.scrape_list(video_ids, scrape_content=scrape_content)
             finally:
                 if test_mode:
                     break
@@ -395,6 +763,7 @@ def collect_metadata_for_all(scraper=None, logger=None, test_mode=False, scrape_
                 sys.stdout = original_stdout
 
             logger.info('Scraping completed successfully')
+            log_connection_stats(scraper.session, logger)
 
         except Exception as e:
             logger.error(f"Error in collect_metadata_for_all: {str(e)}")
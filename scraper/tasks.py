@@ -0,0 +1,85 @@
+import json
+import logging
+import zlib
+from itertools import islice
+
+from celery import shared_task
+from django.utils import timezone
+
+from scraper.models import IngestJob
+from scraper.scraper import save_videos_to_db
+
+logger = logging.getLogger('api_logger')
+
+INGEST_CHUNK_SIZE = 1000
+
+
+def iter_chunks(entries, chunk_size):
+    """Yield lists of up to chunk_size entries from any iterable."""
+    entries = iter(entries)
+    while chunk := list(islice(entries, chunk_size)):
+        yield chunk
+
+
+def stage_payload(entries):
+    """
+    Compress the entries of an ingest job to NDJSON one at a time, so that a
+    streamed payload is never held in memory uncompressed.
+
+    Returns:
+        tuple: The compressed payload and the number of staged entries.
+    """
+    compressor = zlib.compressobj()
+    parts = []
+    n_entries = 0
+    for entry in entries:
+        parts.append(compressor.compress(json.dumps(entry).encode() + b'\n'))
+        n_entries += 1
+    parts.append(compressor.flush())
+    return b''.join(parts), n_entries
+
+
+def iter_payload(payload, read_size=2 ** 16):
+    """Decompress a staged payload incrementally and yield its entries."""
+    payload = bytes(payload)
+    decompressor = zlib.decompressobj()
+    rest = b''
+    for i in range(0, len(payload), read_size):
+        rest += decompressor.decompress(payload[i:i + read_size])
+        *lines, rest = rest.split(b'\n')
+        for line in lines:
+            yield json.loads(line)
+    rest += decompressor.flush()
+    if rest.strip():
+        yield json.loads(rest)
+
+
+@shared_task
+def ingest_videos(job_id, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Ingest the staged payload of an IngestJob in chunks using the set-based
+    upserts of the scraper. The progress and the number of rows that could
+    not be saved are stored on the job after every chunk.
+    """
+    job = IngestJob.objects.get(pk=job_id)
+    if job.status != IngestJob.PENDING:
+        logger.warning(f'Ingest job {job_id} has status {job.status}; skipping')
+        return
+
+    job.status = IngestJob.RUNNING
+    job.save(update_fields=['status'])
+    try:
+        for chunk in iter_chunks(iter_payload(job.payload), chunk_size):
+            n_saved = save_videos_to_db(chunk, job.scrape_ts, logger)
+            job.n_processed += len(chunk)
+            job.n_errors += len(chunk) - n_saved
+            job.save(update_fields=['n_processed', 'n_errors'])
+    except Exception as e:
+        logger.error(f'Ingest job {job_id} failed: {e}', exc_info=True)
+        job.status = IngestJob.FAILED
+        job.error_message = str(e)
+    else:
+        job.status = IngestJob.DONE
+        job.payload = None
+    job.finished = timezone.now()
+    job.save(update_fields=['status', 'error_message', 'payload', 'finished'])
@@ -1,8 +1,22 @@
-from datetime import datetime
+import json
+import logging
+import tempfile
+import threading
+import time
+from io import StringIO
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf
+from datetime import datetime, timedelta
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
-from django.test import override_settings, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import make_aware, now
 from rest_framework.test import APIClient, APITestCase
@@ -11,7 +25,38 @@ from rest_framework.authtoken.models import Token
 
 from ddm.projects.models import ResearchProfile
 
-from scraper.models import TikTokVideo, Hashtag, TikTokUser, TikTokVideo_B, TikTokUser_B
+from scraper.models import (
+    TikTokVideo, TikTokVideoSnapshot, Hashtag, TikTokUser, TikTokVideo_B, TikTokUser_B,
+    ScrapeCheckpoint, ScrapeWindowWatermark, ApiRequestLedger, IngestJob
+)
+from scraper.scraper import (
+    FIELD_PROFILES, bulk_save_videos_to_db, save_videos_to_db, get_tt_videos_new_day,
+    get_tt_videos_update_account_data, make_api_request
+)
+from scraper.TikTok_Content_Scraper.TT_Scraper._extract_rehydration_data import (
+    _extract_rehydration_data, extract_rehydration_data
+)
+from scraper.TikTok_Content_Scraper.TT_Scraper._json_codec import get_codec, orjson
+from scraper.tasks import ingest_videos, iter_payload, stage_payload
+from scraper.management.commands.benchmark_page_parsing import make_synthetic_page, parse_with_soup
+from scraper.scraper_B import (
+    TT_Scraper_DB_metadata, bulk_save_videos_to_db as bulk_save_videos_to_db_B,
+    load_video_ids_from_db, release_leases
+)
+from scraper.utils.access_token import AccessTokenManager
+from scraper.utils.async_fetch import iter_fetched
+from scraper.utils.checkpoints import get_checkpoint
+from scraper.utils.archive import RawPageArchive, find_shards, iter_shard_pages
+from scraper.utils.coverage import find_coverage_gaps
+from scraper.utils.fake_api import FakeResearchAPI, FakeResearchAPIServer, get_field_values
+from scraper.utils.http import build_session, get_connection_stats
+from scraper.utils.pipeline import fan_out_windows
+from scraper.utils.query_shards import plan_query_shards
+from scraper.utils.quota import RequestBudget, RequestBudgetExhausted
+from scraper.utils.rate_limiter import AdaptiveRateLimiter, get_backoff_delay
+from scraper.utils.seen_filter import SeenVideoFilter
+from scraper.utils.watermarks import get_due_windows, record_window_refresh
+from scraper.utils.window_splitter import bisect_window, estimate_pages, split_dense_windows
 
 
 User = get_user_model()
@@ -117,6 +162,146 @@ class ScraperPostAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn('Imported 0 records successfully', response.data['message'])
 
+    @mock.patch('scraper.api.ingest_videos.delay')
+    def test_bulk_post_is_ingested_in_background(self, delay):
+        """ Test that a bulk post is staged and ingested by a task. """
+        payload = self.valid_video_data + self.invalid_video_data[1:] + ['not a video']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url + '?mode=bulk', payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        delay.assert_called_once_with(job_id)
+        self.assertEqual(response.data['n_errors'], 2)
+        self.assertFalse(TikTokVideo.objects.exists())
+
+        ingest_videos(job_id, chunk_size=1)
+        self.assertEqual(TikTokVideo.objects.count(), 2)
+
+        response = self.client.get(response.data['status_url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], IngestJob.DONE)
+        self.assertEqual(response.data['n_records'], 4)
+        self.assertEqual(response.data['n_processed'], 4)
+        self.assertEqual(response.data['n_errors'], 2)
+        self.assertIsNone(IngestJob.objects.get(pk=job_id).payload)
+
+    def post_ndjson(self, lines, url=None):
+        body = '\n'.join(lines).encode()
+        return self.client.post(url or self.url, body, content_type='application/x-ndjson')
+
+    def test_ndjson_post(self):
+        """ Test that NDJSON is imported with invalid lines counted as errors. """
+        lines = [json.dumps(video) for video in self.valid_video_data] + ['', '{"id": 1,']
+        with mock.patch('scraper.api.INGEST_CHUNK_SIZE', 1):
+            response = self.post_ndjson(lines)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('Imported 2 records successfully', response.data['message'])
+        self.assertIn('1 were skipped due to an error.', response.data['message'])
+        self.assertEqual(TikTokVideo.objects.count(), 2)
+
+    def test_ndjson_post_without_content_length_is_rejected(self):
+        """ Test that chunked uploads, whose body is not read, are not accepted as empty. """
+        body = '\n'.join(json.dumps(video) for video in self.valid_video_data)
+        response = self.client.post(self.url, body, content_type='application/x-ndjson',
+                                    CONTENT_LENGTH='', HTTP_TRANSFER_ENCODING='chunked')
+
+        self.assertEqual(response.status_code, status.HTTP_411_LENGTH_REQUIRED)
+        self.assertEqual(TikTokVideo.objects.count(), 0)
+
+    def test_new_video_without_create_time_is_counted_as_error(self):
+        """ Test that videos skipped by the bulk save are not reported as imported. """
+        video = {k: v for k, v in self.valid_video_data[0].items() if k != 'create_time'}
+        response = self.client.post(self.url, [video, self.valid_video_data[1]], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('Imported 1 records successfully', response.data['message'])
+        self.assertIn('1 were skipped due to an error.', response.data['message'])
+        self.assertEqual(TikTokVideo.objects.count(), 1)
+
+        job = IngestJob.objects.create(created_by=self.user, payload=stage_payload([video])[0],
+                                       n_records=1)
+        ingest_videos(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.n_processed, job.n_errors), (1, 1))
+
+    @mock.patch('scraper.api.ingest_videos.delay')
+    def test_bulk_ndjson_post(self, delay):
+        lines = [json.dumps(video) for video in self.valid_video_data] + ['not json']
+        response = self.post_ndjson(lines, self.url + '?mode=bulk')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = IngestJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual((job.n_records, job.n_errors), (3, 1))
+        self.assertEqual(list(iter_payload(job.payload, read_size=7)), self.valid_video_data)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_retry_with_idempotency_key_is_not_processed_again(self):
+        cache.clear()
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'batch-1'}
+        response = self.client.post(self.url, self.valid_video_data, format='json', **headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with mock.patch('scraper.api.save_videos_to_db') as save_videos:
+            retry = self.client.post(self.url, self.valid_video_data, format='json', **headers)
+            other = self.client.post(self.url, self.valid_video_data, format='json',
+                                     HTTP_IDEMPOTENCY_KEY='batch-2')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, response.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(save_videos.call_count, 1)
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_idempotency_key_reused_for_other_payload_is_rejected(self):
+        cache.clear()
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'batch-1'}
+        self.client.post(self.url, self.valid_video_data, format='json', **headers)
+
+        response = self.client.post(self.url, self.valid_video_data[:1], format='json', **headers)
+        self.assertEqual(response.status_code, HTTPStatus.UNPROCESSABLE_ENTITY)
+        # The same videos as NDJSON are the same payload.
+        body = '\n'.join(json.dumps(video) for video in self.valid_video_data)
+        response = self.client.post(self.url, body, content_type='application/x-ndjson', **headers)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        SCRAPER_IDEMPOTENCY_LOCK_TTL=30
+    )
+    def test_idempotency_key_is_claimed_for_lock_ttl(self):
+        cache.clear()
+        with mock.patch('scraper.api.cache.add', wraps=cache.add) as add:
+            self.client.post(self.url, self.valid_video_data, format='json',
+                             HTTP_IDEMPOTENCY_KEY='batch-1')
+        # The claim of a killed request expires after the lock TTL, not the result TTL.
+        self.assertEqual(add.call_args.args[2], 30)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_failed_request_with_idempotency_key_can_be_retried(self):
+        cache.clear()
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'batch-1'}
+        response = self.client.post(self.url + '?scrapets=x', self.valid_video_data,
+                                    format='json', **headers)
+        self.assertEqual(response.status_code, HTTPStatus.UNPROCESSABLE_ENTITY)
+
+        response = self.client.post(self.url, self.valid_video_data, format='json', **headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(TikTokVideo.objects.count(), 2)
+
+    @mock.patch('scraper.api.ingest_videos.delay')
+    def test_bulk_post_requires_list(self, delay):
+        response = self.client.post(self.url + '?mode=bulk', {'id': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        delay.assert_not_called()
+
+    def test_ingest_job_status_of_other_user_not_found(self):
+        other = User.objects.create_user(username='other', password='<PASSWORD>')
+        job = IngestJob.objects.create(created_by=other)
+        response = self.client.get(reverse('scraper_ingest_job_api', kwargs={'job_id': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class TikTokVideoListAPITestCase(APITestCase):
     """ Tests for the TikTokVideoListAPIView. """
@@ -596,3 +781,1169 @@ class TikTokVideoBListAPITest(TestCase):
         response = self.client.get(self.api_url + '?hashtags=funny,dance')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 2)
+
+
+class BulkSaveVideosToDbTest(TestCase):
+    """ Tests for the set-based ingest path of the Research API scraper. """
+
+    def get_video_data(self, video_id, username='someuser', views=100):
+        return {
+            'id': video_id,
+            'video_description': f'Video {video_id}',
+            'create_time': 1733510690,
+            'username': username,
+            'hashtag_names': ['hashtag1', f'tag{video_id}'],
+            'comment_count': 1,
+            'like_count': 2,
+            'share_count': 3,
+            'view_count': views,
+            'music_id': 7068650753636501506,
+            'region_code': 'DE',
+        }
+
+    def test_new_videos_are_created_with_hashtags(self):
+        videos = [self.get_video_data(i, username=f'user{i % 2}') for i in range(5)]
+        saved_ids = bulk_save_videos_to_db(videos, scrape_ts=1733600000)
+
+        self.assertEqual(saved_ids, set(range(5)))
+        self.assertEqual(TikTokVideo.objects.count(), 5)
+        self.assertEqual(TikTokUser.objects.count(), 2)
+        video = TikTokVideo.objects.get(video_id=3)
+        self.assertEqual(video.author_id.name, 'user1')
+        self.assertCountEqual(
+            video.hashtags.values_list('name', flat=True), ['hashtag1', 'tag3'])
+
+    def test_existing_videos_are_updated_only_if_newer(self):
+        bulk_save_videos_to_db([self.get_video_data(1)], scrape_ts=1733600000)
+
+        bulk_save_videos_to_db([self.get_video_data(1, views=500)], scrape_ts=1733700000)
+        self.assertEqual(TikTokVideo.objects.get(video_id=1).view_count, 500)
+
+        bulk_save_videos_to_db([self.get_video_data(1, views=50)], scrape_ts=1733650000)
+        self.assertEqual(TikTokVideo.objects.get(video_id=1).view_count, 500)
+
+    def test_engagement_snapshots_are_appended(self):
+        bulk_save_videos_to_db([self.get_video_data(1)], scrape_ts=1733600000)
+        bulk_save_videos_to_db([self.get_video_data(1, views=500)], scrape_ts=1733700000)
+        # Late (e.g., replayed) pages add history without changing the latest values.
+        bulk_save_videos_to_db([self.get_video_data(1, views=50)], scrape_ts=1733650000)
+        bulk_save_videos_to_db([self.get_video_data(1, views=50)], scrape_ts=1733650000)
+
+        self.assertEqual(TikTokVideo.objects.get(video_id=1).view_count, 500)
+        self.assertEqual(
+            list(TikTokVideoSnapshot.objects.filter(video_id=1)
+                 .order_by('scrape_date').values_list('view_count', flat=True)),
+            [100, 50, 500])
+
+    def test_unknown_videos_without_all_fields_are_skipped(self):
+        bulk_save_videos_to_db([self.get_video_data(1)], scrape_ts=1733600000)
+        engagement_page = [
+            {'id': 1, 'view_count': 500, 'like_count': 1, 'share_count': 1, 'comment_count': 1},
+            {'id': 2, 'view_count': 10, 'like_count': 1, 'share_count': 1, 'comment_count': 1},
+        ]
+        self.assertEqual(bulk_save_videos_to_db(engagement_page, scrape_ts=1733700000), {1})
+        self.assertEqual(TikTokVideo.objects.get(video_id=1).view_count, 500)
+        self.assertFalse(TikTokVideo.objects.filter(video_id=2).exists())
+
+    def test_query_count_is_independent_of_page_size(self):
+        small_page = [self.get_video_data(i) for i in range(2)]
+        large_page = [self.get_video_data(i) for i in range(100, 200)]
+
+        with CaptureQueriesContext(connection) as small_ctx:
+            bulk_save_videos_to_db(small_page, scrape_ts=1733600000)
+        with CaptureQueriesContext(connection) as large_ctx:
+            bulk_save_videos_to_db(large_page, scrape_ts=1733600000)
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
+
+    def test_invalid_entries_fall_back_to_single_saves(self):
+        videos = [self.get_video_data(1), {'id': 2, 'view_count': 10}]
+        self.assertEqual(save_videos_to_db(videos, scrape_ts=1733600000), 1)
+        self.assertEqual(TikTokVideo.objects.count(), 1)
+        self.assertEqual(TikTokVideoSnapshot.objects.get().video_id, 1)
+
+
+class FanOutWindowsTest(SimpleTestCase):
+    """ Tests for the concurrent date-window fan-out. """
+
+    def setUp(self):
+        self.logger = logging.getLogger('test_fan_out')
+        self.windows = [('20250101', '20250130'), ('20250131', '20250301'), ('20250302', '20250331')]
+
+    def fetch_window(self, window):
+        for page in range(3):
+            yield {'window': window, 'page': page}
+
+    def test_all_pages_of_all_windows_are_saved(self):
+        saved = []
+        n_pages = fan_out_windows(
+            self.windows, self.fetch_window,
+            lambda window, page: saved.append((window, page['page'])),
+            max_workers=2, logger=self.logger
+        )
+        self.assertEqual(n_pages, 9)
+        self.assertCountEqual(
+            saved, [(w, p) for w in self.windows for p in range(3)])
+
+    def test_max_pages_stops_early(self):
+        n_pages = fan_out_windows(
+            self.windows, self.fetch_window, lambda window, page: None,
+            max_workers=3, logger=self.logger, max_pages=4
+        )
+        self.assertEqual(n_pages, 4)
+
+    def test_worker_exception_is_raised(self):
+        def failing_fetch(window):
+            yield {'page': 0}
+            raise ValueError('API down')
+
+        with self.assertRaises(ValueError):
+            fan_out_windows(
+                self.windows, failing_fetch, lambda window, page: None,
+                max_workers=2, logger=self.logger
+            )
+
+    def test_failed_window_does_not_stop_others(self):
+        def fetch_window(window):
+            if window == self.windows[0]:
+                raise ValueError('bad shard')
+            yield {'page': 0}
+
+        with self.assertLogs(self.logger, level='ERROR'):
+            n_pages = fan_out_windows(
+                self.windows, fetch_window, lambda window, page: None,
+                max_workers=3, logger=self.logger, fail_fast=False
+            )
+        self.assertEqual(n_pages, 2)
+
+    def test_queue_is_bounded(self):
+        fetched = []
+
+        def fetch_window(window):
+            for page in range(10):
+                fetched.append(page)
+                yield {'page': page}
+
+        def save_page(window, page):
+            # The fetcher may only run queue_size pages (plus the one it
+            # holds) ahead of the writer.
+            self.assertLessEqual(len(fetched) - page['page'], 4)
+            time.sleep(0.01)
+
+        n_pages = fan_out_windows(
+            self.windows[:1], fetch_window, save_page,
+            max_workers=1, logger=self.logger, queue_size=2
+        )
+        self.assertEqual(n_pages, 10)
+
+    def test_stats_are_logged(self):
+        with self.assertLogs(self.logger, level='INFO') as logs:
+            fan_out_windows(
+                self.windows, self.fetch_window, lambda window, page: None,
+                max_workers=2, logger=self.logger, log_interval=5
+            )
+        stats = [line for line in logs.output if 'queue depth' in line]
+        self.assertEqual(len(stats), 2)
+        self.assertIn('Pipeline finished: fetched 9 / wrote 9 pages', stats[-1])
+
+
+class AsyncFetchTest(SimpleTestCase):
+    """ Tests for the asyncio fetch engine. """
+
+    def setUp(self):
+        self.logger = logging.getLogger('test_async_fetch')
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.max_in_flight = {}
+
+    def fetch(self, item):
+        host = item % 2
+        with self.lock:
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            total = sum(self.in_flight.values())
+            self.max_in_flight['total'] = max(self.max_in_flight.get('total', 0), total)
+            self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self.in_flight[host])
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight[host] -= 1
+        if item == 3:
+            raise ValueError('failed')
+        return item * 10
+
+    def test_results_and_errors_are_yielded(self):
+        results = list(iter_fetched(range(8), self.fetch, 4, self.logger))
+        self.assertCountEqual([(i, r) for i, r, e in results if e is None],
+                              [(i, i * 10) for i in range(8) if i != 3])
+        errors = [(i, e) for i, r, e in results if e is not None]
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0][1], ValueError)
+
+    def test_concurrency_is_bounded_globally_and_per_host(self):
+        list(iter_fetched(range(24), self.fetch, 6, self.logger,
+                          host_of=lambda item: item % 2, host_concurrency=2))
+        self.assertEqual(self.max_in_flight['total'], 4)
+        self.assertLessEqual(self.max_in_flight[0], 2)
+        self.assertLessEqual(self.max_in_flight[1], 2)
+
+    def test_slots_wait_between_requests(self):
+        starts = []
+        start = time.monotonic()
+        list(iter_fetched(range(4), lambda item: starts.append(time.monotonic() - start),
+                          2, self.logger, wait_time=0.1))
+        starts.sort()
+        # Two slots: the third and fourth requests wait for the politeness delay.
+        self.assertLess(starts[1], 0.1)
+        self.assertGreaterEqual(starts[2], 0.09)
+
+    def test_closing_early_stops_fetching(self):
+        fetched = []
+        results = iter_fetched(range(100), fetched.append, 2, self.logger, queue_size=1)
+        next(results)
+        results.close()
+        self.assertLess(len(fetched), 100)
+
+
+class ScraperBAsyncTest(TestCase):
+    """ Tests for the concurrent scraping of video pages. """
+
+    def setUp(self):
+        self.logger = logging.getLogger('test_scraper_b')
+        self.logger.addHandler(logging.NullHandler())
+        self.logger.propagate = False
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # The vendored scraper configures the root logger otherwise.
+        with mock.patch('logging.basicConfig'):
+            self.scraper = TT_Scraper_DB_metadata(
+                wait_time=0, output_files_fp=self.tmp_dir.name + '/', logger=self.logger)
+        for video_id in ['1', '2', '3']:
+            TikTokVideo_B.objects.create(video_id=video_id)
+        TikTokVideo_B.objects.create(video_id='4', scrape_date=now())
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_results_are_saved_like_sequential_scrape(self):
+        def fetch(video_id, scrape_content=False):
+            if video_id == '3':
+                raise ConnectionError('timeout')
+            return None if video_id == '2' else {'video_metadata': {'id': video_id}}
+
+        with mock.patch.object(self.scraper, 'fetch', side_effect=fetch) as fetch_mock, \
+                mock.patch('scraper.scraper_B.save_video_to_db', return_value=None) as save:
+            self.scraper.scrape_list_async(['1', '2', '3', '4'], concurrency=3)
+
+        self.assertCountEqual([c.args[0] for c in fetch_mock.call_args_list], ['1', '2', '3'])
+        save.assert_called_once()
+        failed = TikTokVideo_B.objects.get(video_id='2')
+        self.assertEqual(failed.scrape_status, 'Failed to get metadata for video 2')
+        self.assertFalse(failed.scrape_success)
+        self.assertIsNotNone(TikTokVideo_B.objects.get(video_id='3').scrape_date)
+
+    def test_fetching_threads_do_not_share_request_state(self):
+        used = []
+
+        def fetch(scraper, video_id, scrape_content=False):
+            used.append((threading.get_ident(), scraper.session, scraper.headers))
+            # A reset after an error only affects this thread's copy.
+            scraper._init_request_headers()
+            time.sleep(0.01)
+            return None
+
+        with mock.patch.object(TT_Scraper_DB_metadata, 'fetch', autospec=True, side_effect=fetch):
+            self.scraper.scrape_list_async(['1', '2', '3'], concurrency=3)
+
+        self.assertEqual(len(used), 3)
+        sessions = {thread: session for thread, session, _ in used}
+        self.assertEqual(len(set(map(id, sessions.values()))), len(sessions))
+        self.assertNotIn(self.scraper.session, sessions.values())
+        self.assertFalse(any(headers is self.scraper.headers for _, _, headers in used))
+
+
+class ScraperBBulkSaveTest(TestCase):
+    """ Tests for the buffered, set-based saving of scraper B results. """
+
+    def setUp(self):
+        self.logger = logging.getLogger('test_scraper_b')
+        self.logger.addHandler(logging.NullHandler())
+        self.logger.propagate = False
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        with mock.patch('logging.basicConfig'):
+            self.scraper = TT_Scraper_DB_metadata(
+                wait_time=0, output_files_fp=self.tmp_dir.name + '/', logger=self.logger)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_package(self, video_id, author_id='100', mentions=(), hashtags=('tag1',)):
+        author_flags = ['verified', 'ftc', 'open_favorite', 'private_account', 'secret',
+                        'is_ad_virtual', 'suggest_account_bind']
+        video_flags = ['is_ad', 'original_item', 'offical_item', 'secret', 'for_friend', 'digged',
+                       'private_item', 'duet_enabled', 'stitch_enabled', 'share_enabled',
+                       'index_enabled', 'is_ai_gc']
+        return {
+            'video_metadata': {
+                'id': video_id, 'description': f'Video {video_id}', 'diggcount': 5,
+                'playcount': 50, 'mentions': list(mentions), 'hashtags': list(hashtags),
+                **{flag: False for flag in video_flags},
+            },
+            'file_metadata': {'duration': 10},
+            'music_metadata': {'id': 7068650753636501506},
+            'author_metadata': {'id': author_id, 'username': f'user{author_id}',
+                                **{flag: False for flag in author_flags}},
+            'hashtags_metadata': [],
+        }
+
+    def test_bulk_save_creates_related_rows(self):
+        TikTokVideo_B.objects.create(video_id='1')
+        TikTokUser_B.objects.create(author_id='101', username='scraped', scrape_success=True)
+        packages = [
+            self.get_package('1', mentions=['200']),
+            self.get_package('2', author_id='101', mentions=['200', '201'], hashtags=['tag1', 'tag2']),
+        ]
+        results = bulk_save_videos_to_db_B(packages + [{'video_metadata': {}}], logger=self.logger)
+
+        self.assertEqual(results, {'1': None, '2': None, None: 'No video ID found in video_metadata'})
+        video = TikTokVideo_B.objects.get(video_id='2')
+        self.assertTrue(video.scrape_success)
+        self.assertEqual(video.like_count, 5)
+        self.assertEqual(video.duration, 10)
+        self.assertEqual(video.author_id.username, 'scraped')
+        self.assertCountEqual(video.hashtags.values_list('name', flat=True), ['tag1', 'tag2'])
+        self.assertCountEqual(video.mentions.values_list('username', flat=True),
+                              ['temp_user_200', 'temp_user_201'])
+        self.assertEqual(TikTokUser_B.objects.get(author_id='100').username, 'user100')
+        self.assertEqual(TikTokUser_B.objects.count(), 4)
+        self.assertEqual(Hashtag.objects.count(), 2)
+
+    def test_bulk_save_uses_constant_number_of_queries(self):
+        def save(video_ids):
+            with CaptureQueriesContext(connection) as queries:
+                bulk_save_videos_to_db_B(
+                    [self.get_package(str(i), author_id=str(i), mentions=[str(i + 1000)],
+                                      hashtags=[f'tag{i}']) for i in video_ids],
+                    logger=self.logger)
+            return len(queries)
+
+        self.assertEqual(save(range(2)), save(range(10, 20)))
+        self.assertEqual(TikTokVideo_B.objects.filter(scrape_success=True).count(), 12)
+
+    def test_bulk_save_keeps_scraped_videos(self):
+        video = TikTokVideo_B.objects.create(
+            video_id='1', video_description='Original', scrape_success=True)
+        unscraped = TikTokVideo_B.objects.create(video_id='2')
+        unscraped.hashtags.set([Hashtag.objects.create(name='old')])
+
+        bulk_save_videos_to_db_B([self.get_package('1'), self.get_package('2')], logger=self.logger)
+
+        video.refresh_from_db()
+        self.assertEqual(video.video_description, 'Original')
+        self.assertEqual(video.hashtags.count(), 0)
+        self.assertEqual(list(unscraped.hashtags.values_list('name', flat=True)), ['tag1'])
+
+    def test_buffered_results_are_flushed_by_size_and_interval(self):
+        self.scraper.flush_size = 2
+        for video_id in ['1', '2', '3']:
+            self.assertTrue(self.scraper.save_result(video_id, self.get_package(video_id), buffered=True))
+        self.assertEqual(TikTokVideo_B.objects.count(), 2)
+        self.assertEqual(len(self.scraper.buffer), 1)
+
+        self.scraper.flush_interval = 0
+        self.scraper.save_result('4', self.get_package('4'), buffered=True)
+        self.assertEqual(TikTokVideo_B.objects.filter(scrape_success=True).count(), 4)
+        self.assertEqual(self.scraper.buffer, [])
+
+    def test_scrape_list_flushes_buffer(self):
+        TikTokVideo_B.objects.create(video_id='3')
+        with mock.patch.object(self.scraper, 'fetch',
+                               side_effect=lambda video_id, scrape_content=False:
+                               self.get_package(video_id) if video_id != '3' else None):
+            self.scraper.scrape_list(['1', '2', '3'])
+
+        self.assertEqual(TikTokVideo_B.objects.filter(scrape_success=True).count(), 2)
+        self.assertEqual(TikTokVideo_B.objects.get(video_id='3').scrape_status,
+                         'Failed to get metadata for video 3')
+
+    def test_failed_flush_falls_back_to_single_saves(self):
+        self.scraper.save_result('1', self.get_package('1'), buffered=True)
+        self.scraper.save_result('2', self.get_package('2'), buffered=True)
+        with mock.patch('scraper.scraper_B.bulk_save_videos_to_db', side_effect=ValueError('boom')):
+            self.scraper.flush()
+        self.assertEqual(TikTokVideo_B.objects.filter(scrape_success=True).count(), 2)
+
+
+class RehydrationExtractionTest(SimpleTestCase):
+    """ Tests for slicing the rehydration data from raw page bytes. """
+
+    def test_sliced_data_matches_soup(self):
+        page = make_synthetic_page(n_elements=10)
+        data = extract_rehydration_data(page)
+        self.assertEqual(data, parse_with_soup(page))
+        self.assertIn('webapp.video-detail', data['__DEFAULT_SCOPE__'])
+
+    def test_unusual_pages_are_not_sliced(self):
+        self.assertIsNone(extract_rehydration_data(b'<html>no data</html>'))
+        self.assertIsNone(extract_rehydration_data(
+            b'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__">{"broken": </script>'))
+        # The ID outside of the script tag.
+        self.assertIsNone(extract_rehydration_data(
+            b'<script src="a.js"></script><div id="__UNIVERSAL_DATA_FOR_REHYDRATION__">{}</div>'))
+
+    def test_soup_fallback(self):
+        page = (b'<div data-x="__UNIVERSAL_DATA_FOR_REHYDRATION__"></div>'
+                b'<script type="application/json" id="__UNIVERSAL_DATA_FOR_REHYDRATION__">'
+                b'{"a": 1}</script>')
+        response = mock.Mock(content=page, text=page.decode())
+        self.assertIsNone(extract_rehydration_data(page))
+        scraper = mock.Mock(json_codec=get_codec('json'))
+        self.assertEqual(_extract_rehydration_data(scraper, response), {'a': 1})
+
+        response = mock.Mock(content=b'<html></html>', text='<html></html>')
+        with self.assertRaises(AttributeError):
+            _extract_rehydration_data(scraper, response)
+
+
+class JSONCodecTest(SimpleTestCase):
+    """ Tests for the JSON codecs of the scrapers. """
+    payload = {'id': 7445371706207669526, 'desc': 'Wahl äöü', 'tags': ['a', 'b'], 'n': None}
+
+    def test_codecs_round_trip(self):
+        for name in ['json'] + (['orjson'] if orjson else []):
+            codec = get_codec(name)
+            self.assertEqual(codec.loads(codec.dumps(self.payload)), self.payload)
+            self.assertEqual(json.loads(codec.dumps(self.payload, indent=True)), self.payload)
+            self.assertIn('Wahl äöü'.encode(), codec.dumps(self.payload))
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_falls_back_to_stdlib(self):
+        self.assertEqual(get_codec('orjson').dumps({'n': 2 ** 70}), b'{"n": 1180591620717411303424}')
+
+    def test_get_codec(self):
+        self.assertEqual(get_codec('auto').name, 'orjson' if orjson else 'json')
+        with mock.patch('scraper.TikTok_Content_Scraper.TT_Scraper._json_codec.orjson', None):
+            self.assertEqual(get_codec('auto').name, 'json')
+            with self.assertRaises(ImportError):
+                get_codec('orjson')
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+
+class VideoLeaseTest(TestCase):
+    """ Tests for the leased work queue of scraper B. """
+
+    def setUp(self):
+        for i in range(1, 6):
+            TikTokVideo_B.objects.create(video_id=str(i), scrape_priority=i)
+        TikTokVideo_B.objects.create(video_id='6', scrape_priority=10, scrape_date=now())
+
+    def test_workers_claim_disjoint_batches(self):
+        first = load_video_ids_from_db('worker-1', batch_size=3)
+        second = load_video_ids_from_db('worker-2', batch_size=3)
+
+        self.assertEqual(first, ['5', '4', '3'])
+        self.assertEqual(second, ['2', '1'])
+        self.assertEqual(load_video_ids_from_db('worker-3'), [])
+
+    def test_skip_locked_claim(self):
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            self.assertEqual(load_video_ids_from_db('worker-1', batch_size=2), ['5', '4'])
+        self.assertEqual(
+            TikTokVideo_B.objects.filter(lease_owner='worker-1').count(), 2)
+
+    def test_expired_and_released_leases_are_reclaimed(self):
+        load_video_ids_from_db('worker-1', batch_size=2)
+        TikTokVideo_B.objects.filter(video_id='5').update(lease_expires=now() - timedelta(seconds=1))
+        self.assertEqual(load_video_ids_from_db('worker-2', batch_size=2), ['5', '3'])
+
+        release_leases('worker-2')
+        self.assertEqual(load_video_ids_from_db('worker-3'), ['5', '3', '2', '1'])
+
+    @override_settings(SCRAPER_B_LEASE_SECONDS=60)
+    def test_leases_are_renewed_while_batch_is_scraped(self):
+        logger = logging.getLogger('test_scraper_b')
+        logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        with mock.patch('logging.basicConfig'):
+            scraper = TT_Scraper_DB_metadata(
+                wait_time=0, output_files_fp=tmp_dir.name + '/', logger=logger)
+        scraper.lease_owner = 'worker-1'
+        video_ids = load_video_ids_from_db('worker-1', batch_size=2)
+        TikTokVideo_B.objects.filter(lease_owner='worker-1').update(
+            lease_expires=now() + timedelta(seconds=1))
+
+        with mock.patch.object(scraper, 'fetch', return_value=None), \
+                mock.patch('scraper.scraper_B.time.monotonic', side_effect=lambda: time.time() + 3600):
+            scraper.scrape_list(video_ids[:1])
+
+        # The failed video is not leased again, the other lease is renewed.
+        self.assertEqual(load_video_ids_from_db('worker-2'), ['3', '2', '1'])
+        leased = TikTokVideo_B.objects.get(video_id=video_ids[1])
+        self.assertEqual(leased.lease_owner, 'worker-1')
+        self.assertGreater(leased.lease_expires, now() + timedelta(seconds=30))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AccessTokenManagerTest(SimpleTestCase):
+    """ Tests for the cached Research API access token. """
+
+    def setUp(self):
+        self.n_fetched = 0
+
+        def fetch_token():
+            self.n_fetched += 1
+            return {'access_token': f'token{self.n_fetched}', 'expires_in': 7200}
+
+        self.manager = AccessTokenManager(fetch_token, cache_key='test_access_token')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_token_is_cached(self):
+        self.assertEqual(self.manager.get_token(), 'token1')
+        self.assertEqual(self.manager.get_token(), 'token1')
+        self.assertEqual(self.n_fetched, 1)
+
+    def test_token_is_refreshed_before_expiry(self):
+        self.manager.get_token()
+        self.assertEqual(cache.get('test_access_token'), 'token1')
+        cache.delete('test_access_token')  # Simulate cache timeout.
+        self.assertEqual(self.manager.get_token(), 'token2')
+
+    def test_invalidate_only_removes_current_token(self):
+        self.manager.get_token()
+        self.manager.invalidate('some-old-token')
+        self.assertEqual(self.manager.get_token(), 'token1')
+
+        self.manager.invalidate('token1')
+        self.assertEqual(self.manager.get_token(), 'token2')
+
+
+class AdaptiveRateLimiterTest(SimpleTestCase):
+    """ Tests for the AIMD rate limiter of the Research API client. """
+
+    def test_rate_increases_additively_up_to_max(self):
+        limiter = AdaptiveRateLimiter(10, max_requests_per_minute=12, increase_step=1)
+        for _ in range(5):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 12)
+
+    def test_rate_decreases_multiplicatively_down_to_min(self):
+        limiter = AdaptiveRateLimiter(
+            16, min_requests_per_minute=3, decrease_factor=0.5, base_backoff=0)
+        limiter.on_error()
+        self.assertEqual(limiter.rate, 8)
+        limiter.on_error()
+        limiter.on_error()
+        self.assertEqual(limiter.rate, 3)
+
+    def test_backoff_grows_exponentially(self):
+        for attempt in range(4):
+            delay = get_backoff_delay(attempt, base_delay=10, max_delay=300)
+            self.assertGreaterEqual(delay, 10 * 2 ** attempt / 2)
+            self.assertLessEqual(delay, 10 * 2 ** attempt)
+        self.assertLessEqual(get_backoff_delay(10, base_delay=10, max_delay=300), 300)
+
+    def test_wait_spaces_requests(self):
+        limiter = AdaptiveRateLimiter(600)  # One request every 0.1 seconds.
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PooledSessionTest(SimpleTestCase):
+    """ Tests for the pooled HTTP session used by the scrapers. """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        session = build_session(pool_size=2, timeout=5)
+        for _ in range(3):
+            session.get(self.url)
+
+        stats = get_connection_stats(session)
+        self.assertEqual(stats['127.0.0.1'], {'requests': 3, 'connections': 1, 'reused': 2})
+
+
+@override_settings(SCRAPER_ARCHIVE_RAW_PAGES=False)
+@mock.patch('scraper.scraper.request_access_token', return_value='token')
+@mock.patch('scraper.scraper.get_username_list', return_value=['someuser'])
+class ScrapeCheckpointTest(TestCase):
+    """ Tests for resuming Research API scrapes from checkpoints. """
+
+    def setUp(self):
+        self.logger = logging.getLogger('test_checkpoints')
+        self.logger.addHandler(logging.NullHandler())
+        self.requested_cursors = []
+
+    def get_page(self, cursor, has_more=True):
+        return {'data': {
+            'videos': [{
+                'id': cursor + 1, 'username': 'someuser', 'create_time': 1733510690,
+                'hashtag_names': [], 'view_count': 1,
+            }],
+            'cursor': cursor + 100,
+            'has_more': has_more,
+            'search_id': 'search-1',
+        }}
+
+    def fake_request(self, fail_at=None):
+        def make_api_request(url, headers, query_params, **kwargs):
+            cursor = query_params['cursor']
+            self.requested_cursors.append(cursor)
+            if cursor == fail_at:
+                raise ConnectionError('Connection lost')
+            return self.get_page(cursor, has_more=cursor < 300)
+        return make_api_request
+
+    def test_resume_continues_from_last_persisted_page(self, *mocks):
+        with mock.patch('scraper.scraper.make_api_request', self.fake_request(fail_at=200)):
+            with self.assertRaises(ConnectionError):
+                get_tt_videos_new_day(specific_date='20250101', logger=self.logger)
+
+        checkpoint = ScrapeCheckpoint.objects.get(mode='new_day', start_date='20250101')
+        self.assertEqual((checkpoint.cursor, checkpoint.n_pages), (200, 2))
+        self.assertFalse(checkpoint.completed)
+
+        self.requested_cursors = []
+        with mock.patch('scraper.scraper.make_api_request', self.fake_request()):
+            get_tt_videos_new_day(specific_date='20250101', logger=self.logger, resume=True)
+
+        self.assertEqual(self.requested_cursors, [200, 300])
+        checkpoint.refresh_from_db()
+        self.assertTrue(checkpoint.completed)
+        self.assertEqual(TikTokVideo.objects.count(), 4)
+
+    def test_failing_video_does_not_roll_back_page(self, *mocks):
+        page = self.get_page(0, has_more=False)
+        page['data']['videos'] = [
+            {'id': video_id, 'username': 'someuser', 'create_time': 1733510690,
+             'hashtag_names': [], 'view_count': 1, 'music_id': music_id}
+            for video_id, music_id in [(1, 1), (2, 2 ** 70), (3, 1)]
+        ]
+        with mock.patch('scraper.scraper.make_api_request', return_value=page):
+            get_tt_videos_new_day(specific_date='20250101', logger=self.logger)
+
+        # Only the video that cannot be stored is lost.
+        self.assertCountEqual(TikTokVideo.objects.values_list('video_id', flat=True), [1, 3])
+        checkpoint = ScrapeCheckpoint.objects.get(mode='new_day', start_date='20250101')
+        self.assertEqual((checkpoint.cursor, checkpoint.completed), (100, True))
+
+    def test_checkpoint_of_another_query_is_reset(self, *mocks):
+        checkpoint = get_checkpoint('new_day_1of2', ('20250101', '20250101'),
+                                    query={'usernames': ['a'], 'hashtags': []})
+        ScrapeCheckpoint.objects.filter(pk=checkpoint.pk).update(cursor=200, n_pages=2)
+
+        query = {'usernames': ['a', 'b'], 'hashtags': []}
+        checkpoint = get_checkpoint('new_day_1of2', ('20250101', '20250101'), True, query=query)
+        self.assertEqual((checkpoint.cursor, checkpoint.n_pages, checkpoint.query), (0, 0, query))
+
+    def test_without_resume_scrape_starts_from_first_page(self, *mocks):
+        ScrapeCheckpoint.objects.create(
+            mode='new_day', start_date='20250101', end_date='20250101',
+            cursor=200, completed=True, n_pages=2)
+
+        with mock.patch('scraper.scraper.make_api_request', self.fake_request()):
+            get_tt_videos_new_day(specific_date='20250101', logger=self.logger)
+
+        self.assertEqual(self.requested_cursors, [0, 100, 200, 300])
+
+
+@override_settings(
+    SCRAPER_REFRESH_INTERVALS=[(30, 1), (90, 7), (None, 30)],
+    SCRAPER_REFRESH_CHANGE_THRESHOLD=0.05
+)
+class ScrapeWindowWatermarkTest(TestCase):
+    """ Tests for the incremental scheduling of account history windows. """
+
+    def setUp(self):
+        self.now = make_aware(datetime(2025, 6, 1, 12, 0, 0))
+        self.recent = ('20250501', '20250530')
+        self.medium = ('20250301', '20250330')
+        self.old = ('20250101', '20250130')
+
+    def create_watermark(self, date_range, days_ago, change=0.0):
+        ScrapeWindowWatermark.objects.create(
+            start_date=date_range[0], end_date=date_range[1],
+            last_refreshed=self.now - timedelta(days=days_ago),
+            engagement_change=change
+        )
+
+    def test_windows_without_watermark_are_due(self):
+        self.assertEqual(get_due_windows([self.old], now=self.now), [self.old])
+
+    def test_refresh_interval_grows_with_window_age(self):
+        for date_range in [self.recent, self.medium, self.old]:
+            self.create_watermark(date_range, days_ago=2)
+        self.assertEqual(
+            get_due_windows([self.recent, self.medium, self.old], now=self.now),
+            [self.recent]
+        )
+
+    def test_changing_windows_are_refreshed_more_often(self):
+        self.create_watermark(self.medium, days_ago=4, change=0.2)
+        self.create_watermark(self.old, days_ago=4, change=0.0)
+        self.assertEqual(get_due_windows([self.medium, self.old], now=self.now), [self.medium])
+
+    def test_most_overdue_windows_come_first(self):
+        self.create_watermark(self.recent, days_ago=2)
+        self.create_watermark(self.old, days_ago=90)
+        self.assertEqual(
+            get_due_windows([self.recent, self.old], now=self.now),
+            [self.old, self.recent]
+        )
+
+    def test_record_window_refresh_tracks_engagement_change(self):
+        user = TikTokUser.objects.create(name='someuser')
+        video = TikTokVideo.objects.create(
+            video_id=1, create_time=make_aware(datetime(2025, 1, 10)), author_id=user,
+            view_count=100, like_count=0, share_count=0, comment_count=0)
+        self.assertIsNone(record_window_refresh(self.old).engagement_change)
+
+        video.view_count = 150
+        video.save()
+        watermark = record_window_refresh(self.old)
+        self.assertAlmostEqual(watermark.engagement_change, 0.5)
+        self.assertEqual(watermark.n_refreshes, 2)
+
+
+class RawPageArchiveTest(TestCase):
+    """ Tests for the raw page archive and its offline replay. """
+
+    def setUp(self):
+        self.archive_dir = tempfile.TemporaryDirectory()
+        self.archive = RawPageArchive('accounts', archive_dir=self.archive_dir.name)
+
+    def tearDown(self):
+        self.archive_dir.cleanup()
+
+    def get_page(self, video_ids):
+        return {
+            'videos': [{
+                'id': video_id, 'username': 'someuser', 'create_time': 1733510690,
+                'hashtag_names': ['tag'], 'view_count': 10,
+            } for video_id in video_ids],
+            'cursor': 100, 'has_more': True, 'search_id': 'search-1',
+        }
+
+    def test_pages_are_appended_to_window_shards(self):
+        self.archive.append(('20250101', '20250130'), 0, '', 1733600000, self.get_page([1]))
+        self.archive.append(('20250101', '20250130'), 100, 'search-1', 1733600000, self.get_page([2]))
+        self.archive.append(('20250131', '20250301'), 0, '', 1733600000, self.get_page([3]))
+
+        shards = find_shards([self.archive_dir.name])
+        self.assertEqual(len(shards), 2)
+        records = list(iter_shard_pages(self.archive.get_shard_path(('20250101', '20250130'))))
+        self.assertEqual([r['cursor'] for r in records], [0, 100])
+        self.assertEqual(records[1]['data']['videos'][0]['id'], 2)
+
+    def test_replay_ingests_archived_pages(self):
+        self.archive.append(('20250101', '20250130'), 0, '', 1733600000, self.get_page([1, 2]))
+        self.archive.append(('20250131', '20250301'), 0, '', 1733600000, self.get_page([3]))
+
+        with mock.patch('scraper.management.commands.replay_raw_pages.setup_logger',
+                        return_value=logging.getLogger('test_replay')):
+            call_command('replay_raw_pages', self.archive_dir.name, workers=1, stdout=StringIO())
+
+        self.assertCountEqual(
+            TikTokVideo.objects.values_list('video_id', flat=True), [1, 2, 3])
+
+
+class QueryShardsTest(SimpleTestCase):
+    """ Tests for splitting the Research API query into balanced shards. """
+
+    def test_shards_cover_all_terms(self):
+        usernames = [f'user{i}' for i in range(10)]
+        hashtags = ['tag1', 'tag2']
+        shards = plan_query_shards(usernames, hashtags, 3)
+
+        self.assertEqual(len(shards), 3)
+        self.assertCountEqual(sum((s.usernames for s in shards), []), usernames)
+        self.assertCountEqual(sum((s.hashtags for s in shards), []), hashtags)
+        self.assertEqual([len(s.usernames) + len(s.hashtags) for s in shards], [4, 4, 4])
+
+    def test_shards_are_balanced_by_weight(self):
+        shards = plan_query_shards(
+            ['big', 'a', 'b', 'c'], ['tag'], 2,
+            username_weights={'big': 9, 'a': 2, 'b': 2, 'c': 2},
+            hashtag_weights={'tag': 2}
+        )
+        self.assertIn(['big'], [s.usernames for s in shards])
+
+    def test_empty_shards_are_dropped(self):
+        self.assertEqual(len(plan_query_shards(['a'], [], 4)), 1)
+
+
+class WindowSplitterTest(SimpleTestCase):
+    """ Tests for the adaptive splitting of dense date windows. """
+
+    def test_bisect_window(self):
+        self.assertEqual(
+            bisect_window(('20250101', '20250130')),
+            [('20250101', '20250115'), ('20250116', '20250130')])
+        self.assertEqual(
+            bisect_window(('20250101', '20250102')),
+            [('20250101', '20250101'), ('20250102', '20250102')])
+        self.assertEqual(bisect_window(('20250101', '20250101')), [])
+
+    def test_dense_windows_are_split_down_to_single_days(self):
+        daily_counts = {
+            datetime(2025, 1, 1).date() + timedelta(days=i): 100 for i in range(30)}
+        daily_counts[datetime(2025, 1, 20).date()] = 5000
+
+        windows = split_dense_windows(
+            [('20250101', '20250130'), ('20250131', '20250301')], daily_counts, max_pages=20)
+
+        self.assertIn(('20250120', '20250120'), windows)
+        self.assertIn(('20250131', '20250301'), windows)
+        self.assertEqual(windows[0][0], '20250101')
+        for a, b in zip(windows, windows[1:]):
+            self.assertEqual(
+                datetime.strptime(a[1], '%Y%m%d') + timedelta(days=1),
+                datetime.strptime(b[0], '%Y%m%d'))
+        self.assertTrue(all(estimate_pages(w, daily_counts) <= 20
+                            for w in windows if w[0] != w[1]))
+
+    def test_sparse_windows_are_kept(self):
+        windows = [('20250101', '20250130')]
+        self.assertEqual(split_dense_windows(windows, {}, max_pages=1), windows)
+
+
+class SeenVideoFilterTest(SimpleTestCase):
+    """ Tests for the per-run filter of already saved videos. """
+
+    def test_unchanged_duplicates_are_skipped(self):
+        seen_filter = SeenVideoFilter()
+        videos = [{'id': 1, 'view_count': 10}, {'id': 2, 'view_count': 5}]
+        self.assertEqual(seen_filter.filter(videos), videos)
+
+        changed = {'id': 2, 'view_count': 6}
+        self.assertEqual(
+            seen_filter.filter([{'id': 1, 'view_count': 10}, changed]), [changed])
+        self.assertEqual(len(seen_filter), 2)
+        self.assertEqual(seen_filter.n_duplicates, 1)
+        self.assertEqual(seen_filter.duplicate_rate, 0.25)
+
+    def test_duplicates_within_a_page_are_skipped(self):
+        seen_filter = SeenVideoFilter()
+        self.assertEqual(len(seen_filter.filter([{'id': 1}, {'id': 1}])), 1)
+
+
+class CoverageGapTest(TestCase):
+    """ Tests for the detection and backfill of days with missing videos. """
+
+    def setUp(self):
+        user = TikTokUser.objects.create(name='someuser')
+        videos = []
+        for day in range(1, 21):
+            n_videos = 2 if day == 18 else 20
+            for i in range(n_videos):
+                videos.append(TikTokVideo(
+                    video_id=day * 1000 + i, author_id=user,
+                    create_time=make_aware(datetime(2025, 1, day, 12))))
+        TikTokVideo.objects.bulk_create(videos)
+
+    def test_dips_are_flagged(self):
+        gaps = find_coverage_gaps('20250110', '20250120', window=7)
+        self.assertEqual(gaps, [(datetime(2025, 1, 18).date(), 2, 20)])
+
+    def test_quiet_periods_are_not_flagged(self):
+        self.assertEqual(find_coverage_gaps('20250110', '20250120', window=7, min_baseline=50), [])
+
+    @mock.patch('scraper.management.commands.detect_coverage_gaps.get_tt_videos_new_day')
+    def test_gaps_are_backfilled(self, new_day):
+        out = StringIO()
+        with mock.patch('scraper.management.commands.detect_coverage_gaps.setup_logger',
+                        return_value=logging.getLogger('test_coverage')):
+            call_command('detect_coverage_gaps', start='20250110', end='20250120',
+                         window=7, backfill=True, workers=1, stdout=out)
+
+        self.assertIn('20250118: 2 videos (baseline 20)', out.getvalue())
+        self.assertEqual(new_day.call_args.kwargs['specific_date'], '20250118')
+        self.assertIn('Backfilled 1/1 days', out.getvalue())
+
+
+class RequestBudgetTest(TestCase):
+    """ Tests for the daily request budget of the scrape jobs. """
+    shares = [('new_day', 0.4), ('backfill', 0.2), ('accounts', 0.4)]
+
+    def make_budget(self, job, quota=100):
+        return RequestBudget(job, 'client', quota, self.shares)
+
+    def test_unused_shares_of_higher_priority_jobs_are_protected(self):
+        self.assertEqual(self.make_budget('new_day').allowance, 100)
+        self.assertEqual(self.make_budget('backfill').allowance, 60)
+        self.assertEqual(self.make_budget('accounts').allowance, 40)
+
+        new_day = self.make_budget('new_day')
+        new_day.consume(30)
+        new_day.flush()
+        self.assertEqual(self.make_budget('accounts').allowance, 40)
+
+        new_day.finish()
+        self.assertEqual(self.make_budget('accounts').allowance, 50)
+
+    def test_flush_adds_to_ledger(self):
+        budget = self.make_budget('accounts')
+        budget.consume()
+        budget.flush()
+        budget.consume(2)
+        budget.flush()
+        budget.flush()
+
+        entry = ApiRequestLedger.objects.get(job='accounts', credential='client')
+        self.assertEqual(entry.n_requests, 3)
+        self.assertFalse(entry.finished)
+        self.assertEqual(budget.remaining, 37)
+
+    def test_exhausted_within_margin(self):
+        budget = self.make_budget('new_day', quota=10)
+        budget.consume(7)
+        self.assertFalse(budget.exhausted())
+        budget.consume()
+        self.assertTrue(budget.exhausted())
+
+    def test_concurrent_reservations_stop_at_margin(self):
+        budget = self.make_budget('new_day', quota=10)
+        results = []
+
+        def reserve():
+            for _ in range(5):
+                results.append(budget.try_consume())
+
+        threads = [threading.Thread(target=reserve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 8)
+        self.assertEqual(budget.remaining, 2)
+
+    def test_request_is_not_sent_without_budget(self):
+        budget = self.make_budget('new_day', quota=2)
+        with mock.patch('scraper.scraper.get_session') as get_session, \
+                self.assertRaises(RequestBudgetExhausted):
+            make_api_request('https://example.com', {}, {}, logger=logging.getLogger('test'),
+                             budget=budget)
+        get_session.assert_not_called()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    SCRAPER_ARCHIVE_RAW_PAGES=False,
+    SCRAPER_REQUESTS_PER_MINUTE=60000,
+    SCRAPER_MAX_REQUESTS_PER_MINUTE=60000,
+    SCRAPER_BASE_BACKOFF=0.01
+)
+@mock.patch('scraper.scraper.get_username_list', return_value=['user_a', 'user_b'])
+class FakeResearchAPITest(TestCase):
+    """ Tests for scraping against the local fake Research API. """
+
+    def setUp(self):
+        self.logger = logging.getLogger('test_fake_api')
+        self.logger.addHandler(logging.NullHandler())
+        self.logger.propagate = False
+
+    def tearDown(self):
+        cache.clear()
+
+    def scrape_day(self, api):
+        with FakeResearchAPIServer(api) as server, override_settings(TT_API_BASE_URL=server.url):
+            get_tt_videos_new_day(specific_date='20250101', logger=self.logger)
+
+    def test_all_pages_are_scraped(self, *mocks):
+        api = FakeResearchAPI(pages=3)
+        self.scrape_day(api)
+
+        self.assertEqual(api.stats()['pages'], 3)
+        self.assertEqual(TikTokVideo.objects.count(), 300)
+        self.assertEqual(
+            set(TikTokUser.objects.values_list('name', flat=True)), {'user_a', 'user_b'})
+        self.assertTrue(ScrapeCheckpoint.objects.get(mode='new_day').completed)
+
+    def test_payloads_are_deterministic(self, *mocks):
+        first, second = FakeResearchAPI(seed=1), FakeResearchAPI(seed=1)
+        params = {'start_date': '20250101', 'end_date': '20250101', 'max_count': 10, 'cursor': 10}
+        self.assertEqual(first.query_videos(params, None), second.query_videos(params, None))
+        _, payload = first.query_videos(params, {'id', 'view_count'})
+        self.assertEqual(set(payload['data']['videos'][0]), {'id', 'view_count'})
+
+    def test_injected_errors_are_retried(self, *mocks):
+        api = FakeResearchAPI(pages=3, error_rate=0.3, seed=2)
+        self.scrape_day(api)
+
+        self.assertGreater(api.stats()['errors'], 0)
+        self.assertEqual(api.stats()['pages'], 3)
+        self.assertEqual(TikTokVideo.objects.count(), 300)
+
+    def test_sharded_day_scrape(self, *mocks):
+        api = FakeResearchAPI(pages=2)
+        with FakeResearchAPIServer(api) as server, override_settings(TT_API_BASE_URL=server.url):
+            get_tt_videos_new_day(specific_date='20250101', logger=self.logger, query_shards=3)
+
+        self.assertEqual(api.stats()['pages'], 6)
+        self.assertEqual(TikTokVideo.objects.count(), 600)
+        checkpoints = ScrapeCheckpoint.objects.filter(start_date='20250101')
+        self.assertEqual(
+            sorted(checkpoints.values_list('mode', flat=True)),
+            ['new_day_1of3', 'new_day_2of3', 'new_day_3of3'])
+        self.assertTrue(all(c.completed for c in checkpoints))
+
+    def test_resumed_sharded_scrape_keeps_its_plan(self, *mocks):
+        requested = []
+
+        class RecordingAPI(FakeResearchAPI):
+            def query_videos(self, params, fields):
+                requested.append((params.get('cursor', 0), get_field_values(params, 'username')))
+                return super().query_videos(params, fields)
+
+        api = RecordingAPI(pages=2)
+        with FakeResearchAPIServer(api) as server, override_settings(TT_API_BASE_URL=server.url):
+            get_tt_videos_new_day(specific_date='20250101', logger=self.logger, query_shards=2)
+            interrupted = ScrapeCheckpoint.objects.get(mode='new_day_1of2')
+            ScrapeCheckpoint.objects.filter(pk=interrupted.pk).update(completed=False, cursor=100)
+
+            # The saved videos change the weights, which would change the plan.
+            requested.clear()
+            with mock.patch('scraper.scraper.get_query_weights',
+                            return_value=({'user_b': 1000}, {})):
+                get_tt_videos_new_day(specific_date='20250101', logger=self.logger,
+                                      query_shards=2, resume=True)
+
+        self.assertEqual(requested, [(100, interrupted.query['usernames'])])
+        self.assertTrue(ScrapeCheckpoint.objects.get(pk=interrupted.pk).completed)
+
+    def test_overlapping_shards_are_deduplicated(self, *mocks):
+        api = FakeResearchAPI(pages=2)
+        with FakeResearchAPIServer(api) as server, override_settings(TT_API_BASE_URL=server.url), \
+                mock.patch('scraper.utils.fake_api.zlib.crc32', return_value=0), \
+                mock.patch('scraper.scraper.save_videos_to_db') as save_videos, \
+                self.assertLogs(self.logger, level='INFO') as logs:
+            get_tt_videos_new_day(specific_date='20250101', logger=self.logger, query_shards=2)
+
+        # Both shards return the same 200 videos, which are only saved once.
+        self.assertEqual(api.stats()['videos'], 400)
+        self.assertEqual(sum(len(c.args[0]) for c in save_videos.call_args_list), 200)
+        self.assertTrue(any('skipped 200 unchanged duplicates (50.0%)' in line for line in logs.output))
+
+    @override_settings(SCRAPER_BASE_BACKOFF=0, SCRAPER_MIN_REQUESTS_PER_MINUTE=60000)
+    @mock.patch('scraper.scraper.get_formatted_date', return_value='20250130')
+    @mock.patch('scraper.scraper.log_server_ip')
+    def test_failed_windows_are_retried_in_halves(self, *mocks):
+        class LongWindowErrorAPI(FakeResearchAPI):
+            def query_videos(self, params, fields):
+                if params['start_date'] == '20250101' and params['end_date'] == '20250130':
+                    return 500, {'error': {'code': 'internal_error', 'message': 'Too dense'}}
+                return super().query_videos(params, fields)
+
+        api = LongWindowErrorAPI(pages=1)
+        with FakeResearchAPIServer(api) as server, override_settings(TT_API_BASE_URL=server.url):
+            get_tt_videos_update_account_data(logger=self.logger)
+
+        checkpoints = ScrapeCheckpoint.objects.filter(mode='accounts')
+        self.assertTrue(checkpoints.get(start_date='20250101', end_date='20250115').completed)
+        self.assertTrue(checkpoints.get(start_date='20250116', end_date='20250130').completed)
+        self.assertEqual(TikTokVideo.objects.count(), 200)
+        # The failed window completes with its halves and gets a watermark.
+        self.assertTrue(checkpoints.get(start_date='20250101', end_date='20250130').completed)
+        self.assertTrue(ScrapeWindowWatermark.objects.filter(
+            start_date='20250101', end_date='20250130', last_refreshed__isnull=False).exists())
+
+        n_pages = api.stats()['pages']
+        with FakeResearchAPIServer(api) as server, override_settings(TT_API_BASE_URL=server.url):
+            get_tt_videos_update_account_data(logger=self.logger, resume=True)
+        self.assertEqual(api.stats()['pages'], n_pages)
+
+    @mock.patch('scraper.scraper.get_formatted_date', return_value='20250130')
+    @mock.patch('scraper.scraper.log_server_ip')
+    def test_account_update_requests_engagement_fields_only(self, *mocks):
+        requested = []
+
+        class RecordingAPI(FakeResearchAPI):
+            def query_videos(self, params, fields):
+                requested.append((fields, bool(get_field_values(params, 'video_id'))))
+                return super().query_videos(params, fields)
+
+        api = RecordingAPI(pages=1)
+        with FakeResearchAPIServer(api) as server, override_settings(TT_API_BASE_URL=server.url):
+            get_tt_videos_update_account_data(logger=self.logger)
+            # Unknown videos are fetched again with all fields.
+            self.assertEqual(requested, [
+                (set(FIELD_PROFILES['engagement']), False),
+                (set(FIELD_PROFILES['full']), True),
+            ])
+            self.assertEqual(TikTokVideo.objects.count(), 100)
+            self.assertFalse(TikTokVideo.objects.filter(video_description=None).exists())
+
+            requested.clear()
+            get_tt_videos_update_account_data(logger=self.logger)
+            self.assertEqual(requested, [(set(FIELD_PROFILES['engagement']), False)])
+
+    @override_settings(SCRAPER_DAILY_REQUEST_QUOTA=5)
+    def test_scrape_stops_when_budget_is_exhausted(self, *mocks):
+        api = FakeResearchAPI(pages=10)
+        self.scrape_day(api)
+
+        # Stops with a margin of 3 requests and resumes from the checkpoint.
+        self.assertEqual(api.stats()['pages'], 3)
+        self.assertEqual(TikTokVideo.objects.count(), 300)
+        self.assertFalse(ScrapeCheckpoint.objects.get(mode='new_day').completed)
+        entry = ApiRequestLedger.objects.get(job='new_day')
+        self.assertEqual(entry.n_requests, 3)
+        self.assertFalse(entry.finished)
+
+        with FakeResearchAPIServer(api) as server, \
+                override_settings(TT_API_BASE_URL=server.url, SCRAPER_DAILY_REQUEST_QUOTA=100):
+            get_tt_videos_new_day(specific_date='20250101', logger=self.logger, resume=True)
+        self.assertEqual(api.stats()['pages'], 10)
+        self.assertEqual(TikTokVideo.objects.count(), 1000)
+        self.assertEqual(ApiRequestLedger.objects.get(job='new_day').n_requests, 10)
+
+    def test_benchmark_rolls_back_writes(self, *mocks):
+        out = StringIO()
+        with mock.patch('scraper.management.commands.benchmark_scraper.setup_logger',
+                        return_value=self.logger):
+            call_command('benchmark_scraper', pages=2, latency=0, stdout=out)
+
+        self.assertIn('2 pages / 200 rows', out.getvalue())
+        self.assertFalse(TikTokVideo.objects.exists())
+
+    @override_settings(SCRAPER_DAILY_REQUEST_QUOTA=5)
+    def test_benchmark_ignores_request_quota(self, *mocks):
+        out = StringIO()
+        with mock.patch('scraper.management.commands.benchmark_scraper.setup_logger',
+                        return_value=self.logger):
+            call_command('benchmark_scraper', pages=10, latency=0, stdout=out)
+
+        self.assertIn('10 pages / 1000 rows', out.getvalue())
+        self.assertFalse(ApiRequestLedger.objects.exists())
+
+    def test_benchmark_fails_on_truncated_run(self, *mocks):
+        with mock.patch('scraper.management.commands.benchmark_scraper.setup_logger',
+                        return_value=self.logger), \
+                mock.patch('scraper.scraper.fan_out_windows', return_value=0), \
+                self.assertRaisesMessage(CommandError, '1 date windows did not complete'):
+            call_command('benchmark_scraper', pages=2, latency=0, stdout=StringIO())
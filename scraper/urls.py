@@ -1,6 +1,6 @@
 from django.urls import path
 from .api import (
-    ScraperPostAPI, TikTokVideoListAPI,TikTokVideoBListAPI,
+    IngestJobStatusAPI, ScraperPostAPI, TikTokVideoListAPI,TikTokVideoBListAPI,
     TikTokVideoBRetrieveAPI, TikTokVideoBUpdateAPI
 )
 
@@ -10,6 +10,11 @@ urlpatterns = [
         ScraperPostAPI.as_view(),
         name='scraper_post_api'
     ),
+    path(
+        'api/post/jobs/<int:job_id>/',
+        IngestJobStatusAPI.as_view(),
+        name='scraper_ingest_job_api'
+    ),
     path(
         'api/videos',
         TikTokVideoListAPI.as_view(),
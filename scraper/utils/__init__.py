@@ -0,0 +1 @@
+# This can be empty
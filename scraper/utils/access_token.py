@@ -0,0 +1,55 @@
+import threading
+
+from django.core.cache import cache
+
+
+class AccessTokenManager:
+    """
+    Caches the bearer token of the TikTok Research API in the Django cache.
+
+    The token is stored with a timeout slightly shorter than its lifetime, so
+    a new token is requested proactively before the old one expires. As the
+    token lives in the Django cache, it is shared by all threads and
+    processes using the same cache backend.
+
+    Args:
+        fetch_token (callable): Requests a new token from the API and returns
+            the decoded response (containing access_token and expires_in).
+        cache_key (str): Key under which the token is cached.
+        refresh_margin (int): Seconds before expiry at which the token is
+            refreshed.
+    """
+
+    def __init__(self, fetch_token, cache_key, refresh_margin=300):
+        self.fetch_token = fetch_token
+        self.cache_key = cache_key
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+
+    def get_token(self):
+        """Return a valid token, requesting a new one only if necessary."""
+        token = cache.get(self.cache_key)
+        if token is None:
+            with self._lock:
+                token = cache.get(self.cache_key)
+                if token is None:
+                    token = self.refresh()
+        return token
+
+    def refresh(self):
+        """Request a new token and store it in the cache."""
+        response = self.fetch_token()
+        token = response['access_token']
+        expires_in = int(response.get('expires_in', 7200))
+        timeout = max(expires_in - self.refresh_margin, 1)
+        cache.set(self.cache_key, token, timeout=timeout)
+        return token
+
+    def invalidate(self, token):
+        """
+        Remove token from the cache (e.g., after the API rejected it with a
+        401). Does nothing if another worker already replaced the token.
+        """
+        with self._lock:
+            if cache.get(self.cache_key) == token:
+                cache.delete(self.cache_key)
@@ -0,0 +1,75 @@
+import glob
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+
+from django.conf import settings
+
+
+class RawPageArchive:
+    """
+    Append-only archive of raw Research API pages.
+
+    The pages of every date window of a run are appended as JSON lines to a
+    gzip-compressed shard <archive_dir>/<run_id>/<start_date>_<end_date>.jsonl.gz.
+    Each line holds the page data together with the window, the request
+    cursor, the search_id and the scrape timestamp, so the page can be
+    re-ingested later (see the replay_raw_pages command).
+
+    Args:
+        mode (str): Scrape mode, used as prefix of the run ID.
+        archive_dir (str): Base directory of the archive. Defaults to
+            SCRAPER_RAW_ARCHIVE_DIR.
+    """
+
+    def __init__(self, mode, archive_dir=None):
+        self.run_id = f'{mode}_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        self.run_dir = os.path.join(
+            archive_dir or settings.SCRAPER_RAW_ARCHIVE_DIR, self.run_id)
+        self._lock = threading.Lock()
+
+    def get_shard_path(self, date_range):
+        return os.path.join(self.run_dir, f'{date_range[0]}_{date_range[1]}.jsonl.gz')
+
+    def append(self, date_range, cursor, search_id, scrape_ts, data):
+        """Append a page to the shard of its date window."""
+        line = json.dumps({
+            'run_id': self.run_id,
+            'start_date': date_range[0],
+            'end_date': date_range[1],
+            'cursor': cursor,
+            'search_id': search_id,
+            'scrape_ts': scrape_ts,
+            'data': data,
+        })
+        with self._lock:
+            os.makedirs(self.run_dir, exist_ok=True)
+            # Appending adds a new gzip member; gzip readers treat the
+            # concatenated members as one stream.
+            with gzip.open(self.get_shard_path(date_range), 'at', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def find_shards(paths):
+    """
+    Return all shard files contained in paths (shard files or directories,
+    which are searched recursively).
+    """
+    shards = []
+    for path in paths:
+        if os.path.isdir(path):
+            shards += sorted(glob.glob(
+                os.path.join(path, '**', '*.jsonl.gz'), recursive=True))
+        else:
+            shards.append(path)
+    return shards
+
+
+def iter_shard_pages(shard_path):
+    """Yield the archived page records of a shard in the order they were written."""
+    with gzip.open(shard_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
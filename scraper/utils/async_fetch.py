@@ -0,0 +1,105 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def iter_fetched(items, fetch, concurrency, logger, host_of=None,
+                 host_concurrency=None, wait_time=0.0, queue_size=None):
+    """
+    Fetch items concurrently on an asyncio event loop and yield the results
+    in the calling thread, in order of completion.
+
+    The event loop runs in a background thread with concurrency connection
+    slots, each fetching one item at a time and waiting at least wait_time
+    seconds between the starts of its requests (politeness delay). At most
+    host_concurrency requests run against the same host (as returned by
+    host_of) at a time. fetch is a blocking callable (e.g., using requests)
+    and is run in a thread pool of one thread per slot.
+
+    The results are handed to the calling thread through a bounded queue,
+    so the caller can write them to the database synchronously (the Django
+    ORM must not be used from the event loop). If the caller falls behind,
+    the slots block. When the generator is closed early, the pending fetches
+    are finished and the remaining items are dropped.
+
+    Args:
+        items (list): Items to fetch (e.g., video IDs).
+        fetch (callable): Takes an item and returns its result.
+        concurrency (int): Number of connection slots.
+        logger: Logger instance.
+        host_of (callable): Takes an item and returns the host it is fetched
+            from (default: all items share one host).
+        host_concurrency (int): Maximum number of concurrent requests per
+            host (default: concurrency).
+        wait_time (float): Minimum number of seconds between the requests of
+            a slot.
+        queue_size (int): Maximum number of results waiting to be consumed
+            (default: 2 * concurrency).
+
+    Yields:
+        tuple: (item, result, exception); result is None if fetch raised.
+    """
+    result_queue = queue.Queue(maxsize=queue_size or 2 * concurrency)
+    stop_event = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop_event.is_set():
+            try:
+                result_queue.put(entry, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue()
+        for item in items:
+            pending.put_nowait(item)
+        host_slots = defaultdict(
+            lambda: asyncio.Semaphore(host_concurrency or concurrency))
+
+        async def slot(executor):
+            last_start = None
+            while not stop_event.is_set():
+                try:
+                    item = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if last_start is not None:
+                    await asyncio.sleep(max(0.0, wait_time - (loop.time() - last_start)))
+                async with host_slots[host_of(item) if host_of else None]:
+                    last_start = loop.time()
+                    try:
+                        result = await loop.run_in_executor(executor, fetch, item)
+                        entry = (item, result, None)
+                    except Exception as e:
+                        entry = (item, None, e)
+                if not await loop.run_in_executor(None, put, entry):
+                    return
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            await asyncio.gather(*(slot(executor) for _ in range(concurrency)))
+
+    def run_loop():
+        try:
+            asyncio.run(run())
+        except Exception:
+            logger.error('Async fetch loop failed', exc_info=True)
+        finally:
+            put(done)
+
+    thread = threading.Thread(target=run_loop, daemon=True)
+    thread.start()
+    try:
+        while True:
+            entry = result_queue.get()
+            if entry is done:
+                break
+            yield entry
+    finally:
+        stop_event.set()
+        thread.join()
@@ -0,0 +1,33 @@
+from scraper.models import ScrapeCheckpoint
+
+
+def get_checkpoint(mode, date_range, resume=False, query=None):
+    """
+    Return the checkpoint of a date window.
+
+    If resume is False, the progress stored in an existing checkpoint is
+    reset, so the window is scraped from the first page. The same happens
+    if the checkpoint was stored for a different query (e.g., the terms of
+    a query shard), whose cursor does not apply to this one.
+    """
+    checkpoint, created = ScrapeCheckpoint.objects.get_or_create(
+        mode=mode, start_date=date_range[0], end_date=date_range[1],
+        defaults={'query': query})
+    if not created and (not resume or checkpoint.query != query):
+        checkpoint.cursor = 0
+        checkpoint.search_id = ''
+        checkpoint.completed = False
+        checkpoint.n_pages = 0
+        checkpoint.query = query
+        checkpoint.save()
+    return checkpoint
+
+
+def update_checkpoint(checkpoint, data):
+    """Record the pagination state after the page data has been persisted."""
+    checkpoint.cursor = data.get('cursor', 0)
+    checkpoint.search_id = data.get('search_id', '')
+    checkpoint.completed = not data.get('has_more', False)
+    checkpoint.n_pages += 1
+    checkpoint.save(update_fields=[
+        'cursor', 'search_id', 'completed', 'n_pages', 'last_updated'])
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from statistics import median
+
+from scraper.utils.window_splitter import DATE_FORMAT, get_daily_video_counts
+
+
+def find_coverage_gaps(start_date, end_date, window=14, threshold=0.5,
+                       min_baseline=10):
+    """
+    Find days between start_date and end_date (YYYYMMDD) whose number of
+    stored videos dips below threshold times the rolling median of the
+    preceding window days.
+
+    Days whose baseline is below min_baseline are never flagged, so quiet
+    periods do not produce false positives.
+
+    Returns:
+        list: (date, count, baseline) tuples of the flagged days.
+    """
+    start = datetime.strptime(start_date, DATE_FORMAT).date()
+    end = datetime.strptime(end_date, DATE_FORMAT).date()
+    lookback_start = start - timedelta(days=window)
+    counts = get_daily_video_counts(lookback_start.strftime(DATE_FORMAT), end_date)
+
+    gaps = []
+    day = start
+    while day <= end:
+        previous = [counts.get(day - timedelta(days=i), 0) for i in range(1, window + 1)]
+        baseline = median(previous)
+        count = counts.get(day, 0)
+        if baseline >= min_baseline and count < threshold * baseline:
+            gaps.append((day, count, baseline))
+        day += timedelta(days=1)
+    return gaps
@@ -0,0 +1,230 @@
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TOKEN_PATH = '/v2/oauth/token/'
+VIDEO_QUERY_PATH = '/v2/research/video/query/'
+
+ERROR_RESPONSES = {
+    'internal_error': (500, 'Something went wrong. Please try again later.'),
+    'invalid_params': (400, 'Invalid parameters.'),
+}
+
+
+class FakeResearchAPI:
+    """
+    Deterministic stand-in for the token and video query endpoints of the
+    TikTok Research API.
+
+    Every date window has `pages` result pages of up to max_count videos.
+    The videos of a page only depend on the query terms, the window, the
+    page number and the seed, so repeated runs return identical payloads
+    (and differently sharded queries return different videos). Queries
+    for video_id values return these videos again. Only the fields
+    requested in the `fields` query parameter are returned.
+
+    Args:
+        pages (int): Number of result pages per date window.
+        latency (float): Seconds each request is delayed.
+        error_rate (float): Share of video queries answered with an error.
+        error_codes (list): Error codes picked from for injected errors.
+        seed (int): Seed for the generated payloads and injected errors.
+    """
+
+    def __init__(self, pages=5, latency=0.0, error_rate=0.0,
+                 error_codes=None, seed=0):
+        self.pages = pages
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_codes = error_codes or list(ERROR_RESPONSES)
+        self.seed = seed
+
+        self._lock = threading.Lock()
+        self._error_random = random.Random(seed)
+        self.n_tokens = 0
+        self.n_pages = 0
+        self.n_videos = 0
+        self.n_errors = 0
+
+    def issue_token(self):
+        with self._lock:
+            self.n_tokens += 1
+            n = self.n_tokens
+        return 200, {
+            'access_token': f'fake-token-{n}',
+            'expires_in': 7200,
+            'token_type': 'Bearer',
+        }
+
+    def query_videos(self, params, fields):
+        """Return the status code and payload for a video query."""
+        with self._lock:
+            inject_error = self._error_random.random() < self.error_rate
+            error_code = self._error_random.choice(self.error_codes)
+        if inject_error:
+            with self._lock:
+                self.n_errors += 1
+            status, message = ERROR_RESPONSES[error_code]
+            return status, {'error': {'code': error_code, 'message': message}}
+
+        start_date = params['start_date']
+        end_date = params['end_date']
+        max_count = int(params.get('max_count', 100))
+        cursor = int(params.get('cursor', 0))
+        page = cursor // max_count
+
+        video_ids = get_field_values(params, 'video_id')
+        if video_ids:
+            # Look up specific videos (as generated by earlier queries).
+            video_ids = [int(video_id) for video_id in video_ids]
+            videos = [
+                self.make_video(video_id, fields)
+                for video_id in video_ids[cursor:cursor + max_count]
+            ]
+            has_more = cursor + max_count < len(video_ids)
+        else:
+            usernames = get_field_values(params, 'username') or ['fake_user']
+            hashtags = get_field_values(params, 'hashtag_name') or ['fakehashtag']
+            query_key = zlib.crc32(json.dumps([usernames, hashtags]).encode()) % 1000
+            videos = []
+            if page < self.pages:
+                videos = [
+                    self.make_video(
+                        query_key * 10 ** 14 + int(start_date) * 10 ** 6 + page * max_count + i,
+                        fields, usernames, hashtags)
+                    for i in range(max_count)
+                ]
+            has_more = page + 1 < self.pages
+        with self._lock:
+            self.n_pages += 1
+            self.n_videos += len(videos)
+
+        return 200, {
+            'data': {
+                'videos': videos,
+                'cursor': cursor + len(videos),
+                'has_more': has_more,
+                'search_id': params.get('search_id') or f'fake-search-{start_date}-{end_date}',
+            },
+            'error': {'code': 'ok', 'message': ''},
+        }
+
+    def make_video(self, video_id, fields, usernames=None, hashtags=None):
+        """
+        Generate a video. The ID encodes the query, the first day of the
+        window and the index of the video within the window's results.
+        """
+        start_date = str(video_id // 10 ** 6 % 10 ** 8)
+        index = video_id % 10 ** 6
+        rng = random.Random(f'{self.seed}-{video_id}')
+        start = datetime.strptime(start_date, '%Y%m%d').replace(tzinfo=timezone.utc)
+        usernames = usernames or ['fake_user']
+        hashtags = hashtags or ['fakehashtag']
+
+        video = {
+            'id': video_id,
+            'video_description': f'Fake video {index} from {start_date}',
+            'create_time': rng.randint(int(start.timestamp()), int(start.timestamp()) + 86399),
+            'region_code': 'DE',
+            'share_count': rng.randint(0, 1000),
+            'view_count': rng.randint(0, 10 ** 6),
+            'like_count': rng.randint(0, 10 ** 5),
+            'comment_count': rng.randint(0, 5000),
+            'music_id': rng.randint(10 ** 17, 10 ** 18),
+            'hashtag_names': rng.sample(hashtags, min(len(hashtags), 2)),
+            'username': rng.choice(usernames),
+            'voice_to_text': '',
+        }
+        if fields:
+            video = {k: v for k, v in video.items() if k in fields}
+        return video
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tokens': self.n_tokens,
+                'pages': self.n_pages,
+                'videos': self.n_videos,
+                'errors': self.n_errors,
+            }
+
+
+def get_field_values(params, field_name):
+    """Return the values of an IN condition of the query for field_name."""
+    query = params.get('query', {})
+    for condition in query.get('or', []) + query.get('and', []):
+        if condition.get('field_name') == field_name:
+            return condition.get('field_values', [])
+    return []
+
+
+class FakeResearchAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        api = self.server.api
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if api.latency:
+            time.sleep(api.latency)
+
+        if url.path == TOKEN_PATH:
+            status, payload = api.issue_token()
+        elif url.path == VIDEO_QUERY_PATH:
+            if not self.headers.get('Authorization', '').startswith('Bearer fake-token-'):
+                status, payload = 401, {'error': {'code': 'access_token_invalid',
+                                                  'message': 'Invalid access token.'}}
+            else:
+                fields = parse_qs(url.query).get('fields', [''])[0]
+                fields = set(fields.split(',')) if fields else None
+                status, payload = api.query_videos(json.loads(body or b'{}'), fields)
+        else:
+            status, payload = 404, {'error': {'code': 'not_found', 'message': 'Not found.'}}
+
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeResearchAPIServer(ThreadingHTTPServer):
+    """
+    HTTP server serving a FakeResearchAPI. Use it as a context manager to run
+    it in a background thread (e.g., in tests or benchmarks):
+
+        with FakeResearchAPIServer(FakeResearchAPI(pages=3)) as server:
+            ... settings.TT_API_BASE_URL = server.url ...
+
+    Port 0 picks a free port.
+    """
+    daemon_threads = True
+
+    def __init__(self, api, host='127.0.0.1', port=0):
+        super().__init__((host, port), FakeResearchAPIHandler)
+        self.api = api
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
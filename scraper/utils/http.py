@@ -0,0 +1,97 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter applying a default timeout to requests that set none."""
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def build_session(pool_size=10, timeout=60):
+    """
+    Create a requests session keeping connections alive in a pool of
+    pool_size connections per host.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host (should
+            be at least the number of threads sharing the session).
+        timeout (float): Default timeout in seconds for requests without an
+            explicit timeout.
+
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        timeout=timeout
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the session shared by all scrapers of this process, configured by
+    SCRAPER_HTTP_POOL_SIZE and SCRAPER_HTTP_TIMEOUT.
+    """
+    global _session
+    if _session is None:
+        from django.conf import settings
+        with _session_lock:
+            if _session is None:
+                _session = build_session(
+                    pool_size=settings.SCRAPER_HTTP_POOL_SIZE,
+                    timeout=settings.SCRAPER_HTTP_TIMEOUT
+                )
+    return _session
+
+
+def get_connection_stats(session):
+    """
+    Return per-host connection statistics of a session.
+
+    Returns:
+        dict: {host: {'requests': int, 'connections': int, 'reused': int}},
+            where 'connections' is the number of newly opened connections and
+            'reused' the number of requests sent over an existing connection.
+    """
+    stats = {}
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault(
+                pool.host, {'requests': 0, 'connections': 0, 'reused': 0})
+            host_stats['requests'] += pool.num_requests
+            host_stats['connections'] += pool.num_connections
+            host_stats['reused'] += max(0, pool.num_requests - pool.num_connections)
+    return stats
+
+
+def log_connection_stats(session, logger):
+    """Write the connection reuse statistics of session to logger."""
+    for host, host_stats in get_connection_stats(session).items():
+        logger.info(
+            f"HTTP connections to {host}: {host_stats['requests']} requests over "
+            f"{host_stats['connections']} connection(s), {host_stats['reused']} reused"
+        )
@@ -0,0 +1,11 @@
+from django.conf import settings
+
+from scraper.TikTok_Content_Scraper.TT_Scraper._json_codec import get_codec
+
+
+def get_json_codec():
+    """
+    Return the JSON codec configured by SCRAPER_JSON_CODEC ('auto' uses
+    orjson if it is installed, 'json' the standard library).
+    """
+    return get_codec(settings.SCRAPER_JSON_CODEC)
@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PipelineStats:
+    """
+    Thread-safe counters for the fetch and write stages of a pipeline.
+
+    Tracks how long the fetchers spend retrieving pages and waiting for
+    space in the queue (backpressure), how long the writer spends persisting
+    pages and waiting for new ones, and the queue depth seen by the writer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.n_fetched = 0
+        self.n_written = 0
+        self.fetch_time = 0.0
+        self.put_wait_time = 0.0
+        self.write_time = 0.0
+        self.get_wait_time = 0.0
+        self.queue_depth_total = 0
+        self.max_queue_depth = 0
+
+    def record_fetch(self, fetch_time, put_wait_time):
+        with self._lock:
+            self.n_fetched += 1
+            self.fetch_time += fetch_time
+            self.put_wait_time += put_wait_time
+
+    def record_write(self, write_time, get_wait_time, queue_depth):
+        with self._lock:
+            self.n_written += 1
+            self.write_time += write_time
+            self.get_wait_time += get_wait_time
+            self.queue_depth_total += queue_depth
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def summary(self):
+        """Return the average per-page latencies (in seconds) and queue depths."""
+        with self._lock:
+            n_fetched = self.n_fetched or 1
+            n_written = self.n_written or 1
+            return {
+                'fetched': self.n_fetched,
+                'written': self.n_written,
+                'avg_fetch': self.fetch_time / n_fetched,
+                'avg_put_wait': self.put_wait_time / n_fetched,
+                'avg_write': self.write_time / n_written,
+                'avg_get_wait': self.get_wait_time / n_written,
+                'avg_queue_depth': self.queue_depth_total / n_written,
+                'max_queue_depth': self.max_queue_depth,
+            }
+
+    def log(self, logger, prefix='Pipeline'):
+        s = self.summary()
+        logger.info(
+            f"{prefix}: fetched {s['fetched']} / wrote {s['written']} pages; "
+            f"fetch {s['avg_fetch']:.3f}s (blocked {s['avg_put_wait']:.3f}s), "
+            f"write {s['avg_write']:.3f}s (idle {s['avg_get_wait']:.3f}s) per page; "
+            f"queue depth avg {s['avg_queue_depth']:.1f} / max {s['max_queue_depth']}"
+        )
+
+
+def format_window(window):
+    return '-'.join(str(part) for part in window)
+
+
+def fan_out_windows(windows, fetch_window, save_page, max_workers, logger,
+                    max_pages=None, queue_size=None, log_interval=50,
+                    fail_fast=True):
+    """
+    Fetch date windows in fetcher threads and persist their pages in the
+    calling thread, so that fetching and writing overlap.
+
+    Every window is paginated by its own fetcher thread (each keeping its own
+    cursor and search_id state). The fetchers push the fetched pages to a
+    bounded queue, which is consumed by the calling thread. Database writes
+    therefore always happen in a single thread. If the writer falls behind,
+    the queue fills up and the fetchers block (backpressure). When the
+    writer stops (max_pages reached or an exception), the fetchers are told
+    to stop and are waited for before returning.
+
+    If fail_fast is False, an exception while fetching a window is logged and
+    only ends that window; the other windows continue.
+
+    Args:
+        windows (list): List of (start_date, end_date) tuples.
+        fetch_window (callable): Takes a window and yields the data of each
+            result page.
+        save_page (callable): Takes a window and a page and persists it.
+        max_workers (int): Number of windows fetched at the same time.
+        logger: Logger instance.
+        max_pages (int): Stop after this many pages have been saved.
+        queue_size (int): Maximum number of pages waiting to be written
+            (default: 2 * max_workers).
+        log_interval (int): Log the pipeline stats every log_interval pages.
+        fail_fast (bool): Stop the whole pipeline if fetching a window fails.
+
+    Returns:
+        int: Number of saved pages.
+    """
+    page_queue = queue.Queue(maxsize=queue_size or 2 * max_workers)
+    stop_event = threading.Event()
+    stats = PipelineStats()
+
+    def put(item):
+        """Put item on the queue unless the pipeline is stopped."""
+        while not stop_event.is_set():
+            try:
+                page_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(window):
+        pages = fetch_window(window)
+        try:
+            while not stop_event.is_set():
+                start = time.monotonic()
+                try:
+                    page = next(pages)
+                except StopIteration:
+                    break
+                except Exception:
+                    if fail_fast:
+                        raise
+                    logger.error(f'Fetching window {format_window(window)} failed',
+                                 exc_info=True)
+                    return
+                fetched = time.monotonic()
+                if not put((window, page)):
+                    return
+                stats.record_fetch(fetched - start, time.monotonic() - fetched)
+        finally:
+            if hasattr(pages, 'close'):
+                pages.close()
+        if not stop_event.is_set():
+            logger.info(f'Finished fetching window {format_window(window)}')
+
+    n_saved = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(worker, window) for window in windows]
+        try:
+            waiting_since = time.monotonic()
+            while True:
+                try:
+                    window, page = page_queue.get(timeout=1)
+                except queue.Empty:
+                    for future in futures:
+                        if future.done() and future.exception():
+                            raise future.exception()
+                    if all(f.done() for f in futures) and page_queue.empty():
+                        break
+                    continue
+                received = time.monotonic()
+                queue_depth = page_queue.qsize()
+
+                save_page(window, page)
+                n_saved += 1
+                written = time.monotonic()
+                stats.record_write(written - received, received - waiting_since,
+                                   queue_depth)
+                waiting_since = written
+                if log_interval and n_saved % log_interval == 0:
+                    stats.log(logger)
+                if max_pages is not None and n_saved >= max_pages:
+                    break
+        finally:
+            stop_event.set()
+
+    stats.log(logger, prefix='Pipeline finished')
+    return n_saved
@@ -0,0 +1,88 @@
+import heapq
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from scraper.models import ScrapeCheckpoint, TikTokVideo
+
+QueryShard = namedtuple('QueryShard', ['usernames', 'hashtags'])
+
+
+def get_query_weights(days=30):
+    """
+    Return the number of videos per username and per hashtag created in the
+    last days, as an estimate of how many results each query term yields.
+    """
+    since = timezone.now() - timedelta(days=days)
+    videos = TikTokVideo.objects.filter(create_time__gte=since)
+    username_weights = dict(
+        videos.values_list('author_id__name').annotate(n=Count('id')))
+    hashtag_weights = dict(
+        videos.values_list('hashtags__name').annotate(n=Count('id')))
+    return username_weights, hashtag_weights
+
+
+def plan_query_shards(usernames, hashtags, n_shards, username_weights=None,
+                      hashtag_weights=None):
+    """
+    Split the usernames and hashtags of an OR query into up to n_shards
+    sub-queries with a similar expected number of results.
+
+    Terms are assigned greedily, heaviest first, to the shard with the lowest
+    total weight. Terms without a weight count as 1. Together, the shards
+    match the same videos as the unsharded query, but a video can match
+    several shards (e.g., by username and by hashtag).
+
+    Returns:
+        list: QueryShard tuples (usernames, hashtags); empty shards are
+            dropped.
+    """
+    username_weights = username_weights or {}
+    hashtag_weights = hashtag_weights or {}
+    terms = (
+        [(username_weights.get(u, 0) + 1, 'usernames', u) for u in usernames]
+        + [(hashtag_weights.get(h, 0) + 1, 'hashtags', h) for h in hashtags]
+    )
+    terms.sort(key=lambda term: term[0], reverse=True)
+
+    shards = [QueryShard([], []) for _ in range(max(n_shards, 1))]
+    loads = [(0, i) for i in range(len(shards))]
+    for weight, kind, term in terms:
+        load, i = heapq.heappop(loads)
+        getattr(shards[i], kind).append(term)
+        heapq.heappush(loads, (load + weight, i))
+
+    return [shard for shard in shards if shard.usernames or shard.hashtags]
+
+
+def load_query_shards(mode, date_range):
+    """
+    Return the query shards stored with the checkpoints of a date window
+    (modes '<mode>_<i>of<n>') by an earlier run, or None if there is no
+    complete plan.
+
+    The plan depends on the video counts at the time it was made, which
+    change while a day is scraped, so resumed runs must reuse it instead of
+    planning again.
+    """
+    checkpoints = ScrapeCheckpoint.objects.filter(
+        mode__startswith=f'{mode}_', start_date=date_range[0], end_date=date_range[1],
+        query__isnull=False
+    ).order_by('-last_updated')
+    n_shards = None
+    shards = {}
+    for checkpoint in checkpoints:
+        match = re.fullmatch(rf'{mode}_(\d+)of(\d+)', checkpoint.mode)
+        if match is None:
+            continue
+        i, n = map(int, match.groups())
+        # Only use the most recent plan.
+        n_shards = n_shards or n
+        if n == n_shards:
+            shards[i] = QueryShard(**checkpoint.query)
+    if n_shards is None or sorted(shards) != list(range(1, n_shards + 1)):
+        return None
+    return [shards[i] for i in range(1, n_shards + 1)]
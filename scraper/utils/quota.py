@@ -0,0 +1,124 @@
+import threading
+
+from django.db.models import F
+from django.utils import timezone
+
+from scraper.models import ApiRequestLedger
+
+
+class RequestBudgetExhausted(Exception):
+    """Raised instead of sending a request that the budget does not allow."""
+
+
+class RequestBudget:
+    """
+    Share of the daily Research API request quota available to a scrape job.
+
+    The quota is divided between the jobs by shares, listed in order of
+    priority. A job may use all requests left for the day, except for the
+    unused shares of higher priority jobs that have not finished yet. High
+    priority work therefore always fits, while lower priority jobs can use
+    what is left over.
+
+    Requests are reserved with try_consume() before they are sent, which is
+    thread-safe, so concurrent fetchers and retries cannot overshoot the
+    budget. They are written to the ApiRequestLedger with flush(), which
+    should be called regularly from a single thread.
+
+    Args:
+        job (str): Name of the job (e.g., 'new_day').
+        credential (str): API credential the quota belongs to.
+        daily_quota (int): Number of requests allowed per day.
+        shares (list): (job, share of the quota) tuples by priority.
+        margin (int): Requests kept in reserve, so the job can stop before
+            the quota is exhausted (e.g., the retries of one page).
+        logger: Logger instance.
+    """
+
+    def __init__(self, job, credential, daily_quota, shares, margin=3,
+                 logger=None):
+        self.job = job
+        self.credential = credential
+        self.daily_quota = daily_quota
+        self.shares = shares
+        self.margin = margin
+        self.logger = logger
+        self.date = timezone.localdate()
+
+        self._lock = threading.Lock()
+        self._used = 0
+        self._flushed = 0
+        self._entry_pk = None
+        self.allowance = self.get_allowance()
+        if logger:
+            logger.info(f'Request budget of {job}: {self.allowance} requests')
+
+    def get_ledger(self):
+        return ApiRequestLedger.objects.filter(date=self.date, credential=self.credential)
+
+    def get_allowance(self):
+        """Return the number of requests the job may make today."""
+        entries = {entry.job: entry for entry in self.get_ledger()}
+        remaining = self.daily_quota - sum(e.n_requests for e in entries.values())
+
+        protected = 0
+        for job, share in self.shares:
+            if job == self.job:
+                break
+            entry = entries.get(job)
+            if entry is not None and entry.finished:
+                continue
+            used = entry.n_requests if entry is not None else 0
+            protected += max(0, int(self.daily_quota * share) - used)
+        return max(0, remaining - protected)
+
+    def consume(self, n=1):
+        with self._lock:
+            self._used += n
+
+    def try_consume(self, n=1):
+        """
+        Reserve n requests unless fewer than margin requests are left.
+
+        Returns:
+            bool: Whether the requests may be sent.
+        """
+        with self._lock:
+            if self.allowance - self._used < self.margin:
+                return False
+            self._used += n
+            return True
+
+    @property
+    def remaining(self):
+        with self._lock:
+            return self.allowance - self._used
+
+    def exhausted(self):
+        """Whether the job should stop to stay within its budget."""
+        return self.remaining < self.margin
+
+    def flush(self):
+        """Add the requests counted since the last flush to the ledger."""
+        with self._lock:
+            delta = self._used - self._flushed
+            self._flushed = self._used
+        if self._entry_pk is None:
+            entry, _ = ApiRequestLedger.objects.get_or_create(
+                date=self.date, credential=self.credential, job=self.job)
+            self._entry_pk = entry.pk
+        if delta:
+            ApiRequestLedger.objects.filter(pk=self._entry_pk).update(
+                n_requests=F('n_requests') + delta)
+
+    def finish(self, completed=True):
+        """
+        Flush and, if the job completed its work, mark it as finished for
+        today, releasing the rest of its share to lower priority jobs.
+        """
+        self.flush()
+        if completed:
+            self.get_ledger().filter(job=self.job).update(finished=True)
+        if self.exhausted() and self.logger:
+            self.logger.warning(
+                f'Request budget of {self.job} exhausted after {self._used} requests')
@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+
+
+def get_backoff_delay(attempt, base_delay=10, max_delay=300):
+    """
+    Return an exponential backoff delay with jitter for the given attempt
+    (starting at 0). Half of the delay is fixed, the other half random.
+    """
+    delay = min(max_delay, base_delay * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe token-bucket rate limiter with AIMD rate control.
+
+    All threads sharing the limiter together stay within the current request
+    rate. The rate is increased additively while the API responds healthily
+    and decreased multiplicatively on errors, which additionally block all
+    requests for an exponentially growing, jittered backoff period.
+
+    Args:
+        requests_per_minute (float): Initial request rate.
+        min_requests_per_minute (float): Lower bound of the request rate.
+        max_requests_per_minute (float): Upper bound of the request rate.
+        increase_step (float): Requests per minute added after each success.
+        decrease_factor (float): Factor applied to the rate after an error.
+        base_backoff (float): Backoff in seconds after the first error.
+        max_backoff (float): Upper bound of the backoff in seconds.
+        logger: Logger to which rate changes are reported.
+    """
+
+    def __init__(self, requests_per_minute, min_requests_per_minute=1,
+                 max_requests_per_minute=60, increase_step=1,
+                 decrease_factor=0.5, base_backoff=10, max_backoff=300,
+                 logger=None):
+        self.min_rate = min_requests_per_minute
+        self.max_rate = max(max_requests_per_minute, requests_per_minute)
+        self.rate = requests_per_minute
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_errors = 0
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._tokens = min(1.0, self._tokens + elapsed * self.rate / 60)
+        self._last_refill = now
+
+    def wait(self):
+        """Block until the caller is allowed to send the next request."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = max(
+                    self._blocked_until - now,
+                    (1 - self._tokens) * 60 / self.rate
+                )
+            time.sleep(delay)
+
+    def on_success(self):
+        """Register a healthy response and increase the rate additively."""
+        with self._lock:
+            self._consecutive_errors = 0
+            old_rate = self.rate
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+        if self.rate != old_rate and self.logger:
+            self.logger.info(f'Rate limiter: increased rate to {self.rate:.2f} requests/minute')
+
+    def on_error(self):
+        """
+        Register an error or rate limit response, decrease the rate
+        multiplicatively and block all requests for a backoff period.
+
+        Returns:
+            float: The backoff in seconds.
+        """
+        with self._lock:
+            backoff = get_backoff_delay(
+                self._consecutive_errors, self.base_backoff, self.max_backoff)
+            self._consecutive_errors += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._blocked_until = time.monotonic() + backoff
+            self._tokens = 0.0
+        if self.logger:
+            self.logger.warning(
+                f'Rate limiter: decreased rate to {self.rate:.2f} requests/minute, '
+                f'backing off for {backoff:.1f} seconds'
+            )
+        return backoff
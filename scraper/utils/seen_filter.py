@@ -0,0 +1,50 @@
+ENGAGEMENT_KEYS = ('comment_count', 'like_count', 'share_count', 'view_count')
+
+
+class SeenVideoFilter:
+    """
+    Per-run filter for videos that were already saved during the run.
+
+    Remembers a hash of the engagement counters of every saved video ID, so
+    a video returned again (by an overlapping query shard or a retried
+    window) is only passed on if its counters have changed. Holds a single
+    int per video ID, which keeps millions of IDs within a few hundred MB.
+    """
+
+    def __init__(self):
+        self._seen = {}
+        self.n_videos = 0
+        self.n_duplicates = 0
+
+    @staticmethod
+    def get_fingerprint(video):
+        return hash(tuple(video.get(key) for key in ENGAGEMENT_KEYS))
+
+    def filter(self, videos):
+        """
+        Return the videos that are new or whose engagement changed since they
+        were last seen in this run, and remember them.
+        """
+        fresh = []
+        for video in videos:
+            self.n_videos += 1
+            fingerprint = self.get_fingerprint(video)
+            if self._seen.get(video['id']) == fingerprint:
+                self.n_duplicates += 1
+                continue
+            self._seen[video['id']] = fingerprint
+            fresh.append(video)
+        return fresh
+
+    def __len__(self):
+        return len(self._seen)
+
+    @property
+    def duplicate_rate(self):
+        return self.n_duplicates / self.n_videos if self.n_videos else 0.0
+
+    def log_stats(self, logger):
+        logger.info(
+            f'Seen {self.n_videos} videos ({len(self)} unique), skipped '
+            f'{self.n_duplicates} unchanged duplicates ({self.duplicate_rate:.1%})'
+        )
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from scraper.models import ScrapeWindowWatermark, TikTokVideo
+
+
+def get_engagement_total(date_range):
+    """Return the summed engagement of all videos created in date_range."""
+    start = timezone.make_aware(datetime.strptime(date_range[0], '%Y%m%d'))
+    end = timezone.make_aware(datetime.strptime(date_range[1], '%Y%m%d')) + timedelta(days=1)
+    totals = TikTokVideo.objects.filter(
+        create_time__gte=start, create_time__lt=end
+    ).aggregate(
+        views=Coalesce(Sum('view_count'), 0),
+        likes=Coalesce(Sum('like_count'), 0),
+        shares=Coalesce(Sum('share_count'), 0),
+        comments=Coalesce(Sum('comment_count'), 0),
+    )
+    return sum(totals.values())
+
+
+def get_refresh_interval(watermark, today=None):
+    """
+    Return the number of days after which a window should be refreshed.
+
+    The interval grows with the age of the window (see
+    SCRAPER_REFRESH_INTERVALS) and is halved while the window's engagement
+    still changes by more than SCRAPER_REFRESH_CHANGE_THRESHOLD.
+    """
+    today = today or timezone.localdate()
+    window_end = datetime.strptime(watermark.end_date, '%Y%m%d').date()
+    age = (today - window_end).days
+
+    interval = settings.SCRAPER_REFRESH_INTERVALS[-1][1]
+    for max_age, age_interval in settings.SCRAPER_REFRESH_INTERVALS:
+        if max_age is None or age <= max_age:
+            interval = age_interval
+            break
+
+    change = watermark.engagement_change
+    if change is not None and change > settings.SCRAPER_REFRESH_CHANGE_THRESHOLD:
+        interval = max(1, interval // 2)
+    return interval
+
+
+def get_staleness(watermark, now=None):
+    """
+    Return how overdue a window is as the ratio of the time since its last
+    refresh and its refresh interval (>= 1 means the window is due).
+    """
+    if watermark.last_refreshed is None:
+        return float('inf')
+    now = now or timezone.now()
+    days_since_refresh = (now - watermark.last_refreshed).total_seconds() / 86400
+    return days_since_refresh / get_refresh_interval(watermark, timezone.localdate(now))
+
+
+def get_due_windows(date_ranges, now=None):
+    """
+    Return the date ranges that are due for a refresh, the most overdue
+    first.
+    """
+    watermarks = {
+        (w.start_date, w.end_date): w for w in
+        ScrapeWindowWatermark.objects.filter(
+            start_date__in=[d[0] for d in date_ranges])
+    }
+    staleness = {}
+    for date_range in date_ranges:
+        watermark = watermarks.get(date_range)
+        if watermark is None:
+            watermark = ScrapeWindowWatermark(
+                start_date=date_range[0], end_date=date_range[1])
+        staleness[date_range] = get_staleness(watermark, now)
+
+    due_windows = [d for d in date_ranges if staleness[d] >= 1]
+    return sorted(due_windows, key=lambda d: staleness[d], reverse=True)
+
+
+def record_window_refresh(date_range):
+    """Update the watermark of a date range after it has been refreshed."""
+    watermark, _ = ScrapeWindowWatermark.objects.get_or_create(
+        start_date=date_range[0], end_date=date_range[1])
+    engagement_total = get_engagement_total(date_range)
+    if watermark.engagement_total:
+        watermark.engagement_change = (
+            abs(engagement_total - watermark.engagement_total)
+            / watermark.engagement_total
+        )
+    else:
+        watermark.engagement_change = None
+    watermark.engagement_total = engagement_total
+    watermark.last_refreshed = timezone.now()
+    watermark.n_refreshes += 1
+    watermark.save()
+    return watermark
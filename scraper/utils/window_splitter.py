@@ -0,0 +1,73 @@
+import math
+from datetime import datetime, timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from scraper.models import TikTokVideo
+
+DATE_FORMAT = '%Y%m%d'
+
+
+def get_daily_video_counts(start_date, end_date):
+    """
+    Return the number of stored videos per creation day between start_date
+    and end_date (YYYYMMDD) as {date: count}. Serves as an estimate of the
+    result density of the Research API for these days.
+    """
+    start = timezone.make_aware(datetime.strptime(start_date, DATE_FORMAT))
+    end = timezone.make_aware(datetime.strptime(end_date, DATE_FORMAT)) + timedelta(days=1)
+    counts = TikTokVideo.objects.filter(
+        create_time__gte=start, create_time__lt=end
+    ).annotate(
+        day=TruncDate('create_time')
+    ).values('day').annotate(n=Count('*')).values_list('day', 'n')
+    return dict(counts)
+
+
+def get_window_days(date_range):
+    start = datetime.strptime(date_range[0], DATE_FORMAT).date()
+    end = datetime.strptime(date_range[1], DATE_FORMAT).date()
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def estimate_pages(date_range, daily_counts, page_size=100):
+    """Estimate the number of result pages of a window from daily_counts."""
+    n_videos = sum(daily_counts.get(day, 0) for day in get_window_days(date_range))
+    return math.ceil(n_videos / page_size)
+
+
+def bisect_window(date_range):
+    """
+    Split a window into two halves. Returns an empty list for single days,
+    which cannot be split further.
+    """
+    days = get_window_days(date_range)
+    if len(days) < 2:
+        return []
+    middle = len(days) // 2
+    return [
+        (date_range[0], days[middle - 1].strftime(DATE_FORMAT)),
+        (days[middle].strftime(DATE_FORMAT), date_range[1]),
+    ]
+
+
+def split_dense_windows(date_ranges, daily_counts, max_pages, page_size=100):
+    """
+    Recursively bisect windows whose estimated number of result pages exceeds
+    max_pages, down to single days.
+
+    Returns:
+        list: The resulting (start_date, end_date) windows in date order.
+    """
+    windows = []
+    for date_range in date_ranges:
+        halves = []
+        if estimate_pages(date_range, daily_counts, page_size) > max_pages:
+            halves = bisect_window(date_range)
+        if halves:
+            windows.extend(split_dense_windows(halves, daily_counts, max_pages, page_size))
+        else:
+            windows.append(date_range)
+    return windows